@@ -1,18 +1,105 @@
-from flask import Flask, request, render_template
+from flask import Flask, request, render_template, jsonify, g, Response
 import numpy as np
 import pandas as pd
+import io
 import sys
 import os
+import time
 import traceback
 
 # NOTE: Ensure you have fixed logger.py to include sys.stdout handler for AWS EB visibility
 from src.pipeline.predict_pipeline import CustomData, PredictPipeline
-from src.logger import logging
+from src.pipeline.micro_batcher import MicroBatcher
+from src.pipeline.prediction_cache import PredictionCache, applicant_key
+from src.pipeline.shadow_scoring import ShadowScorer
+from src.components.drift_monitor import DriftMonitor
+from src.exception import CustomException
+from src.logger import logging, log_payload
+from src.metrics import metrics
+from src.utils import load_json
+from src.schema import INTEGER_FIELDS, NOMINAL_FEATURES
+from src.parallelism import configure_process
 
 # CRITICAL FIX 1: Corrected Flask application magic variable
 application = Flask(__name__) 
 app = application
 
+# Each worker scores single-threaded (joblib, XGBoost and BLAS pools); concurrency comes from workers
+configure_process("serving")
+
+# One pipeline per worker: model/preprocessor are cached in its ArtifactRegistry
+# and hot-reloaded when artifacts/ is updated, instead of being unpickled per request.
+predict_pipeline = PredictPipeline()
+# Concurrent single-applicant requests (threaded workers) are scored together in one call
+predict_batcher = MicroBatcher(predict_pipeline)
+# Optional (PREDICTION_CACHE=1): re-submitted applications skip scoring; flushed on every artifact reload
+prediction_cache = PredictionCache()
+predict_pipeline.registry.add_reload_listener(prediction_cache.invalidate)
+# Optional (SHADOW_SCORING=1): registry challengers re-score every answered request in the background
+shadow_scorer = ShadowScorer(predict_pipeline)
+# Sliding-window feature/PD histograms vs the training reference (DRIFT_MONITOR=0 turns it off)
+drift_monitor = DriftMonitor(registry=predict_pipeline.registry)
+
+def _score_applicant(data):
+    """Scores one CustomData record through the prediction cache, micro-batcher or pipeline."""
+    cache_key = None
+    if prediction_cache.config.enabled:
+        cache_key = applicant_key(data, predict_pipeline.model_version())
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if predict_batcher.config.enabled:
+        prediction, pd_score = predict_batcher.predict_record(data)
+    else:
+        results, pd_scores = predict_pipeline.predict_records([data])
+        prediction, pd_score = results[0], pd_scores[0]
+
+    if cache_key is not None:
+        prediction_cache.put(cache_key, prediction, pd_score)
+    return prediction, pd_score
+
+# High-volume per-request logs go to this logger, sampled by LOG_SAMPLE_RATES (default request=0.01)
+request_log = logging.getLogger("request")
+
+# --- Request metrics (served at /metrics, per worker process) ---
+
+def _count_predictions(predictions):
+    """Adds decisions to the per-class counter (1 = default / REJECT, 0 = APPROVE)."""
+    for label in (0, 1):
+        n = int(np.sum(np.asarray(predictions) == label))
+        if n:
+            metrics.counter("predictions_total", "Scored applicants by predicted class", labels={"class": str(label)}).inc(n)
+
+def _run_monitoring(hook, *args):
+    """Runs a shadow-scoring/drift hook after a request was scored; a failure is logged, never returned to the caller."""
+    try:
+        hook(*args)
+    except Exception as e:
+        metrics.counter("monitoring_errors_total", "Shadow-scoring/drift hooks that raised",
+                        labels={"hook": hook.__qualname__}).inc()
+        logging.warning(f"{hook.__qualname__} failed: {e}")
+
+def _count_error(endpoint):
+    metrics.counter("prediction_errors_total", "Requests that failed to produce a prediction",
+                    labels={"endpoint": endpoint}).inc()
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    if endpoint != "/metrics":
+        elapsed_ms = (time.perf_counter() - g.get("request_start", time.perf_counter())) * 1000
+        metrics.histogram("http_request_duration_ms", "Request latency by endpoint",
+                          labels={"endpoint": endpoint}).observe(elapsed_ms)
+        metrics.counter("http_requests_total", "Requests by endpoint, method and status", labels={
+            "endpoint": endpoint, "method": request.method, "status": str(response.status_code),
+        }).inc()
+    return response
+
 # --- FIELD MAPPING for 11 Features ---
 
 FIELD_MAPPING = {
@@ -45,7 +132,7 @@ def predict_datapoint():
                 raw_value = request.form.get(html_key)
 
                 # Handle categorical features
-                if class_key in ['person_home_ownership', 'loan_intent', 'loan_grade', 'cb_person_default_on_file']:
+                if class_key in NOMINAL_FEATURES:
                     # Ensure categorical values are stripped or explicitly None
                     form_data[class_key] = raw_value.strip() if raw_value else None
                     if form_data[class_key] is None:
@@ -57,9 +144,9 @@ def predict_datapoint():
                 safe_value = None
                 if raw_value and raw_value.strip() != "":
                     try:
-                        if class_key in ['person_age', 'person_income', 'loan_amnt', 'cb_person_cred_hist_length']:
+                        if class_key in INTEGER_FIELDS:
                             safe_value = int(float(raw_value.strip()))
-                        elif class_key in ['person_emp_length', 'loan_int_rate', 'loan_percent_income']:
+                        else:
                             safe_value = float(raw_value.strip())
                     except ValueError:
                         # Type conversion failed
@@ -72,32 +159,43 @@ def predict_datapoint():
                 form_data[class_key] = safe_value
 
 
-            # 2. Instantiate CustomData and convert to DataFrame
+            # 2. Instantiate the CustomData record (no DataFrame: scored through the pandas-free path)
             # Note: CustomData validation relies on the error checks above to ensure no Nones or bad types reach it.
             data = CustomData(**form_data)
-            pred_df = data.get_data_as_dataframe()
-            logging.info(f"Input Data for Prediction (Cleaned):\n{pred_df.to_dict()}")
+            log_payload(request_log, "Input Data for Prediction (Cleaned):", data)
+
+            # 3. Run Prediction Pipeline (or reuse the cached decision for a re-submitted application)
+            prediction, pd_score = _score_applicant(data)
+            pd_score = float(pd_score)
+            _run_monitoring(shadow_scorer.submit, [data], [prediction], [pd_score])
+            _run_monitoring(drift_monitor.observe, data, pd_score)
+            _count_predictions([prediction])
+            threshold = predict_pipeline.get_threshold()
+            cut_off = f"{threshold:.1%}" if threshold is not None else "50%"
 
-            # 3. Run Prediction Pipeline
-            predict_pipeline = PredictPipeline()
-            results = predict_pipeline.predict(pred_df)
-            prediction = results[0]
+            # Adverse-action reason codes for declined applications (top REASON_CODES_TOP_K fields)
+            reasons = None
+            if prediction == 1 and predict_pipeline.reason_code_config.top_k > 0:
+                reasons = predict_pipeline.explain_records([data])
+                reasons = reasons[0] if reasons else None
 
             # 4. Financial Interpretation
             if prediction == 1:
-                recommendation = "REJECT LOAN: High Risk of Default (PD = 1)"
+                recommendation = f"REJECT LOAN: High Risk of Default (PD = {pd_score:.1%}, cost-optimal cut-off {cut_off})"
                 cost_impact = "Warning: Approving this loan carries a significant **5x Misclassification Cost** (False Negative risk)."
             else:
-                recommendation = "APPROVE LOAN: Low Risk of Default (PD = 0)"
+                recommendation = f"APPROVE LOAN: Low Risk of Default (PD = {pd_score:.1%}, cost-optimal cut-off {cut_off})"
                 cost_impact = "Expected Loss is minimized. Recommendation aligns with **1x Misclassification Cost** (False Positive risk)."
 
             # 5. Render Results
             return render_template('home.html',
                                  results=recommendation,
-                                 prediction_status=cost_impact)
+                                 prediction_status=cost_impact,
+                                 reasons=reasons)
 
         except Exception as e:
             # --- Enhanced Error Debugging ---
+            _count_error('/predictdata')
             tb_str = traceback.format_exc()
             # Log the full traceback to the custom logger (and stdout, if logger.py is fixed)
             logging.error(f"Prediction failed with error:\n{tb_str}") 
@@ -108,6 +206,118 @@ def predict_datapoint():
                 prediction_status=tb_str  # full traceback for internal debugging
             )
 
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Scores many applicants in one request.
+    Accepts a JSON array of objects keyed by PredictPipeline.REQUIRED_COLUMNS (or {"applications": [...]}),
+    an uploaded CSV file in the 'file' form field, or a raw text/csv body.
+    ?reasons=k adds the top k reason codes (per-feature contributions) to every scored row.
+    """
+    try:
+        # 1. Parse the payload into a raw (unvalidated) DataFrame
+        if 'file' in request.files:
+            raw_df = pd.read_csv(request.files['file'], dtype=str, keep_default_na=False)
+        elif request.mimetype == 'text/csv':
+            raw_df = pd.read_csv(io.BytesIO(request.get_data()), dtype=str, keep_default_na=False)
+        else:
+            payload = request.get_json(silent=True)
+            if isinstance(payload, dict):
+                payload = payload.get('applications')
+            if not isinstance(payload, list):
+                return jsonify({'error': "Expected a JSON array of applications or a CSV upload in field 'file'."}), 400
+            if not all(isinstance(row, dict) for row in payload):
+                return jsonify({'error': 'Every JSON application must be an object.'}), 400
+            raw_df = pd.DataFrame.from_records(payload)
+
+        # 2. Validate + score the whole batch (per-row errors do not fail the batch)
+        results = predict_pipeline.predict_batch(raw_df, top_k=request.args.get('reasons', default=0, type=int))
+        scored = [row for row in results if 'prediction' in row]
+        n_scored = len(scored)
+        if n_scored:
+            _count_predictions([row['prediction'] for row in scored])
+            _run_monitoring(shadow_scorer.submit, raw_df, [row['prediction'] for row in scored],
+                            [row['pd'] for row in scored])
+            _run_monitoring(drift_monitor.observe_frame, raw_df.iloc[[row['row'] for row in scored]],
+                            [row['pd'] for row in scored])
+        request_log.info(f"Batch prediction: {len(results)} rows, {n_scored} scored, {len(results) - n_scored} rejected by validation")
+
+        return jsonify({
+            'n_rows': len(results),
+            'n_scored': n_scored,
+            'n_failed': len(results) - n_scored,
+            'results': results,
+        })
+
+    except ValueError as e:
+        # Unusable payload (missing columns, unparseable CSV): the validation message is the whole answer
+        _count_error('/predict/batch')
+        logging.warning(f"Batch prediction rejected: {e}")
+        return jsonify({'error': str(e)}), 400
+    except CustomException as e:
+        # The exception text carries script paths and line numbers: logged, not returned
+        _count_error('/predict/batch')
+        logging.error(f"Batch prediction failed: {e}")
+        return jsonify({'error': 'Batch prediction failed.'}), 500
+    except Exception as e:
+        _count_error('/predict/batch')
+        logging.error(f"Batch prediction failed with error:\n{traceback.format_exc()}")
+        return jsonify({'error': 'Batch prediction failed.'}), 500
+
+@app.route('/artifacts/status', methods=['GET'])
+def artifact_status():
+    """Reports cached artifact versions, load times and cache hits for this worker."""
+    return jsonify(predict_pipeline.registry.stats())
+
+@app.route('/predict/batcher/status', methods=['GET'])
+def batcher_status():
+    """Reports micro-batcher queue depth, batch size and wait-time histograms for this worker."""
+    return jsonify(predict_batcher.stats())
+
+@app.route('/predict/cache/status', methods=['GET'])
+def prediction_cache_status():
+    """Reports prediction cache size, hit ratio, evictions and invalidations for this worker."""
+    return jsonify(prediction_cache.stats())
+
+@app.route('/predict/shadow/status', methods=['GET'])
+def shadow_status():
+    """Reports shadow challengers, pending/dropped requests and the shadow log location for this worker."""
+    return jsonify(shadow_scorer.stats())
+
+@app.route('/monitoring/drift', methods=['GET'])
+def drift_status():
+    """
+    PSI/KS of this worker's recent applicants and PD scores vs the training reference.
+    ?window=seconds narrows the window (default and maximum DRIFT_WINDOW_SECONDS).
+    """
+    return jsonify(drift_monitor.report(request.args.get('window', default=None, type=float)))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Prometheus text exposition of this worker: request latency/counters, per-stage predict
+    spans, micro-batcher histograms, prediction-class counts and the serving model version.
+    """
+    lines = [metrics.render_prometheus()]
+    try:
+        version = predict_pipeline.artifacts().entries['model'].version
+        summary = load_json(predict_pipeline.threshold_path) if os.path.exists(predict_pipeline.threshold_path) else {}
+        labels = 'model="{}",version="{}",threshold="{}"'.format(
+            summary.get('model', 'unknown'), version, summary.get('threshold', ''))
+        lines.append("# HELP model_info Model currently served by this worker\n"
+                     "# TYPE model_info gauge\n"
+                     f"model_info{{{labels}}} 1\n")
+    except CustomException:
+        pass  # no model trained yet: serve the request metrics alone
+    registry_stats = predict_pipeline.registry.stats()
+    lines.append("# HELP artifact_cache_hits_total Artifact registry cache hits\n"
+                 "# TYPE artifact_cache_hits_total counter\n"
+                 f"artifact_cache_hits_total {registry_stats['hits']}\n"
+                 "# HELP artifact_cache_misses_total Artifact registry cache misses (loads)\n"
+                 "# TYPE artifact_cache_misses_total counter\n"
+                 f"artifact_cache_misses_total {registry_stats['misses']}\n")
+    return Response("".join(lines), mimetype='text/plain; version=0.0.4')
+
 # CRITICAL FIX 1: Corrected __main__ magic variable
 if __name__ == "__main__":
     app.run(host="0.0.0.0", debug=True)
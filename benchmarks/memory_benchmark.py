@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import multiprocessing
+
+from src.exception import CustomException
+from src.logger import logging
+
+PLANS = ('wide', 'compact')
+STAGES = ('ingestion', 'transformation', 'training')
+
+
+def _plan_worker(plan: str, data_path: str, model_names: list, results):
+    """
+    One training run under `plan` in a fresh process: DTYPE_PLAN is read at import time, and a
+    fresh process keeps the peak RSS of one plan from hiding behind the other's.
+    """
+    os.environ['DTYPE_PLAN'] = plan
+    from benchmarks.run_benchmarks import measure
+    from src.components.data_ingestion import DataIngestion
+    from src.components.data_transformation import DataTransformation
+    from src.components.model_trainer import ModelTrainer
+
+    metrics = {}
+    with tempfile.TemporaryDirectory(prefix=f'credit_risk_memory_{plan}_') as work_dir:
+        # Components write to relative 'artifacts/' paths: run them inside the scratch dir
+        os.chdir(work_dir)
+        with measure(metrics, 'ingestion'):
+            train_path, test_path = DataIngestion().initiate_data_ingestion(data_path)
+        with measure(metrics, 'transformation'):
+            X_train, y_train, X_test, y_test, _ = \
+                DataTransformation().initiate_data_transformation(train_path, test_path)
+        trainer = ModelTrainer()
+        models = {name: model for name, model in trainer.get_models().items() if name in model_names}
+        with measure(metrics, 'training'):
+            trainer.initiate_model_trainer(X_train, y_train, X_test, y_test, models=models)
+        metrics['training.cost_per_1k'] = {
+            name: round(1000.0 * report['Total Cost'] / len(y_test), 3) for name, report in trainer.model_report.items()
+        }
+    results.put(metrics)
+
+
+def run_plan(plan: str, data_path: str, model_names: list) -> dict:
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    worker = context.Process(target=_plan_worker, args=(plan, data_path, model_names, results))
+    worker.start()
+    metrics = results.get()
+    worker.join()
+    return metrics
+
+
+def run_memory_benchmark(row_counts: list, model_names: list, seed: int = 42) -> dict:
+    """
+    Peak RSS of ingestion, transformation and training under the wide and compact dtype plans
+    on the same synthetic dataset, for each row count.
+    :return: {rows: {'wide': metrics, 'compact': metrics, 'peak_rss_reduction_pct': {stage: %}, ...}}
+    """
+    from benchmarks.synthetic_data import generate_synthetic_data, SOURCE_DATA_PATH
+
+    try:
+        report = {}
+        source_path = os.path.abspath(SOURCE_DATA_PATH)
+        for n_rows in row_counts:
+            with tempfile.TemporaryDirectory(prefix='credit_risk_memory_data_') as data_dir:
+                data_path = generate_synthetic_data(os.path.join(data_dir, 'synthetic.csv'), n_rows,
+                                                    seed=seed, source_path=source_path)
+                runs = {plan: run_plan(plan, data_path, model_names) for plan in PLANS}
+            # Peak RSS includes the interpreter and libraries; the delta is what the stage itself added
+            for measure_name in ('peak_rss', 'delta_rss'):
+                runs[f'{measure_name}_reduction_pct'] = {
+                    stage: round(100.0 * (1 - runs['compact'][f'{stage}.{measure_name}_mb']
+                                          / max(runs['wide'][f'{stage}.{measure_name}_mb'], 1e-9)), 1)
+                    for stage in STAGES
+                }
+            logging.info(f"Memory benchmark {n_rows} rows: peak RSS reduction {runs['peak_rss_reduction_pct']}, "
+                         f"stage RSS growth reduction {runs['delta_rss_reduction_pct']}")
+            report[str(n_rows)] = runs
+        return report
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak training memory of the compact vs wide column dtype plans.")
+    parser.add_argument("--rows", default="1000000,10000000", help="Comma-separated synthetic dataset sizes.")
+    parser.add_argument("--models", default="XGBoost", help="Comma-separated ModelTrainer models to train.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="Also write the report to this JSON file.")
+    args = parser.parse_args()
+
+    report = run_memory_benchmark(
+        [int(n) for n in args.rows.split(',') if n.strip()],
+        [name.strip() for name in args.models.split(',') if name.strip()],
+        args.seed,
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.parallelism import PROFILES
+
+
+def _serve_worker(profile_name: str, rows_path: str, n_requests: int, start_barrier, results):
+    """One serving worker: loads the artifacts under `profile_name`, then scores single rows back to back."""
+    from src.parallelism import configure_process
+    from src.pipeline.predict_pipeline import PredictPipeline
+    from src.utils import load_frame
+
+    configure_process(profile_name)
+    pipeline = PredictPipeline()
+    rows = load_frame(rows_path)
+    pipeline.predict_with_scores(rows.head(1))  # warm the artifact cache
+
+    start_barrier.wait()
+    latencies = []
+    for i in range(n_requests):
+        row = rows.iloc[[i % len(rows)]]
+        start = time.perf_counter()
+        pipeline.predict_with_scores(row)
+        latencies.append(time.perf_counter() - start)
+    results.put(latencies)
+
+
+def run_profile(profile_name: str, rows_path: str, n_workers: int, n_requests: int) -> dict:
+    """
+    Starts `n_workers` processes with the given profile (like gunicorn workers) that score
+    `n_requests` single rows each at the same time.
+    :return: Latency percentiles (ms) over all requests and the aggregate throughput.
+    """
+    context = multiprocessing.get_context('spawn')
+    start_barrier = context.Barrier(n_workers + 1)
+    results = context.Queue()
+    workers = [
+        context.Process(target=_serve_worker, args=(profile_name, rows_path, n_requests, start_barrier, results))
+        for _ in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    latencies = [latency for _ in workers for latency in results.get()]
+    seconds = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        'workers': n_workers,
+        'requests': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+        'requests_per_sec': round(len(latencies) / seconds, 1),
+    }
+
+
+def run_parallelism_benchmark(profiles: list, worker_counts: list, n_requests: int, rows_path: str) -> dict:
+    """Single-row DataFrame scoring latency of the current artifacts, per profile and number of concurrent workers."""
+    try:
+        report = {'cpu_count': os.cpu_count(), 'profiles': {}}
+        for name in profiles:
+            report['profiles'][name] = {'settings': vars(PROFILES[name]), 'runs': []}
+            for n_workers in worker_counts:
+                run = run_profile(name, rows_path, n_workers, n_requests)
+                logging.info(f"Parallelism benchmark '{name}' x{n_workers}: {run}")
+                report['profiles'][name]['runs'].append(run)
+        return report
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    from src.components.data_ingestion import DataIngestionConfig
+
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Serving latency under concurrent load for each parallelism profile.")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="Comma-separated profile names.")
+    parser.add_argument("--workers", default=f"1,{cpu_count},{2 * cpu_count}",
+                        help="Comma-separated numbers of concurrent worker processes.")
+    parser.add_argument("--requests", type=int, default=500, help="Single-row requests per worker.")
+    parser.add_argument("--rows", default=DataIngestionConfig.test_data_path, help="Applicants to score (target column ignored).")
+    parser.add_argument("--output", default="", help="Also write the report to this JSON file.")
+    args = parser.parse_args()
+
+    report = run_parallelism_benchmark(
+        [name.strip() for name in args.profiles.split(',') if name.strip()],
+        sorted({int(n) for n in args.workers.split(',') if n.strip()}),
+        args.requests,
+        args.rows,
+    )
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
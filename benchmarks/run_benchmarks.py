@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+import resource
+from contextlib import contextmanager
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+
+# A metric regresses when it is worse than the baseline by more than the relative tolerance
+# AND by more than this absolute amount (keeps millisecond-level noise out of the report).
+MIN_ABSOLUTE_DELTA = {'seconds': 0.05, 'mb': 10.0, 'ms': 0.2, 'per_sec': 0.0}
+
+
+# --- Measurement helpers ---
+
+def _current_rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except OSError:
+        # Not Linux: lifetime peak is the best available approximation
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+class PeakMemorySampler:
+    """Samples this process's RSS on a background thread and keeps the peak."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = _current_rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _current_rss_mb())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _current_rss_mb())
+
+
+@contextmanager
+def measure(results: dict, stage: str):
+    """Records `<stage>.seconds`, `<stage>.peak_rss_mb` and `<stage>.delta_rss_mb` into `results`."""
+    with PeakMemorySampler() as sampler:
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+    results[f'{stage}.seconds'] = round(seconds, 4)
+    results[f'{stage}.peak_rss_mb'] = round(sampler.peak_mb, 1)
+    results[f'{stage}.delta_rss_mb'] = round(sampler.peak_mb - sampler.start_mb, 1)
+    logging.info(f"Benchmark {stage}: {seconds:.3f}s, peak RSS {sampler.peak_mb:.1f} MB")
+
+
+def _latency_percentiles(results: dict, prefix: str, latencies_s: list):
+    latencies_ms = np.asarray(latencies_s) * 1000
+    results[f'{prefix}.p50_ms'] = round(float(np.percentile(latencies_ms, 50)), 4)
+    results[f'{prefix}.p99_ms'] = round(float(np.percentile(latencies_ms, 99)), 4)
+
+
+# --- Benchmark run ---
+
+def run_benchmarks(n_rows: int, model_names: list = None, n_latency: int = 1000,
+                   batch_size: int = 10_000, seed: int = 42, portfolio_scenarios: int = 20_000) -> dict:
+    """
+    Generates `n_rows` synthetic applications and measures every training stage (time + peak
+    RSS), single-row serving latency (p50/p99), batch scoring throughput and the Monte Carlo
+    portfolio simulation rate (scenarios/sec over the `batch_size` book).
+    All artifacts are written to a scratch directory; artifacts/ is left untouched.
+    :return: {'meta': {...}, 'metrics': {flat metric name: value}}
+    """
+    # Imported lazily so `--help` and baseline comparison do not load the model stack
+    import sklearn
+    import xgboost
+    import pandas as pd
+    from benchmarks.synthetic_data import generate_synthetic_data, SOURCE_DATA_PATH
+    from src.components.data_ingestion import DataIngestion
+    from src.components.data_transformation import DataTransformation
+    from src.components.model_trainer import ModelTrainer
+    from src.components.model_compiler import ModelCompiler
+    from src.components.reason_codes import ReasonCodeBuilder
+    from src.pipeline.predict_pipeline import PredictPipeline
+    from src.pipeline.portfolio_simulation import PortfolioSimulator, PortfolioSimulationConfig
+    from src.utils import load_frame
+    from src.schema import APPLICANT_FIELDS
+
+    metrics = {}
+    source_path = os.path.abspath(SOURCE_DATA_PATH)
+    original_cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory(prefix='credit_risk_bench_') as work_dir:
+            # Components write to relative 'artifacts/' paths: run them inside the scratch dir
+            os.chdir(work_dir)
+            data_path = os.path.join(work_dir, 'synthetic.csv')
+
+            with measure(metrics, 'generate'):
+                generate_synthetic_data(data_path, n_rows, seed=seed, source_path=source_path)
+
+            with measure(metrics, 'ingestion'):
+                train_path, test_path = DataIngestion().initiate_data_ingestion(data_path)
+
+            with measure(metrics, 'transformation'):
+                X_train, y_train, X_test, y_test, preprocessor_path = \
+                    DataTransformation().initiate_data_transformation(train_path, test_path)
+
+            trainer = ModelTrainer()
+            models = trainer.get_models()
+            if model_names:
+                models = {name: models[name] for name in model_names}
+            with measure(metrics, 'training'):
+                best_model_name, best_cost = trainer.initiate_model_trainer(
+                    X_train, y_train, X_test, y_test, models=models
+                )
+            for name, report in trainer.model_report.items():
+                key = name.lower().replace(' ', '_')
+                metrics[f'training.{key}.seconds'] = report['Wall Time (s)']
+                metrics[f'training.{key}.cost_per_1k'] = round(1000.0 * report['Total Cost'] / len(y_test), 3)
+
+            with measure(metrics, 'compilation'):
+                ModelCompiler().initiate_model_compilation(
+                    preprocessor_path, trainer.model_trainer_config.trained_model_file_path
+                )
+
+            with measure(metrics, 'reason_codes'):
+                ReasonCodeBuilder().initiate_reason_codes(
+                    preprocessor_path, trainer.model_trainer_config.trained_model_file_path, train_path
+                )
+
+            # --- Serving ---
+            pipeline = PredictPipeline()
+            test_df = load_frame(test_path).drop(columns=['loan_status'])
+            test_df = test_df.dropna().reset_index(drop=True)
+            single_rows = test_df.sample(min(n_latency, len(test_df)), random_state=seed, replace=len(test_df) < n_latency)
+            pipeline.predict_with_scores(single_rows.head(1))  # warm the artifact cache
+
+            latencies = []
+            for i in range(len(single_rows)):
+                row = single_rows.iloc[[i]]
+                start = time.perf_counter()
+                pipeline.predict_with_scores(row)
+                latencies.append(time.perf_counter() - start)
+            _latency_percentiles(metrics, 'serving.single_row_dataframe', latencies)
+
+            # Same rows with the top-3 reason codes: the difference to single_row_dataframe is the added cost
+            latencies = []
+            for i in range(len(single_rows)):
+                row = single_rows.iloc[[i]]
+                start = time.perf_counter()
+                pipeline.predict_with_reasons(row, top_k=3)
+                latencies.append(time.perf_counter() - start)
+            _latency_percentiles(metrics, 'serving.single_row_reasons', latencies)
+
+            records = pipeline.to_applicant_array(single_rows[list(APPLICANT_FIELDS)].astype(object).itertuples(index=False))
+            latencies = []
+            for i in range(len(records)):
+                record = records[i:i + 1]
+                start = time.perf_counter()
+                pipeline.predict_records(record)
+                latencies.append(time.perf_counter() - start)
+            _latency_percentiles(metrics, 'serving.single_row_record', latencies)
+
+            batch = test_df.sample(batch_size, random_state=seed, replace=len(test_df) < batch_size)
+            with measure(metrics, 'serving.batch_dataframe'):
+                pipeline.predict_with_scores(batch)
+            metrics['serving.batch_dataframe.rows_per_sec'] = round(batch_size / metrics['serving.batch_dataframe.seconds'], 1)
+
+            with measure(metrics, 'serving.batch_reasons'):
+                pipeline.predict_with_reasons(batch, top_k=3)
+            metrics['serving.batch_reasons.rows_per_sec'] = round(batch_size / metrics['serving.batch_reasons.seconds'], 1)
+
+            batch_records = pipeline.to_applicant_array(batch[list(APPLICANT_FIELDS)].astype(object).itertuples(index=False))
+            with measure(metrics, 'serving.batch_record'):
+                pipeline.predict_records(batch_records)
+            metrics['serving.batch_record.rows_per_sec'] = round(batch_size / metrics['serving.batch_record.seconds'], 1)
+
+            # --- Portfolio simulation (book scored once, then correlated-default scenarios) ---
+            simulator = PortfolioSimulator(PortfolioSimulationConfig(n_scenarios=portfolio_scenarios, seed=seed), pipeline)
+            with measure(metrics, 'portfolio'):
+                portfolio = simulator.simulate(batch)
+            metrics['portfolio.scenarios_per_sec'] = portfolio['scenarios_per_sec']
+
+        meta = {
+            'rows': n_rows,
+            'models': list(models),
+            'best_model': best_model_name,
+            'best_cost': int(best_cost),
+            'n_latency': n_latency,
+            'batch_size': batch_size,
+            'portfolio_scenarios': portfolio_scenarios,
+            'seed': seed,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'sklearn': sklearn.__version__,
+            'xgboost': xgboost.__version__,
+            'cpu_count': os.cpu_count(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        return {'meta': meta, 'metrics': metrics}
+
+    except Exception as e:
+        raise CustomException(e, sys)
+    finally:
+        os.chdir(original_cwd)
+
+
+# --- Baseline comparison ---
+
+def _unit(metric: str) -> str:
+    for unit in ('per_sec', 'seconds', 'mb', 'ms'):
+        if metric.endswith(unit):
+            return unit
+    return ''
+
+
+def compare_with_baseline(current: dict, baseline: dict, tolerance: float = 0.2) -> list:
+    """
+    Compares flat metrics of two runs. Throughput (`*_per_sec`) is better when higher; time,
+    latency and memory are better when lower; other metrics (e.g. cost) are reported only.
+    :return: List of row dicts with 'metric', 'baseline', 'current', 'change' and 'status'.
+    """
+    rows = []
+    for metric in sorted(set(current['metrics']) & set(baseline['metrics'])):
+        old, new = baseline['metrics'][metric], current['metrics'][metric]
+        unit = _unit(metric)
+        change = (new - old) / old if old else 0.0
+        status = 'ok'
+        if unit and metric.split('.')[-1] != 'delta_rss_mb':
+            worse_by = (old - new) if unit == 'per_sec' else (new - old)
+            if worse_by > MIN_ABSOLUTE_DELTA[unit] and abs(change) > tolerance:
+                status = 'REGRESSION'
+            elif -worse_by > MIN_ABSOLUTE_DELTA[unit] and abs(change) > tolerance:
+                status = 'improved'
+        rows.append({'metric': metric, 'baseline': old, 'current': new, 'change': change, 'status': status})
+    return rows
+
+
+def _print_comparison(rows: list):
+    print(f"{'metric':<48} {'baseline':>12} {'current':>12} {'change':>8}  status")
+    for row in rows:
+        print(f"{row['metric']:<48} {row['baseline']:>12} {row['current']:>12} {row['change']:>+8.1%}  {row['status']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark training stages and serving latency on synthetic data.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Synthetic dataset size.")
+    parser.add_argument("--models", default="", help="Comma-separated subset of ModelTrainer models (default: all).")
+    parser.add_argument("--latency-samples", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--portfolio-scenarios", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="", help="Also write this run's results to this JSON file.")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative change counted as a regression.")
+    args = parser.parse_args()
+
+    model_names = [name.strip() for name in args.models.split(',') if name.strip()]
+    result = run_benchmarks(args.rows, model_names, args.latency_samples, args.batch_size, args.seed,
+                            args.portfolio_scenarios)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    exit_code = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparable = all(baseline['meta'].get(k) == result['meta'][k] for k in ('rows', 'models', 'batch_size'))
+        if not comparable:
+            print("WARNING: baseline was recorded with different rows/models/batch size; comparison is indicative only.")
+        rows = compare_with_baseline(result, baseline, args.tolerance)
+        _print_comparison(rows)
+        exit_code = 1 if any(row['status'] == 'REGRESSION' for row in rows) else 0
+    else:
+        print(json.dumps(result, indent=2))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(result, f, indent=2)
+        logging.info(f"Saved benchmark baseline to {args.baseline}")
+
+    sys.exit(exit_code)
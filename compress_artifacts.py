@@ -1,18 +1,34 @@
 import os
 import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
 import joblib
 
 # Import custom project utilities (assuming PYTHONPATH is set up correctly)
 try:
-    from src.utils import load_object
+    from src.utils import load_object, save_object, ARTIFACT_FORMATS
     from src.logger import logging
 except ImportError:
     print("FATAL: Could not import project utilities. Ensure src/ is a package and PYTHONPATH is set.")
     sys.exit(1)
 
+MODEL_PATH = 'artifacts/model.pkl'
+PREPROCESSOR_PATH = 'artifacts/preprocessor.pkl'
+# The compiled scorer is .npz in the gzip layout and memory-mappable joblib in the mmap layout
+COMPILED_SCORER_FILES = {'gzip': 'compiled_scorer.npz', 'mmap': 'compiled_scorer.joblib'}
+# What a serving worker loads at start-up (the benchmarked artifacts)
+LOADED_ARTIFACTS = ('model', 'preprocessor', 'compiled_scorer')
+
+
 def compress_artifacts(model_path, preprocessor_path):
     """
-    Loads model and preprocessor artifacts and saves them back with GZIP compression.
+    Rewrites model and preprocessor artifacts (and the compiled scorer, if present) with GZIP compression.
+    Same as convert_artifacts('gzip'): each artifact is fully loaded before it is atomically replaced,
+    so memory-mapped (mmap format) files are never overwritten while mapped.
     """
     if not os.path.exists(model_path) or not os.path.exists(preprocessor_path):
         logging.error("Artifact files not found. Run training_pipeline.py first.")
@@ -20,24 +36,175 @@ def compress_artifacts(model_path, preprocessor_path):
 
     try:
         logging.info("Starting artifact compression using joblib...")
-        
-        # 1. Load artifacts first (using the load_object defined in src/utils.py)
-        model = load_object(model_path)
-        preprocessor = load_object(preprocessor_path)
-
-        # 2. Save with GZIP compression (level 3 is a good balance of speed/ratio)
-        joblib.dump(model, model_path, compress=('gzip', 3))
-        joblib.dump(preprocessor, preprocessor_path, compress=('gzip', 3))
-        
-        logging.info("Compression complete. Artifacts overwritten with GZIP compression (level 3).")
-        
+        written = convert_artifacts('gzip', model_path, preprocessor_path)
+        logging.info(f"Compression complete. Artifacts rewritten with GZIP compression (level 3): {written}")
+
     except Exception as e:
         logging.error(f"Error during artifact compression: {e}")
         sys.exit(1)
 
+
+def convert_artifacts(target_format, model_path=MODEL_PATH, preprocessor_path=PREPROCESSOR_PATH, artifacts_dir=None):
+    """
+    Rewrites model/preprocessor (and the compiled scorer and reason-code explainer, if present) in `target_format`.
+    'mmap' stores them uncompressed so load_object memory-maps their arrays. The rewrite changes the
+    model/preprocessor file digests, so a scorer/explainer built from the old files is re-stamped
+    with the new ones (one built from other files stays stale).
+    :param artifacts_dir: Optional directory to write into instead of converting in place.
+    :return: {artifact name: written path}
+    """
+    # Imported here: the compiler pulls in the full model stack, which plain compression does not need
+    from src.components.model_compiler import CompiledScorer, stamp_source_digests
+    from src.components.reason_codes import ReasonCodeConfig
+    from src.pipeline.stage_cache import source_digests
+
+    old_digests = source_digests(model_path, preprocessor_path)
+    written = {}
+    for name, path in (('model', model_path), ('preprocessor', preprocessor_path)):
+        out_path = os.path.join(artifacts_dir, os.path.basename(path)) if artifacts_dir else path
+        # Materialize fully before rewriting, the file may be memory-mapped right now
+        save_object(out_path, joblib.load(path), artifact_format=target_format)
+        written[name] = out_path
+    new_digests = source_digests(written['model'], written['preprocessor'])
+
+    source_dir = os.path.dirname(model_path)
+    scorers = []
+    for scorer_file in COMPILED_SCORER_FILES.values():
+        scorer_path = os.path.join(source_dir, scorer_file)
+        if not os.path.exists(scorer_path):
+            continue
+        if scorer_path.endswith('.npz'):
+            import numpy as np
+            with np.load(scorer_path, allow_pickle=False) as data:
+                arrays = {key: data[key] for key in data.files}
+        else:
+            arrays = {key: value.copy() for key, value in joblib.load(scorer_path).items()}
+        scorers.append(arrays)
+    # An earlier conversion leaves the other layout's scorer behind: prefer the one built from these files
+    current = [arrays for arrays in scorers if json.loads(str(arrays['meta'])).get('source_digests') == old_digests]
+    if current:
+        current[0]['meta'] = stamp_source_digests(current[0]['meta'], new_digests)
+    if scorers:
+        out_path = os.path.join(artifacts_dir or source_dir, COMPILED_SCORER_FILES[target_format])
+        CompiledScorer.save(out_path, current[0] if current else scorers[0])
+        written['compiled_scorer'] = out_path
+
+    explainer_path = os.path.join(source_dir, os.path.basename(ReasonCodeConfig().explainer_file_path))
+    if os.path.exists(explainer_path):
+        explainer = joblib.load(explainer_path)
+        if explainer.source_digests == old_digests:
+            explainer.source_digests = new_digests
+        out_path = os.path.join(artifacts_dir or source_dir, os.path.basename(explainer_path))
+        save_object(out_path, explainer, artifact_format=target_format)
+        written['reason_codes'] = out_path
+
+    logging.info(f"Converted artifacts to '{target_format}' format: {written}")
+    return written
+
+
+# --- Benchmark: load time and memory of each format in concurrent worker processes ---
+
+def _memory_mb() -> dict:
+    """RSS, PSS (shared pages divided among the processes mapping them) and private memory, in MB."""
+    stats = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if parts[0] in ('Rss:', 'Pss:', 'Private_Clean:', 'Private_Dirty:'):
+                    stats[parts[0][:-1]] = int(parts[1]) / 1024
+        return {
+            'rss_mb': round(stats['Rss'], 1),
+            'pss_mb': round(stats['Pss'], 1),
+            'private_mb': round(stats['Private_Clean'] + stats['Private_Dirty'], 1),
+        }
+    except OSError:
+        # Not Linux: fall back to peak RSS only
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {'rss_mb': round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)}
+
+
+def _benchmark_worker(paths, barrier, results):
+    """Loads the artifacts like a freshly started gunicorn worker would and reports the cost."""
+    from src.components.model_compiler import CompiledScorer
+    import src.components.model_trainer  # noqa: F401  (model classes imported up front, not timed)
+
+    before = _memory_mb()
+    start = time.perf_counter()
+    loaded = [load_object(paths['model']), load_object(paths['preprocessor'])]
+    if 'compiled_scorer' in paths:
+        loaded.append(CompiledScorer.load(paths['compiled_scorer']))
+    load_ms = (time.perf_counter() - start) * 1000
+
+    # Measure while every worker holds its artifacts, so PSS reflects the sharing
+    barrier.wait()
+    after = _memory_mb()
+    barrier.wait()
+    results.put({
+        'load_ms': round(load_ms, 1),
+        **after,
+        'delta_rss_mb': round(after['rss_mb'] - before['rss_mb'], 1),
+        **({'delta_private_mb': round(after['private_mb'] - before['private_mb'], 1)} if 'private_mb' in after else {}),
+    })
+
+
+def benchmark_formats(n_workers=4, model_path=MODEL_PATH, preprocessor_path=PREPROCESSOR_PATH):
+    """
+    Converts the artifacts to every format in a scratch directory, loads them in `n_workers`
+    concurrent processes, and reports load time and memory per worker.
+    :return: {format: {'file_mb': ..., 'workers': [per-worker stats], 'mean': {...}}}
+    """
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    with tempfile.TemporaryDirectory(prefix='artifact_bench_') as tmp_dir:
+        for artifact_format in ARTIFACT_FORMATS:
+            format_dir = os.path.join(tmp_dir, artifact_format)
+            os.makedirs(format_dir)
+            paths = convert_artifacts(artifact_format, model_path, preprocessor_path, artifacts_dir=format_dir)
+
+            barrier, results = context.Barrier(n_workers), context.Queue()
+            workers = [context.Process(target=_benchmark_worker, args=(paths, barrier, results))
+                       for _ in range(n_workers)]
+            for worker in workers:
+                worker.start()
+            stats = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+
+            report[artifact_format] = {
+                'file_mb': round(sum(os.path.getsize(paths[name]) for name in LOADED_ARTIFACTS if name in paths) / 1024 ** 2, 2),
+                'workers': stats,
+                'mean': {key: round(sum(s[key] for s in stats) / len(stats), 1) for key in stats[0]},
+            }
+            logging.info(f"Format '{artifact_format}': {report[artifact_format]['file_mb']} MB on disk, "
+                         f"per-worker mean {report[artifact_format]['mean']}")
+            shutil.rmtree(format_dir, ignore_errors=True)
+    return report
+
+
 if __name__ == "__main__":
-    MODEL_PATH = 'artifacts/model.pkl'
-    PREPROCESSOR_PATH = 'artifacts/preprocessor.pkl'
-    
-    # Execute compression
-    compress_artifacts(MODEL_PATH, PREPROCESSOR_PATH)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Compress, convert or benchmark the serving artifacts.")
+    parser.add_argument("mode", nargs="?", default="compress", choices=["compress", "convert", "benchmark"],
+                        help="compress: re-gzip in place (default, same as convert --format gzip); "
+                             "convert: rewrite in --format; "
+                             "benchmark: compare load time and per-worker memory of all formats")
+    parser.add_argument("--format", choices=ARTIFACT_FORMATS, default="mmap", help="Target format for 'convert'.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent worker processes for 'benchmark'.")
+    parser.add_argument("--artifacts-dir", default="artifacts", help="Directory holding model.pkl/preprocessor.pkl.")
+    args = parser.parse_args()
+    MODEL_PATH = os.path.join(args.artifacts_dir, "model.pkl")
+    PREPROCESSOR_PATH = os.path.join(args.artifacts_dir, "preprocessor.pkl")
+
+    if args.mode == "compress":
+        # Execute compression
+        compress_artifacts(MODEL_PATH, PREPROCESSOR_PATH)
+    elif args.mode == "convert":
+        convert_artifacts(args.format, MODEL_PATH, PREPROCESSOR_PATH)
+    else:
+        report = benchmark_formats(args.workers, MODEL_PATH, PREPROCESSOR_PATH)
+        print(f"{'format':<8} {'file MB':>8} {'load ms':>8} {'RSS MB':>8} {'PSS MB':>8} {'private MB':>11}")
+        for artifact_format, result in report.items():
+            mean = result['mean']
+            print(f"{artifact_format:<8} {result['file_mb']:>8} {mean['load_ms']:>8} {mean['rss_mb']:>8} "
+                  f"{mean.get('pss_mb', '-'):>8} {mean.get('private_mb', '-'):>11}")
@@ -1,5 +1,8 @@
 import os
 import sys
+import glob
+import shutil
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from dataclasses import dataclass # Used for creating class variables easily
@@ -7,15 +10,28 @@ from dataclasses import dataclass # Used for creating class variables easily
 # Import custom libraries
 from src.exception import CustomException
 from src.logger import logging
+from src.schema import RAW_DTYPES, DATA_ARTIFACT_FORMAT
+from src.utils import data_artifact_path, save_frame
 
 # --- Configuration Class ---
 @dataclass
 class DataIngestionConfig:
     """Stores all configuration paths for data ingestion output."""
-    # Define paths for the artifacts folder (output of this component)
-    train_data_path: str = os.path.join('artifacts', "train.csv")
-    test_data_path: str = os.path.join('artifacts', "test.csv")
-    raw_data_path: str = os.path.join('artifacts', "data.csv")
+    # Define paths for the artifacts folder (output of this component).
+    # Stages exchange typed columnar files (Feather by default, see src/schema.py).
+    train_data_path: str = data_artifact_path('artifacts', "train", DATA_ARTIFACT_FORMAT)
+    test_data_path: str = data_artifact_path('artifacts', "test", DATA_ARTIFACT_FORMAT)
+    raw_data_path: str = data_artifact_path('artifacts', "data", DATA_ARTIFACT_FORMAT)
+    # Optionally also write train.csv / test.csv for inspection or external tools
+    export_csv: bool = os.getenv("EXPORT_CSV", "0") == "1"
+    # Train-test split parameters (part of the stage cache key)
+    test_size: float = 0.2
+    random_state: int = 42
+    # Out-of-core mode: stream the CSV in chunks into part files under these directories
+    streaming: bool = os.getenv("STREAMING_INGESTION", "0") == "1"
+    chunk_rows: int = int(os.getenv("STREAMING_CHUNK_ROWS", "100000"))
+    train_chunks_dir: str = os.path.join('artifacts', "train_chunks")
+    test_chunks_dir: str = os.path.join('artifacts', "test_chunks")
     
 # --- Main Ingestion Class ---
 class DataIngestion:
@@ -32,8 +48,8 @@ class DataIngestion:
         """
         logging.info("Entered the data ingestion method or component.")
         try:
-            # 1. Data Reading (Replace with your actual file path)
-            df = pd.read_csv(data_file_path)
+            # 1. Data Reading with the declared schema (no type inference)
+            df = pd.read_csv(data_file_path, dtype=RAW_DTYPES)
             logging.info('Read the dataset as a DataFrame.')
 
             # 2. Artifacts Folder Setup
@@ -41,16 +57,23 @@ class DataIngestion:
             os.makedirs(os.path.dirname(self.ingestion_config.raw_data_path), exist_ok=True)
             
             # 3. Save Raw Data (Best Practice)
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
+            save_frame(df, self.ingestion_config.raw_data_path)
             logging.info("Raw data saved to artifacts folder.")
 
             # 4. Train-Test Split (80/20 split)
             logging.info("Train Test Split initiated.")
-            train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
+            train_set, test_set = train_test_split(
+                df, test_size=self.ingestion_config.test_size, random_state=self.ingestion_config.random_state
+            )
 
             # 5. Save Split Data
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            save_frame(train_set, self.ingestion_config.train_data_path)
+            save_frame(test_set, self.ingestion_config.test_data_path)
+
+            if self.ingestion_config.export_csv:
+                train_set.to_csv(os.path.join('artifacts', "train.csv"), index=False, header=True)
+                test_set.to_csv(os.path.join('artifacts', "test.csv"), index=False, header=True)
+                logging.info("Exported train/test splits as CSV as well.")
             
             logging.info("Ingestion of the data is completed.")
             
@@ -64,6 +87,54 @@ class DataIngestion:
             # Custom Exception Handling
             raise CustomException(e, sys)
 
+    def hash_split_mask(self, chunk: pd.DataFrame) -> np.ndarray:
+        """
+        Deterministic train/test assignment from a hash of each row's content (salted with
+        random_state): the same row always lands in the same split, whatever the chunking or
+        file order, so the split reproduces without a global shuffle.
+        :return: Boolean array, True for test rows.
+        """
+        salt = f"{self.ingestion_config.random_state:016d}"[-16:]
+        hashes = pd.util.hash_pandas_object(chunk, index=False, hash_key=salt).to_numpy()
+        buckets = hashes % np.uint64(1_000_000)
+        return buckets < np.uint64(round(self.ingestion_config.test_size * 1_000_000))
+
+    def initiate_streaming_ingestion(self, data_file_path: str):
+        """
+        Out-of-core variant of initiate_data_ingestion: reads the CSV `chunk_rows` rows at a time
+        and writes each chunk's train and test rows as part files, so memory stays at one chunk.
+        :return: Tuple of (train_chunks_dir, test_chunks_dir).
+        """
+        logging.info("Entered the streaming data ingestion method.")
+        try:
+            config = self.ingestion_config
+            file_format = os.path.splitext(config.train_data_path)[1]
+            for directory in (config.train_chunks_dir, config.test_chunks_dir):
+                shutil.rmtree(directory, ignore_errors=True)
+                os.makedirs(directory)
+
+            n_train = n_test = 0
+            part = -1
+            reader = pd.read_csv(data_file_path, dtype=RAW_DTYPES, chunksize=config.chunk_rows)
+            for part, chunk in enumerate(reader):
+                is_test = self.hash_split_mask(chunk)
+                save_frame(chunk[~is_test], os.path.join(config.train_chunks_dir, f"part-{part:05d}{file_format}"))
+                save_frame(chunk[is_test], os.path.join(config.test_chunks_dir, f"part-{part:05d}{file_format}"))
+                n_train += int((~is_test).sum())
+                n_test += int(is_test.sum())
+
+            logging.info(f"Streaming ingestion completed: {n_train} train / {n_test} test rows "
+                         f"in {part + 1} chunks of up to {config.chunk_rows} rows.")
+            return config.train_chunks_dir, config.test_chunks_dir
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def list_chunk_files(chunks_dir: str) -> list:
+    """Part files written by initiate_streaming_ingestion, in chunk order."""
+    return sorted(glob.glob(os.path.join(chunks_dir, "part-*")))
+
 # --- Execution Test ---
 if __name__ == "__main__":
     # Create a temporary 'data' folder and place your downloaded CSV here
@@ -1,20 +1,87 @@
 import os
 import sys
+import glob
+import shutil
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from dataclasses import dataclass
 from sklearn.compose import ColumnTransformer 
 from sklearn.impute import SimpleImputer 
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
 
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object 
+from src.utils import save_object, load_frame
+from src.schema import RAW_DTYPES, TARGET_COLUMN, DTYPE_PLAN, NUMERICAL_FEATURES, NOMINAL_FEATURES
+from src.parallelism import get_profile
+from src.streaming_stats import QuantileSketch, RunningMoments, CategoryCounter
+from src.components.data_ingestion import list_chunk_files
+
+def _nbytes(matrix) -> int:
+    """Memory held by a dense array or the buffers of a scipy.sparse matrix."""
+    if hasattr(matrix, 'indptr'):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+
+def as_float32(X) -> np.ndarray:
+    """Compact dtype plan: serving inputs are rounded to float32 like the stored training columns."""
+    return np.asarray(X, dtype=np.float32)
+
+
+def save_transformed_chunk(file_path: str, X, y):
+    """Writes one transformed chunk (CSR or dense features + target) as an uncompressed .npz."""
+    if sparse.issparse(X):
+        X = X.tocsr()
+        np.savez(file_path, data=X.data, indices=X.indices, indptr=X.indptr, shape=np.array(X.shape), y=y)
+    else:
+        np.savez(file_path, X=X, y=y)
+
+
+def load_transformed_chunk(file_path: str):
+    """:return: Tuple of (X, y) saved by save_transformed_chunk."""
+    with np.load(file_path) as data:
+        if 'X' in data.files:
+            return data['X'], data['y']
+        X = sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape=tuple(data['shape']))
+        return X, data['y']
+
+
+def list_transformed_chunks(chunks_dir: str) -> list:
+    """Transformed part files written by initiate_streaming_transformation, in chunk order."""
+    return sorted(glob.glob(os.path.join(chunks_dir, "part-*.npz")))
+
+
+def iter_transformed_chunks(chunks_dir: str):
+    """Yields (X, y) per transformed part file, for consumers that train or score chunk by chunk."""
+    for file_path in list_transformed_chunks(chunks_dir):
+        yield load_transformed_chunk(file_path)
+
+
+def load_transformed_chunks(chunks_dir: str):
+    """
+    Stacks all transformed part files into one in-memory (X, y), for trainers that need the full matrix.
+    The CSR is not smaller than the raw data: ~11 stored values (data + indices, 8 bytes each under the
+    compact plan) plus the row pointer take ~96 bytes per row, against 33 for the compact raw frame.
+    """
+    parts = list(iter_transformed_chunks(chunks_dir))
+    Xs, ys = zip(*parts)
+    X = sparse.vstack(Xs, format='csr') if sparse.issparse(Xs[0]) else np.vstack(Xs)
+    return X, np.concatenate(ys)
+
 
 @dataclass
 class DataTransformationConfig:
     preprocessor_obj_file_path = os.path.join('artifacts', "preprocessor.pkl")
+    # Out-of-core mode: transformed chunks for the trainer
+    transformed_train_dir = os.path.join('artifacts', "transformed", "train")
+    transformed_test_dir = os.path.join('artifacts', "transformed", "test")
+    # Compactor capacity of the median sketches (rank error shrinks roughly as 1/k)
+    quantile_sketch_k: int = int(os.getenv("STREAMING_SKETCH_K", "2048"))
+    # Compact dtype plan: float32 numeric pipeline and one-hot output (X takes 2/3 of the float64 CSR)
+    float32_features: bool = DTYPE_PLAN == 'compact'
 
 class DataTransformation:
     def __init__(self):
@@ -23,42 +90,35 @@ class DataTransformation:
     def get_data_transformer_object(self):
         """Creates the data transformation pipeline for the P2P Credit Risk Data (11 Features)."""
         try:
-            # --- Feature Lists (Matching the 12 Columns exactly) ---
-            
+            # --- Feature Lists (from src.schema) ---
+
             # Numerical features: (Needs Imputation for NaN values + Scaling)
-            numerical_features = [
-                'person_age', 
-                'person_income', 
-                'person_emp_length',  
-                'loan_amnt', 
-                'loan_int_rate', 
-                'loan_percent_income',
-                'cb_person_cred_hist_length' 
-            ] 
-            
+            numerical_features = list(NUMERICAL_FEATURES)
+
             # Categorical features: (Needs Imputation for mode + OneHot Encoding)
-            nominal_features = [
-                'person_home_ownership', 
-                'loan_intent', 
-                'loan_grade', 
-                'cb_person_default_on_file'
-            ]
+            nominal_features = list(NOMINAL_FEATURES)
             
             logging.info(f"Numerical features to be scaled: {numerical_features}")
             logging.info(f"Categorical features to be encoded: {nominal_features}")
             
             # --- Build Pipelines ---
             
+            float32_features = self.data_transformation_config.float32_features
+
             # 1. Numerical Pipeline: Impute missing values (median) + Scale/Standardize
-            num_pipeline = Pipeline(steps=[
+            num_steps = [
                 ('imputer', SimpleImputer(strategy='median')), # Handles NaNs in emp_length, int_rate
                 ('scaler', StandardScaler())
-            ])
+            ]
+            if float32_features:
+                num_steps.insert(0, ('float32', FunctionTransformer(as_float32, feature_names_out='one-to-one')))
+            num_pipeline = Pipeline(steps=num_steps)
             
             # 2. Categorical Pipeline: Impute missing (mode) + OneHot Encoding
             nominal_pipeline = Pipeline(steps=[
                 ('imputer', SimpleImputer(strategy='most_frequent')),
-                ('one_hot_encoder', OneHotEncoder(handle_unknown='ignore'))
+                ('one_hot_encoder', OneHotEncoder(handle_unknown='ignore',
+                                                  dtype=np.float32 if float32_features else np.float64))
             ])
 
             # --- Combine All Pipelines ---
@@ -68,7 +128,9 @@ class DataTransformation:
                     ("nominal_pipeline", nominal_pipeline, nominal_features),
                 ],
                 remainder='drop',
-                n_jobs=-1
+                # Keep the one-hot block sparse: the output is CSR whenever any part is sparse
+                sparse_threshold=1.0,
+                n_jobs=get_profile('training').n_jobs
             )
             
             return preprocessor
@@ -77,10 +139,15 @@ class DataTransformation:
             raise CustomException(e, sys)
 
     def initiate_data_transformation(self, train_path, test_path):
-        """Loads data, fits the pipeline, transforms data, and saves the pipeline object."""
+        """
+        Loads data, fits the pipeline, transforms data, and saves the pipeline object.
+        :return: Tuple of (X_train, y_train, X_test, y_test, preprocessor_path); X is CSR when the
+            one-hot output is sparse.
+        """
         try:
-            train_df = pd.read_csv(train_path)
-            test_df = pd.read_csv(test_path)
+            # Typed columnar artifacts from DataIngestion (memory-mapped Feather by default)
+            train_df = load_frame(train_path, dtypes=RAW_DTYPES)
+            test_df = load_frame(test_path, dtypes=RAW_DTYPES)
             
             logging.info("Read train and test data for transformation.")
             preprocessing_obj = self.get_data_transformer_object()
@@ -88,24 +155,18 @@ class DataTransformation:
             # Target column: 'loan_status' (0 or 1)
             target_column_name = 'loan_status'
             
-            # Separate features (X) and target (y)
-            input_feature_train_df = train_df.drop(columns=[target_column_name], axis=1)
-            target_feature_train_df = train_df[target_column_name]
+            # Fit and Transform (CSR matrices: the one-hot columns are never densified). The
+            # ColumnTransformer selects its feature columns itself and drops the target, so the
+            # typed frames are passed as they are instead of through a full drop(columns=...) copy
+            input_feature_train_arr = preprocessing_obj.fit_transform(train_df)
+            input_feature_test_arr = preprocessing_obj.transform(test_df)
 
-            input_feature_test_df = test_df.drop(columns=[target_column_name], axis=1)
-            target_feature_test_df = test_df[target_column_name]
-            
-            # Fit and Transform
-            input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df)
-            input_feature_test_arr = preprocessing_obj.transform(input_feature_test_df)
-            
-            # Combine features and target back into arrays for the model trainer
-            train_arr = np.c_[
-                input_feature_train_arr, np.array(target_feature_train_df)
-            ]
-            test_arr = np.c_[
-                input_feature_test_arr, np.array(target_feature_test_df)
-            ]
+            # Features and target are handed to the trainer separately, so no dense copy
+            # of [X | y] has to be built and sliced apart again; y keeps the plan's dtype (int8)
+            target_train_arr = train_df[target_column_name].to_numpy()
+            target_test_arr = test_df[target_column_name].to_numpy()
+            logging.info(f"Transformed train features: {type(input_feature_train_arr).__name__} "
+                         f"{input_feature_train_arr.shape}, {_nbytes(input_feature_train_arr) / 1024 ** 2:.2f} MB")
             
             logging.info("Saving preprocessing object (pipeline).")
             save_object(
@@ -114,10 +175,100 @@ class DataTransformation:
             )
             
             return (
-                train_arr,
-                test_arr,
+                input_feature_train_arr,
+                target_train_arr,
+                input_feature_test_arr,
+                target_test_arr,
                 self.data_transformation_config.preprocessor_obj_file_path,
             )
 
         except Exception as e:
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
+
+    def fit_streaming_preprocessor(self, chunk_files: list):
+        """
+        Fits the preprocessor from one pass over the chunk files without holding them together:
+        approximate medians (QuantileSketch), exact modes and category sets (CategoryCounter),
+        and mean/variance of the median-imputed numerics (RunningMoments).
+        The pipeline is fitted on a small seed frame covering every category (so all fitted
+        attributes and output indices exist), then its statistics are replaced by the streamed ones.
+        """
+        preprocessor = self.get_data_transformer_object()
+        columns = {name: cols for name, _, cols in preprocessor.transformers}
+        numerical_features, nominal_features = columns['num_pipeline'], columns['nominal_pipeline']
+
+        k = self.data_transformation_config.quantile_sketch_k
+        sketches = [QuantileSketch(k=k, seed=i) for i in range(len(numerical_features))]
+        moments = RunningMoments(len(numerical_features))
+        counter = CategoryCounter(nominal_features)
+        for file_path in chunk_files:
+            chunk = load_frame(file_path, dtypes=RAW_DTYPES)
+            numeric = chunk[numerical_features].to_numpy(dtype=np.float64, na_value=np.nan)
+            for j, sketch in enumerate(sketches):
+                sketch.update(numeric[:, j])
+            moments.update(numeric)
+            counter.update(chunk)
+
+        medians = np.array([sketch.quantile(0.5) for sketch in sketches])
+        modes = [counter.mode(col) for col in nominal_features]
+        categories = [counter.categories(col) for col in nominal_features]
+        scaled = moments.imputed(medians)
+
+        # Seed frame: numerics at their medians, nominal columns cycling through every category
+        n_seed = max(len(cats) for cats in categories)
+        seed = pd.DataFrame({col: np.full(n_seed, median) for col, median in zip(numerical_features, medians)})
+        for col, cats in zip(nominal_features, categories):
+            seed[col] = pd.Categorical([cats[i % len(cats)] for i in range(n_seed)])
+        preprocessor.fit(seed)
+
+        num_pipe = preprocessor.named_transformers_['num_pipeline']
+        nominal_pipe = preprocessor.named_transformers_['nominal_pipeline']
+        num_pipe.named_steps['imputer'].statistics_ = medians
+        scaler = num_pipe.named_steps['scaler']
+        scaler.mean_ = scaled.mean
+        scaler.var_ = scaled.variance
+        scaler.scale_ = np.where(scaled.variance > 0, np.sqrt(scaled.variance), 1.0)
+        scaler.n_samples_seen_ = int(scaled.count[0])
+        nominal_pipe.named_steps['imputer'].statistics_ = np.array(modes, dtype=object)
+
+        logging.info(f"Streamed preprocessor statistics over {scaler.n_samples_seen_} rows: "
+                     f"medians {dict(zip(numerical_features, medians.round(4)))}, modes {dict(zip(nominal_features, modes))}")
+        return preprocessor
+
+    def _transform_chunks(self, preprocessor, chunk_files: list, output_dir: str) -> int:
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir)
+        n_rows = 0
+        for file_path in chunk_files:
+            chunk = load_frame(file_path, dtypes=RAW_DTYPES)
+            if chunk.empty:
+                continue
+            X = preprocessor.transform(chunk)
+            y = chunk[TARGET_COLUMN].to_numpy()
+            name = os.path.splitext(os.path.basename(file_path))[0]
+            save_transformed_chunk(os.path.join(output_dir, f"{name}.npz"), X, y)
+            n_rows += len(y)
+        return n_rows
+
+    def initiate_streaming_transformation(self, train_chunks_dir: str, test_chunks_dir: str):
+        """
+        Out-of-core variant of initiate_data_transformation over the part files of
+        DataIngestion.initiate_streaming_ingestion: fits the preprocessor with streaming
+        statistics, then transforms chunk by chunk into transformed/{train,test}/part-*.npz.
+        :return: Tuple of (transformed_train_dir, transformed_test_dir, preprocessor_path).
+        """
+        try:
+            config = self.data_transformation_config
+            train_files = list_chunk_files(train_chunks_dir)
+            preprocessing_obj = self.fit_streaming_preprocessor(train_files)
+
+            n_train = self._transform_chunks(preprocessing_obj, train_files, config.transformed_train_dir)
+            n_test = self._transform_chunks(preprocessing_obj, list_chunk_files(test_chunks_dir), config.transformed_test_dir)
+            logging.info(f"Streaming transformation wrote {n_train} train / {n_test} test rows "
+                         f"to {config.transformed_train_dir} and {config.transformed_test_dir}.")
+
+            save_object(file_path=config.preprocessor_obj_file_path, obj=preprocessing_obj)
+            return config.transformed_train_dir, config.transformed_test_dir, config.preprocessor_obj_file_path
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,353 @@
+import os
+import sys
+import math
+import time
+import bisect
+import argparse
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import metrics
+from src.schema import TARGET_COLUMN
+from src.utils import load_object, load_frame, save_json, load_json
+from src.components.model_compiler import ModelCompiler
+
+
+@dataclass
+class DriftMonitorConfig:
+    """Reference histograms saved at training time and the serving-side sliding window."""
+    reference_file_path: str = os.path.join('artifacts', 'drift_reference.json')
+    enabled: bool = os.getenv("DRIFT_MONITOR", "1") == "1"
+    # Quantile bins per numeric feature / PD score (plus one bin for missing values)
+    n_bins: int = int(os.getenv("DRIFT_BINS", "10"))
+    # Training rows sampled for the feature reference
+    reference_rows: int = int(os.getenv("DRIFT_REFERENCE_ROWS", "100000"))
+    # Longest window PSI/KS can be asked for, kept as n_slots rotating sub-window histograms
+    window_seconds: float = float(os.getenv("DRIFT_WINDOW_SECONDS", "3600"))
+    n_slots: int = int(os.getenv("DRIFT_WINDOW_SLOTS", "12"))
+    # PSI above this flags a feature as drifted (0.1-0.2 moderate, > 0.2 significant shift)
+    psi_alert: float = float(os.getenv("DRIFT_PSI_ALERT", "0.2"))
+    # Below this many rows in the window PSI/KS are pure sampling noise: reported as None, never drifted
+    min_rows: int = int(os.getenv("DRIFT_MIN_ROWS", "500"))
+
+
+SCORE_KEY = 'pd_score'
+# Smoothing for empty bins so PSI stays finite
+_PSI_EPSILON = 1e-4
+
+
+def _numeric_spec(values: np.ndarray, n_bins: int) -> dict:
+    """Quantile bin edges of the non-missing values and the expected share per bin (last bin = missing)."""
+    present = values[~np.isnan(values)]
+    edges = np.unique(np.quantile(present, np.linspace(0, 1, n_bins + 1)[1:-1])) if present.size else np.empty(0)
+    spec = {'kind': 'numeric', 'edges': edges.tolist()}
+    spec['expected'] = _shares(np.bincount(_bin_numeric(spec, values), minlength=_n_bins(spec)))
+    return spec
+
+
+def _categorical_spec(values: pd.Series, categories: list) -> dict:
+    """One bin per category the encoder knows, plus 'other' (unseen) and missing bins."""
+    spec = {'kind': 'categorical', 'categories': list(categories)}
+    spec['expected'] = _shares(np.bincount(_bin_categorical(spec, values), minlength=_n_bins(spec)))
+    return spec
+
+
+def _n_bins(spec: dict) -> int:
+    if spec['kind'] == 'numeric':
+        return len(spec['edges']) + 2
+    return len(spec['categories']) + 2
+
+
+def _shares(counts: np.ndarray) -> list:
+    total = counts.sum()
+    return (counts / total if total else counts.astype(np.float64)).tolist()
+
+
+def _bin_numeric(spec: dict, values: np.ndarray) -> np.ndarray:
+    bins = np.searchsorted(spec['edges'], values, side='right')
+    return np.where(np.isnan(values), len(spec['edges']) + 1, bins)
+
+
+def _bin_categorical(spec: dict, values: pd.Series) -> np.ndarray:
+    categories = spec['categories']
+    codes = pd.Categorical(values.astype('string').str.strip(), categories=categories).codes.astype(np.int64)
+    return np.where(values.isna().to_numpy(), len(categories) + 1, np.where(codes < 0, len(categories), codes))
+
+
+def _bin_value(spec: dict, value, category_index: dict = None) -> int:
+    """Bin of one value: a binary search over <= n_bins edges or one dict lookup, i.e. O(1) per request."""
+    if spec['kind'] == 'numeric':
+        value = float(value) if value is not None else math.nan
+        if math.isnan(value):
+            return len(spec['edges']) + 1
+        return bisect.bisect_right(spec['edges'], value)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return len(spec['categories']) + 1
+    return category_index.get(str(value).strip(), len(spec['categories']))
+
+
+def _present_shares(shares) -> np.ndarray:
+    """Shares of the non-missing bins, renormalized (the missing rate is reported on its own)."""
+    present = np.asarray(shares, dtype=np.float64)[:-1]
+    total = present.sum()
+    return present / total if total else present
+
+
+def population_stability_index(expected, actual) -> float:
+    """PSI = sum((a - e) * ln(a / e)) over the non-missing bins, with empty bins smoothed."""
+    e = np.maximum(_present_shares(expected), _PSI_EPSILON)
+    a = np.maximum(_present_shares(actual), _PSI_EPSILON)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def binned_ks(expected, actual) -> float:
+    """
+    Kolmogorov-Smirnov distance between the binned CDFs of the non-missing values (a lower bound
+    of the exact KS statistic; the quantile bins keep it close).
+    """
+    e, a = _present_shares(expected), _present_shares(actual)
+    if e.sum() == 0 or a.sum() == 0:
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(e) - np.cumsum(a))))
+
+
+class DriftReferenceBuilder:
+    """Records the training-time distributions the live traffic is compared against."""
+
+    def __init__(self):
+        self.drift_monitor_config = DriftMonitorConfig()
+
+    def initiate_drift_reference(self, preprocessor_path: str, model_path: str, feature_data_path: str,
+                                 score_data_path: str):
+        """
+        Saves per-feature reference histograms of the preprocessor's 7 numeric and 4 categorical
+        inputs (from the training data) and of the PD score (from the holdout).
+        :return: Tuple of (reference file path, report dict with the number of rows per part).
+        """
+        try:
+            config = self.drift_monitor_config
+            preprocessor = load_object(preprocessor_path)
+            model = load_object(model_path)
+            consts = ModelCompiler._preprocessor_constants(preprocessor)
+
+            features = load_frame(feature_data_path)
+            if len(features) > config.reference_rows:
+                features = features.sample(config.reference_rows, random_state=42)
+
+            reference = {'features': {}}
+            for name in consts['numerical_features']:
+                values = pd.to_numeric(features[name], errors='coerce').to_numpy(dtype=np.float64)
+                reference['features'][name] = _numeric_spec(values, config.n_bins)
+            # Categories appended by incremental training are known categories too, not "other"
+            extra = {feature: cats for feature, cats, _ in consts['extra_categories']}
+            for name, categories in zip(consts['nominal_features'], consts['categories']):
+                reference['features'][name] = _categorical_spec(features[name], categories + extra.get(name, []))
+
+            holdout = load_frame(score_data_path).drop(columns=[TARGET_COLUMN], errors='ignore')
+            pd_scores = model.predict_proba(preprocessor.transform(holdout))[:, 1]
+            reference['features'][SCORE_KEY] = _numeric_spec(pd_scores.astype(np.float64), config.n_bins)
+            reference['rows'] = {'features': len(features), SCORE_KEY: len(holdout)}
+
+            save_json(config.reference_file_path, reference)
+            logging.info(f"Drift reference saved to {config.reference_file_path}: {reference['rows']}")
+            return config.reference_file_path, reference['rows']
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+class DriftMonitor:
+    """
+    Streaming drift monitor of the 11 applicant features and the PD score.
+
+    Every observation adds one count per feature to the histogram of the current time slot:
+    `n_slots` fixed-size slot histograms cover `window_seconds`, and the oldest slot is zeroed and
+    reused as time moves on, so memory is fixed and an update is O(1). PSI and KS against the
+    training reference are computed on demand over any window up to `window_seconds`. The
+    reference is fetched through the ArtifactRegistry; when training replaces it, the window
+    starts over.
+    """
+
+    def __init__(self, config: DriftMonitorConfig = None, registry=None):
+        self.config = config or DriftMonitorConfig()
+        if registry is None:
+            from src.pipeline.artifact_registry import artifact_registry as registry
+        self.registry = registry
+        self.slot_seconds = self.config.window_seconds / max(1, self.config.n_slots)
+        self._reference = None
+        self._category_index = {}
+        self._counts = {}
+        self._slot_epoch = np.full(max(1, self.config.n_slots), -1, dtype=np.int64)
+        self._lock = threading.Lock()
+
+        self.observed = metrics.counter("drift_observations_total", "Scored applicants added to the drift window")
+
+    def _current_reference(self):
+        if not os.path.exists(self.config.reference_file_path):
+            return None
+        reference = self.registry.get(self.config.reference_file_path, loader=load_json)
+        if reference is not self._reference:
+            # New (or first) reference: histograms of the old bins are meaningless
+            with self._lock:
+                if reference is self._reference:
+                    return reference  # another thread installed it meanwhile
+                self._counts = {name: np.zeros((len(self._slot_epoch), _n_bins(spec)), dtype=np.int64)
+                                for name, spec in reference['features'].items()}
+                self._slot_epoch[:] = -1
+                self._category_index = {name: {c: i for i, c in enumerate(spec['categories'])}
+                                        for name, spec in reference['features'].items() if spec['kind'] == 'categorical'}
+                self._reference = reference
+        return reference
+
+    def _window_state(self):
+        """(reference, category index, slot histograms) of one reference version, or None without a reference."""
+        if self._current_reference() is None:
+            return None
+        with self._lock:
+            return self._reference, self._category_index, self._counts
+
+    def _slot(self, now: float) -> int:
+        """Index of the slot for `now`, zeroing it first when it still holds an older sub-window (lock held)."""
+        epoch = int(now // self.slot_seconds) if math.isfinite(self.slot_seconds) else 0
+        slot = epoch % len(self._slot_epoch)
+        if self._slot_epoch[slot] != epoch:
+            for counts in self._counts.values():
+                counts[slot] = 0
+            self._slot_epoch[slot] = epoch
+        return slot
+
+    def observe(self, applicant, pd_score: float, now: float = None):
+        """
+        Adds one scored applicant.
+        :param applicant: CustomData record or mapping with the applicant fields.
+        """
+        if not self.config.enabled:
+            return
+        state = self._window_state()
+        if state is None:
+            return
+        reference, category_index, counts = state
+        get = applicant.get if isinstance(applicant, dict) else (lambda name: getattr(applicant, name, None))
+        bins = {name: _bin_value(spec, pd_score if name == SCORE_KEY else get(name), category_index.get(name))
+                for name, spec in reference['features'].items()}
+        with self._lock:
+            if counts is not self._counts:
+                return  # the reference was replaced meanwhile: these bins belong to the old window
+            slot = self._slot(now if now is not None else time.time())
+            for name, index in bins.items():
+                counts[name][slot, index] += 1
+        self.observed.inc()
+
+    def observe_frame(self, frame: pd.DataFrame, pd_scores, now: float = None):
+        """Adds a batch of scored applicants (raw or validated columns; unparseable numbers count as missing)."""
+        if not self.config.enabled or not len(frame):
+            return
+        state = self._window_state()
+        if state is None:
+            return
+        reference, _, counts = state
+        bin_counts = {}
+        for name, spec in reference['features'].items():
+            if spec['kind'] == 'numeric':
+                column = np.asarray(pd_scores, dtype=np.float64) if name == SCORE_KEY else \
+                    pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+                bins = _bin_numeric(spec, column)
+            else:
+                bins = _bin_categorical(spec, frame[name])
+            bin_counts[name] = np.bincount(bins, minlength=_n_bins(spec))
+        with self._lock:
+            if counts is not self._counts:
+                return  # the reference was replaced meanwhile: these bins belong to the old window
+            slot = self._slot(now if now is not None else time.time())
+            for name, frame_counts in bin_counts.items():
+                counts[name][slot] += frame_counts
+        self.observed.inc(len(frame))
+
+    def report(self, window_seconds: float = None, now: float = None) -> dict:
+        """
+        PSI (and KS for numeric features and the score) of the last `window_seconds` against the
+        training reference; also exported as drift_psi / drift_ks gauges.
+        :param window_seconds: Rounded up to whole slots; defaults to (and is capped at) the full window.
+        """
+        if self._current_reference() is None:
+            return {'enabled': self.config.enabled, 'error': f"No drift reference at {self.config.reference_file_path}"}
+
+        window = min(window_seconds or self.config.window_seconds, self.config.window_seconds)
+        now = now if now is not None else time.time()
+        with self._lock:
+            reference = self._reference  # the histograms below were built for this reference
+            if math.isfinite(self.slot_seconds):
+                current = int(now // self.slot_seconds)
+                n_recent = max(1, math.ceil(window / self.slot_seconds))
+                in_window = (self._slot_epoch > current - n_recent) & (self._slot_epoch <= current)
+            else:
+                in_window = self._slot_epoch >= 0
+            totals = {name: counts[in_window].sum(axis=0) for name, counts in self._counts.items()}
+
+        n_rows = int(totals[SCORE_KEY].sum()) if SCORE_KEY in totals else 0
+        enough_rows = n_rows >= max(1, self.config.min_rows)
+        features = {}
+        for name, spec in reference['features'].items():
+            actual = _shares(totals[name])
+            result = {
+                'psi': round(population_stability_index(spec['expected'], actual), 6) if enough_rows else None,
+                # Missing values are imputed at training but rejected by the serving validation,
+                # so their rate is compared on its own instead of inside the PSI
+                'missing_rate': round(actual[-1], 6) if n_rows else None,
+                'expected_missing_rate': round(spec['expected'][-1], 6),
+            }
+            if spec['kind'] == 'numeric':
+                result['ks'] = round(binned_ks(spec['expected'], actual), 6) if enough_rows else None
+            result['drifted'] = bool(enough_rows and result['psi'] > self.config.psi_alert)
+            features[name] = result
+            if enough_rows:
+                metrics.gauge("drift_psi", "Population stability index of the drift window vs training",
+                              labels={"feature": name}).set(result['psi'])
+                if 'ks' in result:
+                    metrics.gauge("drift_ks", "Binned KS distance of the drift window vs training",
+                                  labels={"feature": name}).set(result['ks'])
+        return {
+            'enabled': self.config.enabled,
+            'window_seconds': window if math.isfinite(window) else None,  # None: everything observed
+            'rows': n_rows,
+            'min_rows': self.config.min_rows,
+            'psi_alert': self.config.psi_alert,
+            'drifted': sorted(name for name, result in features.items() if result['drifted']),
+            'features': features,
+        }
+
+
+def drift_of_scored_file(scored_path: str, chunk_size: int = 100_000) -> dict:
+    """
+    Drift of a batch-scoring output (input columns + 'pd') against the training reference,
+    accumulated chunk by chunk over the whole file.
+    """
+    try:
+        monitor = DriftMonitor(DriftMonitorConfig(window_seconds=math.inf, n_slots=1, enabled=True))
+        if scored_path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            # Record batches, so memory stays bounded by chunk_size rows like the CSV reader
+            chunks = (batch.to_pandas() for batch in pq.ParquetFile(scored_path).iter_batches(batch_size=chunk_size))
+        else:
+            chunks = pd.read_csv(scored_path, chunksize=chunk_size)
+        for chunk in chunks:
+            chunk = chunk[chunk['pd'].notna()]  # rows rejected by validation were not scored
+            monitor.observe_frame(chunk, chunk['pd'].to_numpy())
+        return monitor.report()
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    import json
+
+    parser = argparse.ArgumentParser(description="PSI/KS drift of a batch-scoring output vs the training reference.")
+    parser.add_argument("scored_path", help="Output .csv/.parquet of src/pipeline/batch_scoring.py.")
+    args = parser.parse_args()
+    print(json.dumps(drift_of_scored_file(args.scored_path), indent=2))
@@ -0,0 +1,303 @@
+import os
+import sys
+import copy
+import json
+import time
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from sklearn.compose import ColumnTransformer
+from sklearn.frozen import FrozenEstimator
+from sklearn.preprocessing import OneHotEncoder
+from sklearn.model_selection import train_test_split
+
+from src.exception import CustomException
+from src.logger import logging
+from src.schema import RAW_DTYPES, TARGET_COLUMN, DATA_ARTIFACT_FORMAT
+from src.utils import (
+    save_object, load_object, save_json, load_json, save_frame, load_frame, data_artifact_path,
+    find_cost_optimal_threshold, misclassification_cost, densify_for_model, threshold_validation_split,
+)
+from src.components.data_ingestion import DataIngestionConfig
+from src.components.data_transformation import DataTransformationConfig
+from src.components.model_trainer import ModelTrainerConfig
+from src.components.model_compiler import NEW_CATEGORIES_PREFIX, fold_thresholds, _scaled_float32
+from src.components.model_registry import ModelRegistry
+from src.pipeline.stage_cache import file_digest
+
+
+@dataclass
+class IncrementalTrainerConfig:
+    """Artifacts and knobs of the incremental (append-only) training mode."""
+    # Which new-row files were applied and what each update did
+    state_file_path: str = os.path.join('artifacts', "incremental_state.json")
+    # Holdout used for the promotion decision: the original test split plus the test share of every batch
+    holdout_data_path: str = data_artifact_path('artifacts', "incremental_holdout", DATA_ARTIFACT_FORMAT)
+    # Boosting rounds added per update when continuing an XGBoost model
+    n_estimators: int = int(os.getenv("INCREMENTAL_N_ESTIMATORS", "50"))
+    # Smaller steps than the initial fit, so a day of new loans refines rather than overrides the model
+    learning_rate: float = float(os.getenv("INCREMENTAL_LEARNING_RATE", "0.05"))
+
+
+def _unfreeze(estimator):
+    return estimator.estimator if isinstance(estimator, FrozenEstimator) else estimator
+
+
+def _remap_xgboost(model, n_num: int, old_mean, old_scale, new_mean, new_scale, n_features: int,
+                   float32_inputs: bool = False):
+    """
+    Returns a Booster computing the same margins on features standardized with the new scaler
+    statistics: each numeric split `float32((x - m_old) / s_old) < t` becomes
+    `float32((x - m_new) / s_new) < t'`. Histogram cut points usually equal observed values, so
+    t' is derived from the exact raw-space boundary (as the compiler folds thresholds) rather
+    than by rescaling t, which would send rows sitting on a cut point down the other branch.
+    The booster's feature count is raised to `n_features` so appended one-hot columns can be used.
+    `float32_inputs` marks a scaler running on float32 input (compact dtype plan).
+    """
+    import xgboost
+    raw = json.loads(model.get_booster().save_raw(raw_format='json'))
+    learner = raw['learner']
+    max_float32 = np.finfo(np.float32).max
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'])
+        feature = np.asarray(tree['split_indices'])
+        split = np.asarray(tree['split_conditions'], dtype=np.float32)
+        numeric = (left >= 0) & (feature < n_num)
+        if numeric.any():
+            f = feature[numeric]
+            # Largest raw x going left: float32 scaled x <= predecessor(t) under the old statistics
+            le_split = np.nextafter(split[numeric], np.float32(-np.inf)).astype(np.float64)
+            boundary = fold_thresholds(le_split, old_mean[f], old_scale[f], float32_inputs)
+            # The smallest raw value going right defines the new cut; cut points are observed values,
+            # so they keep going right and no observed value lies between them and the boundary
+            first_right = np.nextafter(boundary, np.inf)
+            new_split = _scaled_float32(first_right, new_mean[f], new_scale[f], float32_inputs)
+            split[numeric] = np.clip(new_split, -max_float32, max_float32)
+        tree['split_conditions'] = [float(v) for v in split]
+    learner['learner_model_param']['num_feature'] = str(n_features)
+    learner['feature_names'], learner['feature_types'] = [], []
+
+    booster = xgboost.Booster()
+    booster.load_model(bytearray(json.dumps(raw).encode()))
+    return booster
+
+
+def _remap_linear(model, n_num: int, old_mean, old_scale, new_mean, new_scale, n_features: int):
+    """Rewrites coef_/intercept_ in place for the new scaler statistics (exact) and zero-pads appended columns."""
+    coef = model.coef_.astype(np.float64)
+    intercept = model.intercept_.astype(np.float64)
+    intercept += np.sum(coef[:, :n_num] * (new_mean - old_mean) / old_scale, axis=1)
+    coef[:, :n_num] *= new_scale / old_scale
+    model.coef_ = np.pad(coef, ((0, 0), (0, n_features - coef.shape[1])))
+    model.intercept_ = intercept
+    model.n_features_in_ = n_features
+    return model
+
+
+class IncrementalTrainer:
+    """
+    Updates the serving preprocessor and model from newly performed loans only:
+
+    1. The scaler statistics are updated with StandardScaler.partial_fit; the imputer medians
+       stay as fitted (a median cannot be updated from a sample of new rows).
+    2. Categories never seen by the one-hot encoder get an appended one-hot block, so existing
+       feature indices keep their meaning.
+    3. The model is rewritten for the new scaling and continued on the new rows: XGBoost adds
+       boosting rounds on top of the current booster, linear estimators with `partial_fit` take
+       one more pass. Other model families need a full `training_pipeline.py` run.
+    4. Current and updated model are costed (5:1) on the same holdout; the update is promoted
+       only if it is not more expensive.
+    """
+
+    def __init__(self):
+        self.incremental_config = IncrementalTrainerConfig()
+        self.ingestion_config = DataIngestionConfig()
+        self.transformation_config = DataTransformationConfig()
+        self.trainer_config = ModelTrainerConfig()
+
+    def _load_state(self) -> dict:
+        path = self.incremental_config.state_file_path
+        return load_json(path) if os.path.exists(path) else {'updates': []}
+
+    def update_preprocessor(self, preprocessor, features: pd.DataFrame):
+        """
+        :return: Tuple of (updated ColumnTransformer fitted on nothing but `features`,
+            scaler statistics before/after as dict, {feature: new categories}).
+        """
+        fitted = [(name, copy.deepcopy(_unfreeze(pipe)), cols)
+                  for name, pipe, cols in preprocessor.transformers_ if name != 'remainder']
+        by_name = {name: (pipe, cols) for name, pipe, cols in fitted}
+
+        # 1. Scaler: fold the new rows into mean/variance (imputed first, like the pipeline does)
+        num_pipe, num_cols = by_name['num_pipeline']
+        scaler = num_pipe.named_steps['scaler']
+        old_stats = {'mean': scaler.mean_.copy(), 'scale': scaler.scale_.copy()}
+        scaler.partial_fit(num_pipe[:-1].transform(features[num_cols]))
+        stats = {**{f'old_{k}': v for k, v in old_stats.items()}, 'new_mean': scaler.mean_, 'new_scale': scaler.scale_,
+                 'float32_inputs': 'float32' in num_pipe.named_steps}
+
+        # 2. Encoder: categories not covered by the original or any earlier appended block
+        nominal_pipe, nominal_cols = by_name['nominal_pipeline']
+        base_encoder = nominal_pipe.named_steps['one_hot_encoder']
+        known = {col: {str(c) for c in cats} for col, cats in zip(nominal_cols, base_encoder.categories_)}
+        for name, encoder, cols in fitted:
+            if name.startswith(NEW_CATEGORIES_PREFIX):
+                for col, cats in zip(cols, encoder.categories_):
+                    known[col].update(str(c) for c in cats)
+        new_categories = {}
+        for col in nominal_cols:
+            unseen = sorted(set(features[col].dropna().astype(str)) - known[col])
+            if unseen:
+                new_categories[col] = unseen
+
+        # 3. Rebuild: fitted parts are frozen (fit is a no-op), only the appended encoder is fitted
+        transformers = [(name, FrozenEstimator(pipe), cols) for name, pipe, cols in fitted]
+        if new_categories:
+            block = sum(name.startswith(NEW_CATEGORIES_PREFIX) for name, _, _ in fitted)
+            encoder = OneHotEncoder(categories=list(new_categories.values()), handle_unknown='ignore',
+                                    dtype=base_encoder.dtype)
+            transformers.append((f"{NEW_CATEGORIES_PREFIX}{block}", encoder, list(new_categories)))
+        updated = ColumnTransformer(
+            transformers, remainder='drop',
+            sparse_threshold=preprocessor.sparse_threshold, n_jobs=preprocessor.n_jobs,
+        )
+        updated.fit(features)
+        return updated, stats, new_categories
+
+    def update_model(self, model, X_new, y_new, n_num: int, stats: dict, n_features: int):
+        """Returns a new model equivalent to `model` under the updated scaling, continued on (X_new, y_new)."""
+        model = copy.deepcopy(model)
+        args = (n_num, stats['old_mean'], stats['old_scale'], stats['new_mean'], stats['new_scale'], n_features)
+        if type(model).__name__ == 'XGBClassifier':
+            booster = _remap_xgboost(model, *args, float32_inputs=stats['float32_inputs'])
+            model.set_params(n_estimators=self.incremental_config.n_estimators,
+                             learning_rate=self.incremental_config.learning_rate)
+            return model.fit(X_new, y_new, xgb_model=booster)
+        if hasattr(model, 'partial_fit') and hasattr(model, 'coef_'):
+            _remap_linear(model, *args)
+            X_new = densify_for_model(model, X_new)
+            model.partial_fit(X_new, y_new, classes=model.classes_)
+            return model
+        raise CustomException(
+            f"{type(model).__name__} cannot be updated incrementally; run the full training pipeline", sys
+        )
+
+    @staticmethod
+    def _cost_report(preprocessor, model, holdout: pd.DataFrame, threshold: float) -> dict:
+        """Holdout cost of `model` at an already fixed threshold (never tuned on the holdout itself)."""
+        features = holdout.drop(columns=[TARGET_COLUMN])
+        y_true = holdout[TARGET_COLUMN].to_numpy(dtype=np.int64)
+        X = densify_for_model(model, preprocessor.transform(features))
+        scores = model.predict_proba(X)[:, 1].astype(np.float64)  # compared in float64, as served
+        return {
+            'Total Cost': misclassification_cost(y_true, (scores >= threshold).astype(int)),
+            'Threshold': threshold,
+            'Default Threshold Cost': misclassification_cost(y_true, model.predict(X)),
+        }
+
+    def initiate_incremental_training(self, new_data_path: str, force: bool = False):
+        """
+        Applies one file of newly performed loans (same 12-column schema as the raw CSV).
+        :param force: Re-apply a file whose content was already applied.
+        :return: Report dict with 'promoted', the holdout costs of both models and the update details.
+        """
+        try:
+            start = time.perf_counter()
+            state = self._load_state()
+            digest = file_digest(new_data_path)
+            if not force and any(update['digest'] == digest for update in state['updates']):
+                logging.info(f"{new_data_path} was already applied (digest {digest[:12]}); skipping.")
+                return {'promoted': False, 'skipped': True}
+
+            # 1. Only the new rows are read and split, with the full pipeline's split settings
+            new_df = pd.read_csv(new_data_path, dtype=RAW_DTYPES)
+            new_train, new_test = train_test_split(
+                new_df, test_size=self.ingestion_config.test_size, random_state=self.ingestion_config.random_state
+            )
+            logging.info(f"Incremental update from {new_data_path}: {len(new_train)} train / {len(new_test)} holdout rows.")
+
+            holdout_path = self.incremental_config.holdout_data_path
+            base_holdout = holdout_path if os.path.exists(holdout_path) else self.ingestion_config.test_data_path
+            holdout = pd.concat([load_frame(base_holdout, dtypes=RAW_DTYPES), new_test], ignore_index=True)
+            holdout = holdout.astype({col: dtype for col, dtype in RAW_DTYPES.items() if col in holdout.columns})
+
+            # 2. Update preprocessor and model
+            preprocessor_path = self.transformation_config.preprocessor_obj_file_path
+            model_path = self.trainer_config.trained_model_file_path
+            preprocessor = load_object(preprocessor_path)
+            model = load_object(model_path)
+
+            # The updated model's threshold is chosen on a validation share of the new training
+            # rows, so the holdout only costs fixed decision rules (as in evaluate_models)
+            summary = load_json(self.trainer_config.threshold_file_path)
+            current_threshold = float(summary.get('threshold', 0.5))
+            y_train = new_train[TARGET_COLUMN].to_numpy(dtype=np.int64)
+            try:
+                fit_idx, val_idx = threshold_validation_split(y_train)
+            except ValueError as e:
+                logging.info(f"No threshold validation share for this batch ({e}); keeping threshold {current_threshold}.")
+                fit_idx, val_idx = np.arange(len(y_train)), None
+
+            fit_rows = new_train.iloc[fit_idx]
+            features = fit_rows.drop(columns=[TARGET_COLUMN])
+            y_new = y_train[fit_idx]
+            new_preprocessor, stats, new_categories = self.update_preprocessor(preprocessor, features)
+            X_new = new_preprocessor.transform(features)
+            n_num = len(stats['new_mean'])
+            new_model = self.update_model(model, X_new, y_new, n_num, stats, X_new.shape[1])
+            if new_categories:
+                logging.info(f"Appended one-hot columns for unseen categories: {new_categories}")
+
+            updated_threshold = current_threshold
+            if val_idx is not None:
+                val_rows = new_train.iloc[val_idx]
+                X_val = densify_for_model(new_model, new_preprocessor.transform(val_rows.drop(columns=[TARGET_COLUMN])))
+                updated_threshold, _ = find_cost_optimal_threshold(y_train[val_idx], new_model.predict_proba(X_val)[:, 1])
+
+            # 3. Champion (at its saved threshold) vs updated model (at its validation threshold) on the same holdout
+            current = self._cost_report(preprocessor, model, holdout, current_threshold)
+            updated = self._cost_report(new_preprocessor, new_model, holdout, updated_threshold)
+            promoted = updated['Total Cost'] <= current['Total Cost']
+            logging.info(f"Holdout cost ({len(holdout)} rows): current {current['Total Cost']}, "
+                         f"updated {updated['Total Cost']} -> {'promoting' if promoted else 'keeping current model'}")
+
+            # 4. Promote: holdout first, then the artifacts the serving registry hot-reloads
+            save_frame(holdout, holdout_path)
+            if promoted:
+                save_object(file_path=preprocessor_path, obj=new_preprocessor)
+                save_object(file_path=model_path, obj=new_model)
+                save_json(
+                    file_path=self.trainer_config.threshold_file_path,
+                    obj={
+                        'model': summary.get('model', type(new_model).__name__),
+                        'threshold': updated['Threshold'],
+                        'total_cost': updated['Total Cost'],
+                        'default_threshold_cost': int(updated['Default Threshold Cost']),
+                        'incremental_updates': int(summary.get('incremental_updates', 0)) + 1,
+                    }
+                )
+                if self.trainer_config.register_models:
+                    model_name = summary.get('model', type(new_model).__name__)
+                    ModelRegistry().register_run(preprocessor_path, {model_name: new_model}, {model_name: updated},
+                                                 model_name, source='incremental')
+
+            report = {
+                'file': new_data_path,
+                'digest': digest,
+                'rows': int(len(new_df)),
+                'new_categories': new_categories,
+                'current_cost': current['Total Cost'],
+                'updated_cost': updated['Total Cost'],
+                'holdout_rows': int(len(holdout)),
+                'promoted': bool(promoted),
+                'seconds': round(time.perf_counter() - start, 3),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            state['updates'].append(report)
+            save_json(self.incremental_config.state_file_path, state)
+            return report
+
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
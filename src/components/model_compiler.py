@@ -0,0 +1,599 @@
+import os
+import sys
+import json
+import time
+import ctypes
+import ctypes.util
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from scipy.special import expit
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object, save_object, load_frame, load_json, ARTIFACT_FORMAT
+from src.pipeline.stage_cache import source_digests
+
+
+# Name prefix of the one-hot transformers IncrementalTrainer appends for unseen categories
+NEW_CATEGORIES_PREFIX = "new_categories_"
+
+
+@dataclass
+class ModelCompilerConfig:
+    """Stores the path of the flat NumPy scorer exported after training."""
+    # The 'mmap' artifact format stores the node tables as memory-mappable joblib instead of .npz
+    compiled_scorer_file_path = os.path.join(
+        "artifacts", "compiled_scorer.joblib" if ARTIFACT_FORMAT == "mmap" else "compiled_scorer.npz"
+    )
+
+
+# --- Exact threshold folding -------------------------------------------------------------
+#
+# Trees compare float32(standardized value) against their thresholds. Because
+# x -> float32((x - mean) / scale) is monotone, each threshold t maps to a single raw-space
+# boundary B = max{x : float32((x - mean) / scale) <= t}, so "raw x <= B" takes exactly the
+# same branch as the sklearn/XGBoost path. B is found by bisection over the ordered bit
+# patterns of float64, vectorized over all thresholds at once. Under the compact dtype plan
+# the scaler itself runs in float32 on float32-rounded inputs; that map is monotone as well.
+
+_SIGN_MASK = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+def _float_to_ordered(x: np.ndarray) -> np.ndarray:
+    bits = x.view(np.int64)
+    return np.where(bits < 0, -(bits & _SIGN_MASK), bits)
+
+
+def _ordered_to_float(key: np.ndarray) -> np.ndarray:
+    bits = np.where(key < 0, (-key) | np.int64(-0x8000000000000000), key)
+    return bits.astype(np.int64).view(np.float64)
+
+
+def _scaled_float32(x, mean, scale, float32_inputs: bool = False):
+    """
+    Replicates StandardScaler.transform on float64 input followed by the float32 cast of the trees,
+    or with `float32_inputs` on float32 input (x, mean and scale rounded to float32, float32 math).
+    """
+    with np.errstate(over='ignore', invalid='ignore'):
+        if float32_inputs:
+            x32 = np.asarray(x, dtype=np.float64).astype(np.float32)
+            return (x32 - np.asarray(mean).astype(np.float32)) / np.asarray(scale).astype(np.float32)
+        return ((x - mean) / scale).astype(np.float32)
+
+
+def fold_thresholds(thresholds, mean, scale, float32_inputs: bool = False):
+    """Returns raw-space boundaries B such that `x <= B` <=> `_scaled_float32(x, mean, scale) <= t`."""
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    mean = np.broadcast_to(np.asarray(mean, dtype=np.float64), thresholds.shape)
+    scale = np.broadcast_to(np.asarray(scale, dtype=np.float64), thresholds.shape)
+
+    max_float = np.finfo(np.float64).max
+    lo = np.full(thresholds.shape, _float_to_ordered(np.array([-max_float]))[0])
+    hi = np.full(thresholds.shape, _float_to_ordered(np.array([max_float]))[0])
+
+    all_right = _scaled_float32(_ordered_to_float(lo), mean, scale, float32_inputs) > thresholds
+    all_left = _scaled_float32(_ordered_to_float(hi), mean, scale, float32_inputs) <= thresholds
+
+    # Invariant: g(lo) <= t < g(hi)
+    for _ in range(64):
+        active = hi > lo + 1
+        if not active.any():
+            break
+        # floor((lo + hi) / 2) without overflowing int64
+        mid = lo // 2 + hi // 2 + (lo % 2 + hi % 2) // 2
+        goes_left = _scaled_float32(_ordered_to_float(mid), mean, scale, float32_inputs) <= thresholds
+        lo = np.where(active & goes_left, mid, lo)
+        hi = np.where(active & ~goes_left, mid, hi)
+
+    boundary = _ordered_to_float(lo)
+    boundary = np.where(all_right, -np.inf, boundary)
+    boundary = np.where(all_left, np.inf, boundary)
+    return boundary
+
+
+def _is_missing(value) -> bool:
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+# --- Sigmoid ----------------------------------------------------------------------------
+#
+# XGBoost and scipy's expit compute 1 / (1 + exp(-x)) with the C library's expf / exp. NumPy's
+# vectorized exp differs from those by 1 ulp on many inputs, which could flip a
+# `pd >= threshold` decision between the compiled and the sklearn/XGBoost path. exp is
+# therefore evaluated vectorized in a wider type and rounded: that equals the (almost always
+# correctly rounded) libm result except next to a rounding midpoint, and only those few
+# elements (~1 in 50) are passed to the C library function one by one.
+
+def _load_libm(name: str, c_type):
+    for library in (ctypes.util.find_library('m'), 'libm.so.6', None):  # None: symbols of the process (musl)
+        try:
+            function = getattr(ctypes.CDLL(library), name)
+        except (OSError, AttributeError):
+            continue
+        function.restype, function.argtypes = c_type, [c_type]
+        return function
+    logging.warning(f"C library {name} not found; compiled probabilities may differ by 1 ulp.")
+    return None
+
+
+_LIBM_EXP = {np.dtype(np.float32): _load_libm('expf', ctypes.c_float),
+             np.dtype(np.float64): _load_libm('exp', ctypes.c_double)}
+# Wider type exp is evaluated in; float64 needs an extended long double (absent e.g. on ARM macOS)
+_WIDE_TYPE = {np.dtype(np.float32): np.dtype(np.float64), np.dtype(np.float64): np.dtype(np.longdouble)}
+# Rounded results this close to half an ulp off the wide value go to libm (its error is < 0.502 ulp)
+_MIDPOINT_MARGIN = 0.01
+
+
+def _libm_exp(x: np.ndarray) -> np.ndarray:
+    """The C library's exp/expf of every element of x (float32 or float64)."""
+    exp_function = _LIBM_EXP.get(x.dtype)
+    if exp_function is None:
+        return np.exp(x.astype(np.float64)).astype(x.dtype)
+    wide_type = _WIDE_TYPE[x.dtype]
+    if np.finfo(wide_type).nmant <= np.finfo(x.dtype).nmant:
+        return np.fromiter(map(exp_function, x.tolist()), dtype=x.dtype, count=x.size).reshape(x.shape)
+    with np.errstate(over='ignore', invalid='ignore'):
+        wide = np.exp(x.astype(wide_type))
+        result = wide.astype(x.dtype)
+        # Distance between the wide value and its rounding, in ulps of the rounded value
+        ulps = np.abs(wide - result) / np.spacing(np.abs(result)).astype(wide_type)
+    ambiguous = ~(ulps < 0.5 - _MIDPOINT_MARGIN)  # also overflow to inf and NaN
+    if ambiguous.any():
+        result[ambiguous] = np.fromiter(map(exp_function, x[ambiguous].tolist()), dtype=x.dtype,
+                                        count=int(ambiguous.sum()))
+    return result
+
+
+def _sigmoid(margin: np.ndarray) -> np.ndarray:
+    """1 / (1 + exp(-margin)) in the margin's dtype, bit-identical to XGBoost's and scipy's sigmoid."""
+    negated = -np.asarray(margin)
+    exp = _libm_exp(negated)
+    one = negated.dtype.type(1.0)
+    return one / (exp + one)
+
+
+# --- Compiled scorer ---------------------------------------------------------------------
+
+class CompiledScorer:
+    """
+    Flat NumPy re-implementation of the fitted preprocessor + model.
+
+    Inputs are raw applicant values; imputation constants, category -> one-hot column maps and
+    the scaler (replayed for LR, folded into tree thresholds) are precomputed, and tree
+    ensembles are stored as array-backed node tables traversed for all trees at once.
+    """
+
+    def __init__(self, arrays: dict):
+        self.meta = json.loads(str(arrays['meta']))
+        self.kind = self.meta['kind']
+        self.numerical_features = self.meta['numerical_features']
+        self.nominal_features = self.meta['nominal_features']
+        self.classes = np.asarray(self.meta['classes'])
+        self.n_outputs = int(self.meta['n_outputs'])
+        self.sparse_missing = bool(self.meta.get('sparse_missing', False))
+        self.float32_inputs = bool(self.meta.get('float32_inputs', False))
+        # file_digest of the model.pkl/preprocessor.pkl compiled (None for artifacts of older versions)
+        self.source_digests = self.meta.get('source_digests')
+
+        self.num_fill = arrays['num_fill']
+        self.cat_fill = self.meta['cat_fill']
+        self.cat_offsets = [int(o) for o in self.meta['cat_offsets']]
+        # category -> absolute design-matrix column
+        self.category_maps = [
+            {category: offset + code for code, category in enumerate(categories)}
+            for categories, offset in zip(self.meta['categories'], self.cat_offsets)
+        ]
+        # Categories added by incremental training live in appended one-hot blocks
+        for feature, categories, offset in self.meta.get('extra_categories', []):
+            self.category_maps[self.nominal_features.index(feature)].update(
+                {category: int(offset) + code for code, category in enumerate(categories)}
+            )
+        # Raw values XGBoost sees as unstored zeros (missing): zero_lower < x <= zero_point
+        self.zero_point = arrays['zero_point']
+        self.zero_lower = arrays['zero_lower']
+
+        if self.kind == 'linear':
+            self.coef = arrays['coef']
+            # Kept in the model's dtype: float32 models accumulate their margin in float32
+            self.intercept = arrays['intercept'].dtype.type(arrays['intercept'])
+            # Scaler replayed on the numerics
+            self.mean, self.scale = arrays['mean'], arrays['scale']
+        else:
+            self.feature = arrays['feature']
+            self.threshold = arrays['threshold']
+            # children[2 * node] is the left child, children[2 * node + 1] the right one
+            self.children = arrays['children']
+            self.default_left = arrays['default_left']
+            self.value = arrays['value']
+            self.roots = arrays['roots']
+            self.max_depth = int(self.meta['max_depth'])
+            self.base_score = float(self.meta.get('base_score', 0.0))
+            self.learning_rate = float(self.meta.get('learning_rate', 1.0))
+
+    # -- persistence --
+
+    @staticmethod
+    def save(file_path: str, arrays: dict):
+        """Writes `arrays` as .npz, or for any other extension as uncompressed joblib that loads memory-mapped."""
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if file_path.endswith('.npz'):
+                np.savez(file_path, **arrays)
+            else:
+                save_object(file_path, arrays, artifact_format='mmap')
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def load(cls, file_path: str):
+        try:
+            if not file_path.endswith('.npz'):
+                # Node tables stay memory-mapped and are shared by all worker processes
+                return cls(load_object(file_path))
+            with np.load(file_path, allow_pickle=False) as data:
+                return cls({key: data[key] for key in data.files})
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # -- feature construction --
+
+    def _design_matrix(self, numeric: np.ndarray, categorical) -> np.ndarray:
+        """Builds the (n, n_outputs) matrix of imputed raw numerics + one-hot columns."""
+        n_rows = numeric.shape[0]
+        n_num = len(self.numerical_features)
+        design = np.zeros((n_rows, self.n_outputs), dtype=np.float64)
+
+        numeric = np.asarray(numeric, dtype=np.float64)
+        design[:, :n_num] = np.where(np.isnan(numeric), self.num_fill, numeric)
+        if self.kind == 'linear':
+            imputed = design[:, :n_num]
+            design[:, :n_num] = _scaled_float32(imputed, self.mean, self.scale, float32_inputs=True) \
+                if self.float32_inputs else (imputed - self.mean) / self.scale
+
+        rows = np.arange(n_rows)
+        for j, category_map in enumerate(self.category_maps):
+            fill = self.cat_fill[j]
+            codes = np.fromiter(
+                (category_map.get(fill if _is_missing(v) else v, -1) for v in categorical[j]),
+                dtype=np.int64,
+                count=n_rows,
+            )
+            known = codes >= 0  # handle_unknown='ignore' -> all-zero block
+            design[rows[known], codes[known]] = 1.0
+        return design
+
+    def _split_frame(self, features: pd.DataFrame):
+        numeric = features[self.numerical_features].to_numpy(dtype=np.float64, na_value=np.nan)
+        categorical = [features[col].tolist() for col in self.nominal_features]
+        return numeric, categorical
+
+    # -- scoring --
+
+    def _leaves(self, design: np.ndarray) -> np.ndarray:
+        """Traverses every tree for every row at once; returns leaf node ids of shape (n, n_trees)."""
+        n_rows, n_cols = design.shape
+        flat_design = design.ravel()
+        row_base = (np.arange(n_rows) * n_cols)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.roots.shape[0])).copy()
+
+        for depth in range(self.max_depth):
+            feature = np.take(self.feature, node)
+            x = np.take(flat_design, row_base + feature)
+            go_right = x > np.take(self.threshold, node)
+            if self.sparse_missing:
+                missing = (x > np.take(self.zero_lower, feature)) & (x <= np.take(self.zero_point, feature))
+                go_right = np.where(missing, ~np.take(self.default_left, node), go_right)
+            next_node = np.take(self.children, 2 * node + go_right)
+            # Leaves point to themselves, so a fixed point means every row is done
+            if depth % 4 == 3 and np.array_equal(next_node, node):
+                break
+            node = next_node
+        return node
+
+    def _score(self, design: np.ndarray):
+        """Returns (positive-class probability, encoded class index) exactly as the sklearn/XGBoost path."""
+        if self.kind == 'linear':
+            # Sequential accumulation over the columns in order and in the model's dtype, as
+            # scipy's CSR product does, then the sigmoid of scipy's expit
+            terms = design.astype(self.coef.dtype) * self.coef
+            margin = np.cumsum(terms, axis=1, dtype=self.coef.dtype)[:, -1] + self.intercept
+            return _sigmoid(margin).astype(np.float64), (margin > 0).astype(int)
+
+        leaf_values = self.value[self._leaves(design)]  # (n_rows, n_trees, n_values)
+        if self.kind == 'tree':
+            proba = leaf_values[:, 0, :]
+        elif self.kind == 'forest':
+            # Sequential accumulation in tree order, as RandomForestClassifier.predict_proba does
+            proba = np.cumsum(leaf_values, axis=1)[:, -1, :] / leaf_values.shape[1]
+        elif self.kind == 'gradient_boosting':
+            stages = self.learning_rate * leaf_values[:, :, 0]
+            raw = np.cumsum(np.concatenate([np.full((stages.shape[0], 1), self.base_score), stages], axis=1), axis=1)[:, -1]
+            return expit(raw), (raw >= 0).astype(int)
+        elif self.kind == 'xgboost':
+            # XGBoost accumulates float32 leaf values on top of the base margin, then applies a float32 sigmoid
+            leaves = leaf_values[:, :, 0].astype(np.float32)
+            base = np.full((leaves.shape[0], 1), self.base_score, dtype=np.float32)
+            margin = np.cumsum(np.concatenate([base, leaves], axis=1), axis=1, dtype=np.float32)[:, -1]
+            proba = _sigmoid(margin)
+            return proba.astype(np.float64), (proba > 0.5).astype(int)
+        else:
+            raise CustomException(f"Unknown compiled model kind: {self.kind}", sys)
+
+        # Classifier trees: argmax over class columns (ties go to the first class)
+        return proba[:, 1], np.argmax(proba, axis=1)
+
+    def score_arrays(self, numeric: np.ndarray, categorical):
+        """
+        Scores raw numeric values (n, 7) and the 4 categorical columns without pandas.
+        :return: Tuple of (labels, positive-class probabilities).
+        """
+        proba, encoded = self._score(self._design_matrix(numeric, categorical))
+        return self.classes[encoded], proba
+
+    def predict_proba(self, features: pd.DataFrame) -> np.ndarray:
+        return self.score_arrays(*self._split_frame(features))[1]
+
+    def predict(self, features: pd.DataFrame) -> np.ndarray:
+        return self.score_arrays(*self._split_frame(features))[0]
+
+
+def stamp_source_digests(meta: np.ndarray, digests: dict) -> np.ndarray:
+    """The compiled scorer's 'meta' array with `digests` recorded as the model/preprocessor it belongs to."""
+    meta = json.loads(str(meta))
+    meta['source_digests'] = digests
+    return np.array(json.dumps(meta))
+
+
+# --- Compiler ----------------------------------------------------------------------------
+
+class ModelCompiler:
+    def __init__(self):
+        self.model_compiler_config = ModelCompilerConfig()
+
+    @staticmethod
+    def _preprocessor_constants(preprocessor) -> dict:
+        # Incremental training wraps the already-fitted pipelines in FrozenEstimator
+        transformers = {name: (getattr(pipe, 'estimator', pipe), cols)
+                        for name, pipe, cols in preprocessor.transformers_ if name != 'remainder'}
+        num_pipe, numerical_features = transformers['num_pipeline']
+        nominal_pipe, nominal_features = transformers['nominal_pipeline']
+
+        scaler = num_pipe.named_steps['scaler']
+        encoder = nominal_pipe.named_steps['one_hot_encoder']
+        categories = [[str(c) for c in cats] for cats in encoder.categories_]
+
+        n_num = len(numerical_features)
+        offsets = list(np.cumsum([n_num] + [len(c) for c in categories[:-1]]))
+        n_outputs = n_num + sum(len(c) for c in categories)
+
+        # Appended one-hot blocks for categories first seen by incremental training, in output order
+        extra_categories = []
+        for name, (encoder_extra, cols) in transformers.items():
+            if not name.startswith(NEW_CATEGORIES_PREFIX):
+                continue
+            for feature, cats in zip(cols, encoder_extra.categories_):
+                extra_categories.append([feature, [str(c) for c in cats], int(n_outputs)])
+                n_outputs += len(cats)
+
+        return {
+            'numerical_features': list(numerical_features),
+            'nominal_features': list(nominal_features),
+            'num_fill': num_pipe.named_steps['imputer'].statistics_.astype(np.float64),
+            'cat_fill': [str(v) for v in nominal_pipe.named_steps['imputer'].statistics_],
+            'categories': categories,
+            'cat_offsets': [int(o) for o in offsets],
+            'extra_categories': extra_categories,
+            'n_outputs': int(n_outputs),
+            'mean': scaler.mean_.astype(np.float64),
+            'scale': scaler.scale_.astype(np.float64),
+            # Compact dtype plan: inputs rounded to float32 and scaled in float32
+            'float32_inputs': 'float32' in num_pipe.named_steps,
+        }
+
+    @staticmethod
+    def _sklearn_tree_table(tree):
+        t = tree.tree_
+        feature = t.feature.astype(np.int64)
+        is_leaf = t.children_left < 0
+        return {
+            'feature': np.where(is_leaf, 0, feature),
+            'threshold': np.where(is_leaf, np.inf, t.threshold),
+            'left': np.where(is_leaf, np.arange(t.node_count), t.children_left),
+            'right': np.where(is_leaf, np.arange(t.node_count), t.children_right),
+            'default_left': np.zeros(t.node_count, dtype=bool),
+            'value': t.value[:, 0, :],
+            'depth': int(t.max_depth),
+        }
+
+    @staticmethod
+    def _xgboost_tree_tables(model):
+        booster = model.get_booster()
+        learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise CustomException(f"Unsupported XGBoost objective for compilation: {objective}", sys)
+
+        tables = []
+        for tree in learner['gradient_booster']['model']['trees']:
+            left = np.asarray(tree['left_children'], dtype=np.int64)
+            right = np.asarray(tree['right_children'], dtype=np.int64)
+            is_leaf = left < 0
+            node_ids = np.arange(left.shape[0])
+            depth = np.zeros(left.shape[0], dtype=np.int64)
+            for node, parent in enumerate(tree['parents'][1:], start=1):
+                depth[node] = depth[parent] + 1
+            split = np.asarray(tree['split_conditions'], dtype=np.float32)
+            # XGBoost goes left on `x < split` in float32; the float32 predecessor turns that into `<=`
+            le_split = np.nextafter(split, np.float32(-np.inf)).astype(np.float64)
+            tables.append({
+                'feature': np.where(is_leaf, 0, np.asarray(tree['split_indices'], dtype=np.int64)),
+                'threshold': np.where(is_leaf, np.inf, le_split),
+                'left': np.where(is_leaf, node_ids, left),
+                'right': np.where(is_leaf, node_ids, right),
+                'default_left': np.asarray(tree['default_left'], dtype=bool),
+                'value': np.where(is_leaf, split, 0.0).astype(np.float64).reshape(-1, 1),
+                'depth': int(depth.max()),
+            })
+
+        # Base margin exactly as XGBoost derives it from the probability-space base_score
+        base_prob = np.float32(float(learner['learner_model_param']['base_score'].strip('[]')))
+        base_margin = -np.log(np.float32(1.0) / base_prob - np.float32(1.0))
+        return tables, float(np.float32(base_margin))
+
+    def compile(self, preprocessor, model) -> dict:
+        """Exports preprocessor + model into a dict of flat arrays understood by CompiledScorer."""
+        consts = self._preprocessor_constants(preprocessor)
+        n_num = len(consts['numerical_features'])
+        meta = {
+            'numerical_features': consts['numerical_features'],
+            'nominal_features': consts['nominal_features'],
+            'categories': consts['categories'],
+            'cat_fill': consts['cat_fill'],
+            'cat_offsets': consts['cat_offsets'],
+            'extra_categories': consts['extra_categories'],
+            'n_outputs': consts['n_outputs'],
+            'classes': [int(c) for c in model.classes_],
+            'sparse_missing': False,
+            'float32_inputs': consts['float32_inputs'],
+        }
+        float32_inputs = consts['float32_inputs']
+        zero_point = np.zeros(consts['n_outputs'], dtype=np.float64)
+        zero_lower = np.full(consts['n_outputs'], np.nextafter(0.0, -np.inf))
+        if float32_inputs:
+            # Raw values standardizing to exactly 0: above the last one below 0, up to the last one at 0
+            zero_point[:n_num] = fold_thresholds(np.zeros(n_num), consts['mean'], consts['scale'], True)
+            zero_lower[:n_num] = fold_thresholds(np.full(n_num, -float(np.finfo(np.float32).smallest_subnormal)),
+                                                 consts['mean'], consts['scale'], True)
+        else:
+            zero_point[:n_num] = consts['mean']  # raw value that standardizes to exactly 0
+            zero_lower[:n_num] = np.nextafter(consts['mean'], -np.inf)
+        arrays = {'num_fill': consts['num_fill'], 'zero_point': zero_point, 'zero_lower': zero_lower}
+
+        if isinstance(model, LogisticRegression):
+            # Unfolded and in the model's own dtype (float32 when fitted on float32 features): the
+            # scaler is replayed on the numerics so the margin is computed exactly as sklearn does
+            meta['kind'] = 'linear'
+            arrays.update({
+                'coef': model.coef_.ravel().copy(),
+                'intercept': model.intercept_[0],
+                'mean': consts['mean'],
+                'scale': consts['scale'],
+            })
+        else:
+            if isinstance(model, DecisionTreeClassifier):
+                meta['kind'] = 'tree'
+                tables = [self._sklearn_tree_table(model)]
+            elif isinstance(model, RandomForestClassifier):
+                meta['kind'] = 'forest'
+                tables = [self._sklearn_tree_table(est) for est in model.estimators_]
+            elif isinstance(model, GradientBoostingClassifier):
+                meta['kind'] = 'gradient_boosting'
+                tables = [self._sklearn_tree_table(est) for est in model.estimators_[:, 0]]
+                meta['learning_rate'] = float(model.learning_rate)
+                meta['base_score'] = float(model._raw_predict_init(np.zeros((1, consts['n_outputs'])))[0, 0])
+            elif type(model).__name__ == 'XGBClassifier':
+                meta['kind'] = 'xgboost'
+                tables, meta['base_score'] = self._xgboost_tree_tables(model)
+                # With sparse (CSR) preprocessor output XGBoost treats unstored zeros as missing
+                meta['sparse_missing'] = bool(getattr(preprocessor, 'sparse_output_', False))
+            else:
+                raise CustomException(f"Model type {type(model).__name__} cannot be compiled", sys)
+
+            # Stack all trees into one node table with per-tree roots
+            offsets = np.cumsum([0] + [t['left'].shape[0] for t in tables[:-1]])
+            stacked = {
+                'feature': np.concatenate([t['feature'] for t in tables]),
+                'threshold': np.concatenate([t['threshold'] for t in tables]),
+                'left': np.concatenate([t['left'] + o for t, o in zip(tables, offsets)]),
+                'right': np.concatenate([t['right'] + o for t, o in zip(tables, offsets)]),
+                'default_left': np.concatenate([t['default_left'] for t in tables]),
+                'value': np.concatenate([t['value'].astype(np.float64) for t in tables]),
+            }
+            meta['max_depth'] = max(t['depth'] for t in tables)
+
+            # Fold the scaler into the numeric split thresholds (one-hot splits stay as they are)
+            numeric_split = (stacked['feature'] < n_num) & np.isfinite(stacked['threshold'])
+            feat = stacked['feature'][numeric_split]
+            stacked['threshold'][numeric_split] = fold_thresholds(
+                stacked['threshold'][numeric_split], consts['mean'][feat], consts['scale'][feat], float32_inputs
+            )
+
+            arrays.update(stacked)
+            arrays['feature'] = arrays['feature'].astype(np.int32)
+            arrays['roots'] = offsets.astype(np.int32)
+            # children[2 * node] is the left child, children[2 * node + 1] the right one
+            arrays['children'] = np.column_stack([arrays.pop('left'), arrays.pop('right')]).ravel().astype(np.int32)
+
+        arrays['meta'] = np.array(json.dumps(meta))
+        return arrays
+
+    @staticmethod
+    def verify_equivalence(scorer: CompiledScorer, preprocessor, model, features: pd.DataFrame,
+                           threshold: float = None) -> dict:
+        """
+        Checks the compiled scorer against the sklearn path on `features`: labels, probabilities
+        and, when given, the served `pd >= threshold` decisions.
+        """
+        transformed = preprocessor.transform(features)
+        expected_labels = model.predict(transformed)
+        expected_proba = model.predict_proba(transformed)[:, 1].astype(np.float64)
+
+        labels, proba = scorer.score_arrays(*scorer._split_frame(features))
+        report = {
+            'rows': int(len(features)),
+            'label_mismatches': int(np.sum(labels != expected_labels)),
+            'max_abs_proba_diff': float(np.max(np.abs(proba - expected_proba))) if len(features) else 0.0,
+        }
+        if threshold is not None:
+            report['threshold'] = float(threshold)
+            report['decision_mismatches'] = int(np.sum((proba >= threshold) != (expected_proba >= threshold)))
+        return report
+
+    def initiate_model_compilation(self, preprocessor_path: str, model_path: str, verification_data_path: str = None,
+                                   threshold_path: str = None):
+        """
+        Compiles the saved preprocessor + best model into a flat NumPy scorer, verifies it against
+        the sklearn path on held-out data, and saves it.
+        :param threshold_path: threshold.json of the model; its decisions are verified too.
+        """
+        try:
+            logging.info("Compiling preprocessor and model into a flat NumPy scorer.")
+            preprocessor = load_object(preprocessor_path)
+            model = load_object(model_path)
+
+            arrays = self.compile(preprocessor, model)
+            arrays['meta'] = stamp_source_digests(arrays['meta'], source_digests(model_path, preprocessor_path))
+            file_path = self.model_compiler_config.compiled_scorer_file_path
+            CompiledScorer.save(file_path, arrays)
+            scorer = CompiledScorer.load(file_path)
+
+            report = {}
+            if verification_data_path:
+                features = load_frame(verification_data_path).drop(columns=['loan_status'], errors='ignore')
+                threshold = load_json(threshold_path)['threshold'] if threshold_path and os.path.exists(threshold_path) else None
+                report = self.verify_equivalence(scorer, preprocessor, model, features, threshold)
+                logging.info(f"Compiled scorer equivalence check: {report}")
+                if report['label_mismatches'] or report.get('decision_mismatches'):
+                    raise CustomException(f"Compiled scorer disagrees with the sklearn path: {report}", sys)
+
+                numeric, categorical = scorer._split_frame(features.head(1))
+                start = time.perf_counter()
+                for _ in range(1000):
+                    scorer.score_arrays(numeric, categorical)
+                # 1000 calls: total milliseconds == microseconds per call
+                report['single_row_us'] = round((time.perf_counter() - start) * 1000, 2)
+                logging.info(f"Compiled scorer single-row latency: {report['single_row_us']} us")
+
+            return file_path, report
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import shutil
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import save_object, save_json, load_json
+from src.pipeline.stage_cache import fingerprint, file_digest
+
+
+@dataclass
+class ModelRegistryConfig:
+    """Location and retention of the versioned model registry."""
+    registry_dir: str = os.getenv("MODEL_REGISTRY_DIR", os.path.join("artifacts", "model_registry"))
+    # Most recent training runs kept on disk (older version directories are deleted)
+    keep_versions: int = int(os.getenv("MODEL_REGISTRY_KEEP", "5"))
+
+    @property
+    def index_file_path(self) -> str:
+        return os.path.join(self.registry_dir, "registry.json")
+
+
+def model_slug(name: str) -> str:
+    """File-name form of a model's display name ("Random Forest" -> "random_forest")."""
+    return name.lower().replace(' ', '_')
+
+
+class ModelRegistry:
+    """
+    Versioned store of every trained preprocessor + model pair with its cost report.
+
+    Each training run becomes one version directory:
+
+        <registry_dir>/<version>/preprocessor.pkl
+        <registry_dir>/<version>/<model_slug>.pkl     (one per candidate)
+        <registry_dir>/<version>/report.json          (costs, thresholds, champion)
+
+    and registry.json indexes the versions, newest last. A run whose preprocessor and reports
+    are identical to an existing version (e.g. a fully stage-cached re-run) is not stored twice.
+    """
+
+    def __init__(self, config: ModelRegistryConfig = None):
+        self.config = config or ModelRegistryConfig()
+
+    def _index(self) -> dict:
+        if not os.path.exists(self.config.index_file_path):
+            return {'versions': []}
+        return load_json(self.config.index_file_path)
+
+    def versions(self) -> list:
+        """Index entries ({'version', 'created_at', 'champion', 'costs', ...}), oldest first."""
+        return self._index()['versions']
+
+    def latest(self, source: str = None) -> dict:
+        """Newest version, optionally only among those created by `source` ('training' / 'incremental')."""
+        versions = [entry for entry in self.versions() if source is None or entry.get('source') == source]
+        if not versions:
+            raise CustomException(f"Model registry {self.config.registry_dir} has no {source or ''} versions", sys)
+        return versions[-1]
+
+    def get(self, version: str) -> dict:
+        for entry in self.versions():
+            if entry['version'] == version:
+                return entry
+        raise CustomException(f"Unknown model registry version {version!r}", sys)
+
+    def paths(self, version: str, model_name: str) -> dict:
+        """Preprocessor/model file paths and cost-optimal threshold of one registered model."""
+        entry = self.get(version)
+        if model_name not in entry['costs']:
+            raise CustomException(f"Model {model_name!r} is not part of registry version {version}", sys)
+        version_dir = os.path.join(self.config.registry_dir, version)
+        return {
+            'preprocessor': os.path.join(version_dir, 'preprocessor.pkl'),
+            'model': os.path.join(version_dir, f"{model_slug(model_name)}.pkl"),
+            'threshold': entry['thresholds'][model_name],
+        }
+
+    def register_run(self, preprocessor_path: str, models: dict, model_report: dict, champion: str,
+                     source: str = 'training') -> str:
+        """
+        Stores a fitted preprocessor with all its candidate models and their cost reports.
+        :param models: {display name: fitted model}.
+        :param model_report: {display name: metrics with 'Total Cost' and 'Threshold'}.
+        :param champion: Name of the model promoted to artifacts/model.pkl.
+        :return: The version id (existing one if this exact run was registered before).
+        """
+        try:
+            # NumPy scalars -> plain Python numbers for JSON
+            report = {
+                name: {key: value.item() if hasattr(value, 'item') else value for key, value in metrics.items()}
+                for name, metrics in model_report.items()
+            }
+            content_key = fingerprint(file_digest(preprocessor_path), sorted(models), report, champion)[:12]
+            index = self._index()
+            for entry in index['versions']:
+                if entry.get('content_key') == content_key:
+                    logging.info(f"Model registry: run already registered as version {entry['version']}")
+                    return entry['version']
+
+            version = f"{time.strftime('%Y%m%dT%H%M%S')}-{content_key[:8]}"
+            version_dir = os.path.join(self.config.registry_dir, version)
+            tmp_dir = f"{version_dir}.tmp-{os.getpid()}"
+            os.makedirs(tmp_dir, exist_ok=True)
+            shutil.copyfile(preprocessor_path, os.path.join(tmp_dir, 'preprocessor.pkl'))
+            for name, model in models.items():
+                save_object(os.path.join(tmp_dir, f"{model_slug(name)}.pkl"), model)
+            save_json(os.path.join(tmp_dir, 'report.json'),
+                      {'champion': champion, 'source': source, 'models': report})
+            # The version only becomes visible (in the directory and the index) once it is complete
+            os.replace(tmp_dir, version_dir)
+
+            index['versions'].append({
+                'version': version,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'source': source,
+                'champion': champion,
+                'content_key': content_key,
+                'costs': {name: int(metrics['Total Cost']) for name, metrics in report.items()},
+                'thresholds': {name: float(metrics['Threshold']) for name, metrics in report.items()},
+            })
+            removed = self._prune(index)
+            save_json(self.config.index_file_path, index)
+            # Files go only after the index stopped referencing them
+            for entry in removed:
+                shutil.rmtree(os.path.join(self.config.registry_dir, entry['version']), ignore_errors=True)
+                logging.info(f"Model registry: removed version {entry['version']}")
+            logging.info(f"Model registry: stored {len(models)} model(s) as version {version} (champion {champion})")
+            return version
+
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _prune(self, index: dict) -> list:
+        """Drops the oldest versions beyond keep_versions from the index; returns the dropped entries."""
+        excess = len(index['versions']) - max(1, self.config.keep_versions)
+        if excess <= 0:
+            return []
+        removed, index['versions'] = index['versions'][:excess], index['versions'][excess:]
+        return removed
+
+    def challengers(self, spec: str = "") -> list:
+        """
+        Resolves a challenger spec into [(version, model name), ...].
+        :param spec: Comma-separated "model name" (from the latest training run) or "version/model name"
+                     entries; empty selects the lowest-cost non-champion model of the latest training run.
+        """
+        latest = self.latest(source='training')
+        items = [item.strip() for item in spec.split(',') if item.strip()]
+        if not items:
+            ranked = sorted((cost, name) for name, cost in latest['costs'].items() if name != latest['champion'])
+            return [(latest['version'], ranked[0][1])] if ranked else []
+        resolved = []
+        for item in items:
+            version, _, name = item.rpartition('/')
+            version = version or latest['version']
+            self.paths(version, name)  # validates the pair
+            resolved.append((version, name))
+        return resolved
@@ -1,6 +1,10 @@
 import os
 import sys
+import time
+import tempfile
 import numpy as np
+import sklearn
+import xgboost
 from dataclasses import dataclass
 
 # Import ML Algorithms
@@ -11,73 +15,281 @@ from xgboost import XGBClassifier
 
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object, evaluate_models # Import helpers
+from src.utils import (save_object, save_json, evaluate_models, find_cost_optimal_threshold, misclassification_cost,
+                       peak_memory_mb, reset_peak_memory, FN_COST, FP_COST, THRESHOLD_VALIDATION_FRACTION) # Import helpers
+from src.parallelism import apply_profile, get_profile
+from src.pipeline.stage_cache import fingerprint
+from src.components.model_tuner import ModelTuner
+from src.components.model_registry import ModelRegistry
+from src.components.data_transformation import DataTransformationConfig, list_transformed_chunks, load_transformed_chunk
+
+STREAMING_TRAINERS = ('external_memory', 'in_memory')
+
+
+def external_memory_supported() -> bool:
+    """ExtMemQuantileDMatrix ships with xgboost >= 3.0 (Python >= 3.10); older builds only train in memory."""
+    return hasattr(xgboost, 'ExtMemQuantileDMatrix')
 
 @dataclass
 class ModelTrainerConfig:
     """Stores the path where the final best model will be saved."""
     trained_model_file_path = os.path.join("artifacts", "model.pkl")
+    # Cost-optimal PD cut-off of the saved model, applied by PredictPipeline at serving time
+    threshold_file_path = os.path.join("artifacts", "threshold.json")
+    # Parallel evaluation: number of candidate models fitted concurrently (1 = sequential)
+    # and the CPU/thread budget given to each of them.
+    n_jobs: int = int(os.getenv("TRAIN_N_JOBS", "1"))
+    cpus_per_model: int = int(os.getenv("TRAIN_CPUS_PER_MODEL", "1"))
+    # Run the successive-halving cost search (ModelTuner) before the holdout evaluation
+    enable_tuning: bool = os.getenv("TRAIN_TUNE", "0") == "1"
+    # Keep every fitted candidate (with the preprocessor and cost report) in the versioned ModelRegistry
+    register_models: bool = os.getenv("MODEL_REGISTRY", "1") == "1"
+    # Out-of-core runs: 'external_memory' trains XGBoost from the transformed part files, 'in_memory'
+    # stacks them into one CSR (the full matrix must fit in RAM) and compares every candidate
+    streaming_trainer: str = os.getenv("STREAMING_TRAINER", "external_memory")
+
+
+class TransformedChunkIter(xgboost.DataIter):
+    """
+    Feeds XGBoost's external-memory DMatrix one transformed part file at a time.
+    :param file_paths: part-*.npz files written by DataTransformation.initiate_streaming_transformation.
+    :param cache_prefix: Where XGBoost writes its quantised on-disk pages.
+    :param row_mask: Optional callable (part index, number of rows) -> boolean mask of the rows to feed.
+    """
+    def __init__(self, file_paths: list, cache_prefix: str, row_mask=None):
+        self.file_paths = list(file_paths)
+        self.row_mask = row_mask
+        self._position = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self._position == len(self.file_paths):
+            return False
+        X, y = load_transformed_chunk(self.file_paths[self._position])
+        if self.row_mask is not None:
+            keep = self.row_mask(self._position, len(y))
+            X, y = X[keep], y[keep]
+        input_data(data=X, label=y)
+        self._position += 1
+        return True
+
+    def reset(self):
+        self._position = 0
+
+
+def chunk_validation_mask(part_index: int, n_rows: int, fraction: float = None, random_state: int = 42) -> np.ndarray:
+    """
+    Threshold validation rows of one transformed part: a seeded Bernoulli(fraction) draw per row, so
+    every pass over the part files selects the same rows without holding an index of the whole split.
+    """
+    fraction = THRESHOLD_VALIDATION_FRACTION if fraction is None else fraction
+    return np.random.default_rng([random_state, part_index]).random(n_rows) < fraction
 
 class ModelTrainer:
     def __init__(self):
         self.model_trainer_config = ModelTrainerConfig()
+        self.model_report = {}
+        self.registry_version = None
 
-    def initiate_model_trainer(self, train_array, test_array):
+    @staticmethod
+    def get_models() -> dict:
+        """Candidate model dictionary (unfitted), keyed by display name."""
+        return {
+            # FIX: Changed 'Logisticેશન' to 'LogisticRegression'
+            "Logistic Regression": LogisticRegression(random_state=42, max_iter=1000), 
+            "Decision Tree": DecisionTreeClassifier(random_state=42),
+            "Random Forest": RandomForestClassifier(random_state=42),
+            "Gradient Boosting": GradientBoostingClassifier(random_state=42),
+            "XGBoost": XGBClassifier(random_state=42, use_label_encoder=False, eval_metric='logloss'),
+        }
+
+    def initiate_model_trainer(self, X_train, y_train, X_test, y_test, stage_cache=None, models: dict = None,
+                               preprocessor_path: str = None):
         """
-        Splits transformed data, trains and evaluates models, and saves the best model.
+        Trains and evaluates models on the transformed data, and saves the best model.
+        :param X_train, X_test: Feature matrices from DataTransformation (dense or CSR).
+        :param y_train, y_test: Target vectors.
+        :param stage_cache: Optional StageCache; each model's fit + evaluation is then cached under
+            a key of the training/test data, its params and the library versions, so only new or
+            changed models are fitted.
+        :param models: Optional subset/override of get_models().
+        :param preprocessor_path: Preprocessor the models were trained with, stored with them in the
+            ModelRegistry (defaults to DataTransformationConfig's path).
         """
         try:
-            logging.info("Splitting training and test input data.")
-            # Assume last column of array is the target (y)
-            X_train, y_train, X_test, y_test = (
-                train_array[:, :-1],
-                train_array[:, -1],
-                test_array[:, :-1],
-                test_array[:, -1],
-            )
-            
             # Define Model Dictionary
-            models = {
-                # FIX: Changed 'Logisticેશન' to 'LogisticRegression'
-                "Logistic Regression": LogisticRegression(random_state=42, max_iter=1000), 
-                "Decision Tree": DecisionTreeClassifier(random_state=42),
-                "Random Forest": RandomForestClassifier(random_state=42),
-                "Gradient Boosting": GradientBoostingClassifier(random_state=42),
-                "XGBoost": XGBClassifier(random_state=42, use_label_encoder=False, eval_metric='logloss'),
-            }
+            models = dict(models) if models is not None else self.get_models()
+
+            # Optionally tune each family on the 5:1 cost with cross-validation first
+            if self.model_trainer_config.enable_tuning:
+                logging.info("Starting cost-driven hyperparameter search.")
+                tuning_report = ModelTuner().tune(models, X_train, y_train)
+                for name, result in tuning_report.items():
+                    models[name].set_params(**result['params'])
+
+            # Reuse cached fits of unchanged models
+            model_report = {}
+            to_fit = dict(models)
+            model_keys = {}
+            if stage_cache is not None:
+                data_key = fingerprint(X_train, y_train, X_test, y_test)
+                for name, model in models.items():
+                    start = time.perf_counter()
+                    model_keys[name] = fingerprint(data_key, name, model, FN_COST, FP_COST, THRESHOLD_VALIDATION_FRACTION,
+                                                   sklearn.__version__, xgboost.__version__)
+                    hit, cached = stage_cache.get(f"model {name}", model_keys[name])
+                    if hit:
+                        models[name], model_report[name] = cached
+                        del to_fit[name]
+                        stage_cache.record(f"model {name}", True, time.perf_counter() - start, model_keys[name])
 
             # Evaluate Models
-            model_report:dict = evaluate_models(
-                X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test, models=models
-            )
+            if to_fit:
+                fitted_report = evaluate_models(
+                    X_train=X_train, y_train=y_train, X_test=X_test, y_test=y_test, models=to_fit,
+                    n_jobs=self.model_trainer_config.n_jobs,
+                    cpus_per_model=self.model_trainer_config.cpus_per_model,
+                )
+                for name, metrics in fitted_report.items():
+                    models[name] = to_fit[name]
+                    model_report[name] = metrics
+                    if stage_cache is not None:
+                        stage_cache.put(f"model {name}", model_keys[name], (models[name], metrics))
+                        stage_cache.record(f"model {name}", False, metrics['Wall Time (s)'], model_keys[name])
+                # Keep the model dictionary's order so ties resolve as in an uncached run
+                model_report = {name: model_report[name] for name in models}
 
-            # Find the best model based on the LOWEST Total Cost
-            best_model_score = float('inf') # Start with a high value for cost minimization
-            best_model_name = ""
-            best_model = None
+            return self._select_and_save(models, model_report, preprocessor_path)
 
-            for name, metrics in model_report.items():
-                cost = metrics['Total Cost']
-                logging.info(f"Model {name}: Total Misclassification Cost: {cost}")
-                
-                if cost < best_model_score:
-                    best_model_score = cost
-                    best_model_name = name
-                    best_model = models[name]
+        except Exception as e:
+            # Added max_iter=1000 to Logistic Regression to prevent convergence warnings/errors
+            raise CustomException(e, sys)
 
-            if best_model_name == "":
-                raise CustomException("No suitable model found (Check data or cost matrix setup)", sys)
+    def _select_and_save(self, models: dict, model_report: dict, preprocessor_path: str = None):
+        """
+        Saves the lowest-cost model with its threshold and registers the run.
+        :return: Tuple of (best model name, its Total Cost).
+        """
+        # Find the best model based on the LOWEST Total Cost
+        best_model_score = float('inf') # Start with a high value for cost minimization
+        best_model_name = ""
+        best_model = None
 
-            logging.info(f"Best model found: {best_model_name} with Total Cost: {best_model_score}")
+        for name, metrics in model_report.items():
+            cost = metrics['Total Cost']
+            logging.info(f"Model {name}: Total Misclassification Cost: {cost} "
+                         f"at PD threshold {metrics['Threshold']:.4f} (0.5 cut-off: {metrics['Default Threshold Cost']}) "
+                         f"(fit+eval {metrics['Wall Time (s)']}s, peak RSS {metrics['Peak Memory (MB)']} MB)")
             
-            # Save the best model
-            save_object(
-                file_path=self.model_trainer_config.trained_model_file_path,
-                obj=best_model
+            if cost < best_model_score:
+                best_model_score = cost
+                best_model_name = name
+                best_model = models[name]
+
+        if best_model_name == "":
+            raise CustomException("No suitable model found (Check data or cost matrix setup)", sys)
+
+        logging.info(f"Best model found: {best_model_name} with Total Cost: {best_model_score}")
+        # Kept for callers that want the per-model metrics (e.g. the benchmark suite)
+        self.model_report = model_report
+        
+        # Save the best model
+        save_object(
+            file_path=self.model_trainer_config.trained_model_file_path,
+            obj=best_model
+        )
+        save_json(
+            file_path=self.model_trainer_config.threshold_file_path,
+            obj={
+                'model': best_model_name,
+                'threshold': model_report[best_model_name]['Threshold'],
+                'total_cost': int(best_model_score),
+                'default_threshold_cost': int(model_report[best_model_name]['Default Threshold Cost']),
+            }
+        )
+
+        if self.model_trainer_config.register_models:
+            self.registry_version = ModelRegistry().register_run(
+                preprocessor_path or DataTransformationConfig().preprocessor_obj_file_path,
+                models, model_report, best_model_name,
             )
 
-            return best_model_name, best_model_score
+        return best_model_name, best_model_score
+
+    def initiate_external_memory_trainer(self, train_chunks_dir: str, test_chunks_dir: str,
+                                         preprocessor_path: str = None):
+        """
+        Out-of-core training of the XGBoost candidate from transformed part files (STREAMING_TRAINER=external_memory).
+
+        The part files feed an ExtMemQuantileDMatrix through TransformedChunkIter: XGBoost quantises
+        them into pages on disk and trains from those, so only one part is decoded at a time. The
+        threshold validation rows are drawn per part (chunk_validation_mask) and kept out of the fit;
+        only their PD scores are held to choose the cut-off. The test cost is accumulated part by part.
+        The other candidates need the full matrix in memory (STREAMING_TRAINER=in_memory) and so
+        does hyperparameter tuning, which is skipped here.
+        :param train_chunks_dir, test_chunks_dir: Directories of transformed part-*.npz files.
+        :return: Tuple of (best model name, its Total Cost).
+        """
+        try:
+            if not external_memory_supported():
+                raise RuntimeError(f"xgboost {xgboost.__version__} has no ExtMemQuantileDMatrix (xgboost >= 3.0 needed); "
+                                   f"use STREAMING_TRAINER=in_memory")
+            start = time.perf_counter()
+            reset_peak_memory()
+            train_files = list_transformed_chunks(train_chunks_dir)
+            test_files = list_transformed_chunks(test_chunks_dir)
+            if self.model_trainer_config.enable_tuning:
+                logging.warning("TRAIN_TUNE is ignored by the external-memory trainer (the tuner needs the full matrix).")
+
+            model_name = "XGBoost"
+            model = apply_profile(self.get_models()[model_name], get_profile("training"))
+            params = {key: value for key, value in model.get_xgb_params().items()
+                      if value is not None and key != 'use_label_encoder'}
+
+            # 1. Fit on the training rows outside the threshold validation share
+            with tempfile.TemporaryDirectory(prefix='xgboost_external_memory_') as cache_dir:
+                fit_rows = TransformedChunkIter(
+                    train_files, os.path.join(cache_dir, 'train'),
+                    row_mask=lambda part, n_rows: ~chunk_validation_mask(part, n_rows),
+                )
+                dtrain = xgboost.ExtMemQuantileDMatrix(fit_rows, max_bin=params.get('max_bin', 256))
+                booster = xgboost.train(params, dtrain, num_boost_round=model.get_num_boosting_rounds())
+                del dtrain
+            # Same XGBClassifier artifact as the in-memory trainer, for serving, compilation and reason codes
+            model.load_model(bytearray(booster.save_raw('ubj')))
+
+            # 2. Cost-optimal cut-off on the validation rows
+            y_val, val_scores = [], []
+            for part, file_path in enumerate(train_files):
+                X, y = load_transformed_chunk(file_path)
+                mask = chunk_validation_mask(part, len(y))
+                y_val.append(y[mask])
+                val_scores.append(model.predict_proba(X[mask])[:, 1])
+            threshold, validation_cost = find_cost_optimal_threshold(np.concatenate(y_val), np.concatenate(val_scores))
+
+            # 3. Cost of that fixed rule on the test parts
+            cm = np.zeros((2, 2), dtype=np.int64)
+            default_cost = 0
+            for file_path in test_files:
+                X, y = load_transformed_chunk(file_path)
+                y_pred = (model.predict_proba(X)[:, 1].astype(np.float64) >= threshold).astype(int)
+                np.add.at(cm, (np.asarray(y, dtype=np.int64), y_pred), 1)
+                default_cost += misclassification_cost(y, model.predict(X))
+            TN, FP, FN, TP = cm.ravel()
+
+            model_report = {model_name: {
+                'Accuracy': float((TN + TP) / max(cm.sum(), 1)),
+                'Total Cost': int(FN_COST * FN + FP_COST * FP),
+                'Confusion Matrix': cm.tolist(),
+                'Threshold': threshold,
+                'Validation Cost': int(validation_cost),
+                'Default Threshold Cost': int(default_cost),
+                'Wall Time (s)': round(time.perf_counter() - start, 3),
+                'Peak Memory (MB)': round(peak_memory_mb(), 1),
+            }}
+            logging.info(f"External-memory XGBoost trained on {len(train_files)} part(s), "
+                         f"tested on {len(test_files)} part(s).")
+            return self._select_and_save({model_name: model}, model_report, preprocessor_path)
 
         except Exception as e:
-            # Added max_iter=1000 to Logistic Regression to prevent convergence warnings/errors
-            raise CustomException(e, sys)
\ No newline at end of file
+            raise CustomException(e, sys)
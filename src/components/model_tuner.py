@@ -0,0 +1,292 @@
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import tempfile
+import multiprocessing
+import joblib
+import numpy as np
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from scipy.stats import loguniform, uniform
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler, StratifiedKFold
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import find_cost_optimal_threshold, limit_model_threads, densify_for_model
+from src.pipeline.stage_cache import fingerprint as data_fingerprint
+
+# --- Search spaces per model family (keys match ModelTrainer's model dictionary) ---
+PARAM_SPACES = {
+    "Logistic Regression": {
+        "C": loguniform(1e-3, 1e2),
+        "class_weight": [None, "balanced"],
+    },
+    "Decision Tree": {
+        "max_depth": [4, 6, 8, 10, 12, 16, 20, None],
+        "min_samples_leaf": [1, 2, 5, 10, 20, 50],
+        "criterion": ["gini", "entropy"],
+        "class_weight": [None, "balanced"],
+    },
+    "Random Forest": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [8, 12, 16, 24, None],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": ["sqrt", 0.5, None],
+        "class_weight": [None, "balanced", "balanced_subsample"],
+    },
+    "Gradient Boosting": {
+        "n_estimators": [100, 200, 400],
+        "learning_rate": loguniform(0.01, 0.3),
+        "max_depth": [2, 3, 4, 5],
+        "subsample": [0.6, 0.8, 1.0],
+    },
+    "XGBoost": {
+        "n_estimators": [100, 200, 400, 800],
+        "learning_rate": loguniform(0.01, 0.3),
+        "max_depth": [3, 4, 5, 6, 8, 10],
+        "subsample": uniform(0.6, 0.4),
+        "colsample_bytree": uniform(0.5, 0.5),
+        "min_child_weight": [1, 3, 5, 10],
+        # The 5:1 cost makes up-weighting defaults an obvious knob to search
+        "scale_pos_weight": [1, 2, 3, 5],
+    },
+}
+
+
+@dataclass
+class ModelTunerConfig:
+    """Successive-halving search settings and the resumable checkpoint location."""
+    checkpoint_file_path: str = os.path.join("artifacts", "tuning_checkpoint.jsonl")
+    n_candidates: int = 27          # sampled configurations per model family
+    eta: int = 3                    # keep the best 1/eta candidates per rung, grow rows by eta
+    min_resource_fraction: float = 1 / 9  # share of training rows used at the first rung
+    cv_folds: int = 3
+    time_budget_seconds: float = float(os.getenv("TUNE_TIME_BUDGET", "900"))
+    max_trials: int = 0             # compute budget in (candidate, rung) trials; 0 = unlimited
+    n_jobs: int = int(os.getenv("TUNE_N_JOBS", str(max(1, (os.cpu_count() or 2) - 1))))
+    cpus_per_trial: int = 1
+    random_state: int = 42
+
+
+# --- Worker side ---
+
+_worker_data = {}
+
+
+def _run_trial(task):
+    """
+    Cross-validated 5:1 cost of one candidate on the first `n_rows` of the shuffled training data,
+    at the cost-optimal threshold of its out-of-fold PD scores (the decision rule used at serving).
+    """
+    model, params, data_path, n_rows, cv_folds, n_threads, random_state = task
+    from threadpoolctl import threadpool_limits
+
+    if data_path not in _worker_data:
+        # Loaded once per worker process, memory-mapped and shared through the page cache
+        _worker_data.clear()
+        _worker_data[data_path] = joblib.load(data_path, mmap_mode="r")
+    data = _worker_data[data_path]
+    order = data["order"][:n_rows]
+    X, y = densify_for_model(model, data["X"][order]), np.asarray(data["y"])[order]
+
+    start = time.perf_counter()
+    out_of_fold = np.empty(len(y), dtype=np.float64)
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=random_state)
+    with threadpool_limits(limits=n_threads):
+        for train_idx, val_idx in cv.split(X, y):
+            estimator = clone(model).set_params(**params)
+            limit_model_threads(estimator, n_threads)
+            estimator.fit(X[train_idx], y[train_idx])
+            out_of_fold[val_idx] = estimator.predict_proba(X[val_idx])[:, 1]
+    threshold, total_cost = find_cost_optimal_threshold(y, out_of_fold)
+
+    # Normalised per 1000 applications so rungs of different sizes are comparable
+    return {
+        "cost": total_cost,
+        "cost_per_1k": 1000.0 * total_cost / n_rows,
+        "threshold": threshold,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def _describe(value) -> str:
+    """Stable text for a search-space entry (frozen scipy distributions repr with a memory address)."""
+    if hasattr(value, "dist") and hasattr(value, "args"):
+        return f"{value.dist.name}{tuple(value.args)}{sorted(value.kwds.items())}"
+    return repr(value)
+
+
+def _jsonable(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ModelTuner:
+    """
+    Cost-driven hyperparameter search with successive halving.
+
+    Every family samples `n_candidates` configurations, scores them with cross-validated
+    FN x 5 + FP x 1 cost on a small share of the rows, keeps the best 1/eta and re-scores the
+    survivors on eta times more rows until one remains or all rows are used. Trials of all
+    families run concurrently on a process pool; each finished trial is appended to a JSONL
+    checkpoint so an interrupted search resumes where it stopped.
+    """
+
+    def __init__(self, config: ModelTunerConfig = None):
+        self.model_tuner_config = config or ModelTunerConfig()
+
+    def _fingerprint(self, models: dict, X, y) -> str:
+        """Identifies a search (spaces, config, estimators, training data) so stale checkpoints are ignored."""
+        cfg = self.model_tuner_config
+        material = json.dumps({
+            "spaces": {name: {k: _describe(v) for k, v in PARAM_SPACES.get(name, {}).items()} for name in models},
+            "models": {name: repr(model) for name, model in models.items()},
+            "config": [cfg.n_candidates, cfg.eta, cfg.min_resource_fraction, cfg.cv_folds, cfg.random_state],
+            # Trials score the out-of-fold cost at the cost-optimal threshold (not at the 0.5 cut-off)
+            "objective": "oof_cost_optimal_threshold",
+            # Content hash: a refreshed dataset of the same shape and positive count is a new search
+            "data": data_fingerprint(X, y),
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()[:16]
+
+    def _load_checkpoint(self, fingerprint: str) -> dict:
+        done = {}
+        path = self.model_tuner_config.checkpoint_file_path
+        if not os.path.exists(path):
+            return done
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a torn last line from an interrupted run
+                if record.get("search") == fingerprint:
+                    done[(record["model"], record["candidate"], record["rung"])] = record
+        return done
+
+    def _append_checkpoint(self, record: dict):
+        path = self.model_tuner_config.checkpoint_file_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def tune(self, models: dict, X_train, y_train) -> dict:
+        """
+        Searches each family in PARAM_SPACES within the time/trial budget.
+        :return: {model_name: {"params": ..., "cv_cost_per_1k": ..., "rows": ..., "trials": ...}}
+        """
+        cfg = self.model_tuner_config
+        try:
+            y_train = np.asarray(y_train).astype(int)
+            n_total = X_train.shape[0]
+            families = [name for name in models if name in PARAM_SPACES]
+            fingerprint = self._fingerprint(models, X_train, y_train)
+            done = self._load_checkpoint(fingerprint)
+            if done:
+                logging.info(f"Resuming hyperparameter search {fingerprint}: {len(done)} trials already checkpointed.")
+
+            candidates = {
+                name: [{k: _jsonable(v) for k, v in params.items()}
+                       for params in ParameterSampler(PARAM_SPACES[name], cfg.n_candidates, random_state=cfg.random_state)]
+                for name in families
+            }
+            survivors = {name: list(range(len(candidates[name]))) for name in families}
+            results = {name: {} for name in families}
+
+            n_rungs = 1 + max(0, math.ceil(math.log(1 / cfg.min_resource_fraction, cfg.eta)))
+            deadline = time.monotonic() + cfg.time_budget_seconds
+            trials_run = 0
+            budget_exhausted = False
+
+            with tempfile.TemporaryDirectory(prefix="model_tuner_") as tmp_dir:
+                data_path = os.path.join(tmp_dir, "train.joblib")
+                order = np.random.RandomState(cfg.random_state).permutation(n_total)
+                joblib.dump({"X": X_train, "y": y_train, "order": order}, data_path)
+
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=cfg.n_jobs, mp_context=context) as executor:
+                    for rung in range(n_rungs):
+                        n_rows = min(n_total, int(n_total * cfg.min_resource_fraction * cfg.eta ** rung))
+                        queued = deque()
+                        for name in families:
+                            if len(survivors[name]) <= 1 and rung > 0:
+                                continue
+                            for cand in survivors[name]:
+                                key = (name, cand, rung)
+                                if key in done:
+                                    results[name][cand] = done[key]
+                                else:
+                                    queued.append(key)
+
+                        # Submitted lazily, at most n_jobs in flight, so the budget is checked before every
+                        # trial: past the deadline a rung overruns by at most the trials already running
+                        pending = {}
+                        while queued or pending:
+                            while queued and len(pending) < cfg.n_jobs and not budget_exhausted:
+                                if time.monotonic() > deadline or (cfg.max_trials and trials_run >= cfg.max_trials):
+                                    budget_exhausted = True
+                                    break
+                                key = queued.popleft()
+                                name, cand, _ = key
+                                task = (models[name], candidates[name][cand], data_path, n_rows,
+                                        cfg.cv_folds, cfg.cpus_per_trial, cfg.random_state)
+                                pending[executor.submit(_run_trial, task)] = key
+                                trials_run += 1
+                            if budget_exhausted:
+                                queued.clear()
+                                for future in [f for f in pending if f.cancel()]:
+                                    del pending[future]
+                            if not pending:
+                                break
+
+                            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                name, cand, trial_rung = pending.pop(future)
+                                record = {
+                                    "search": fingerprint, "model": name, "candidate": cand, "rung": trial_rung,
+                                    "rows": n_rows, "params": candidates[name][cand], **future.result(),
+                                }
+                                self._append_checkpoint(record)
+                                results[name][cand] = record
+
+                        # Successive halving: keep the best 1/eta of the candidates scored at this rung
+                        for name in families:
+                            scored = [c for c in survivors[name] if results[name].get(c, {}).get("rung") == rung]
+                            if not scored:
+                                continue
+                            scored.sort(key=lambda c: results[name][c]["cost_per_1k"])
+                            survivors[name] = scored[:max(1, len(scored) // cfg.eta)]
+                            logging.info(f"Tuning {name} rung {rung} ({n_rows} rows): "
+                                         f"{len(scored)} scored, {len(survivors[name])} kept, "
+                                         f"best cost/1k {results[name][scored[0]]['cost_per_1k']:.2f}")
+
+                        if budget_exhausted:
+                            logging.info("Tuning budget exhausted; keeping the best configuration found so far.")
+                            break
+
+            best = {}
+            for name in families:
+                if not results[name]:
+                    continue
+                # Prefer evidence from the largest rung, then the lowest cost
+                cand = min(results[name], key=lambda c: (-results[name][c]["rung"], results[name][c]["cost_per_1k"]))
+                record = results[name][cand]
+                best[name] = {
+                    "params": record["params"],
+                    "cv_cost_per_1k": record["cost_per_1k"],
+                    "rows": record["rows"],
+                    "trials": len(results[name]),
+                }
+                logging.info(f"Best {name} params: {record['params']} (cv cost/1k {record['cost_per_1k']:.2f})")
+            return best
+
+        except Exception as e:
+            raise CustomException(e, sys)
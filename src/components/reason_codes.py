@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import numpy as np
+from dataclasses import dataclass
+from scipy import sparse
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object, save_object, load_frame
+from src.components.model_compiler import ModelCompiler
+from src.pipeline.stage_cache import source_digests
+
+
+@dataclass
+class ReasonCodeConfig:
+    """Where the reason-code explainer is saved and how many reasons are reported per row."""
+    explainer_file_path: str = os.path.join('artifacts', 'reason_codes.pkl')
+    top_k: int = int(os.getenv("REASON_CODES_TOP_K", "3"))
+    # Training rows transformed to estimate the background expectation E[f(x)] / E[x]
+    background_rows: int = int(os.getenv("REASON_CODES_BACKGROUND_ROWS", "10000"))
+
+
+def _float32_le_split(thresholds: np.ndarray) -> np.ndarray:
+    """
+    XGBoost split value equivalent to sklearn's `float32(x) <= t`: with t32 the largest float32
+    <= t, XGBoost's `x < nextafter(t32, +inf)` takes exactly the same branch.
+    """
+    t32 = thresholds.astype(np.float32)
+    t32 = np.where(t32.astype(np.float64) > thresholds, np.nextafter(t32, np.float32(-np.inf)), t32)
+    return np.nextafter(t32, np.float32(np.inf))
+
+
+def _xgboost_tree_json(tree, leaf_values: np.ndarray, tree_id: int, n_features: int) -> dict:
+    """One sklearn tree as an XGBoost JSON tree; node covers (sum_hessian) drive TreeSHAP's path weights."""
+    t = tree.tree_
+    # XGBoost finds the right child at left + 1: renumber sklearn's depth-first nodes breadth-first
+    order = [0]
+    for node in order:
+        if t.children_left[node] >= 0:
+            order.extend((t.children_left[node], t.children_right[node]))
+    order = np.asarray(order)
+    new_id = np.empty(t.node_count, dtype=np.int64)
+    new_id[order] = np.arange(t.node_count)
+
+    is_leaf = t.children_left[order] < 0
+    left = np.where(is_leaf, -1, new_id[t.children_left[order]])
+    right = np.where(is_leaf, -1, new_id[t.children_right[order]])
+    parents = np.full(t.node_count, 2147483647, dtype=np.int64)
+    internal = np.flatnonzero(~is_leaf)
+    parents[left[internal]] = internal
+    parents[right[internal]] = internal
+    values = leaf_values[order]
+    split_conditions = np.where(is_leaf, values, _float32_le_split(t.threshold[order])).astype(np.float32)
+    return {
+        "base_weights": np.where(is_leaf, values, 0.0).astype(np.float32).tolist(),
+        "categories": [], "categories_nodes": [], "categories_segments": [], "categories_sizes": [],
+        "default_left": [0] * t.node_count,
+        "id": tree_id,
+        "left_children": left.tolist(),
+        "loss_changes": [0.0] * t.node_count,
+        "parents": parents.tolist(),
+        "right_children": right.tolist(),
+        "split_conditions": split_conditions.tolist(),
+        "split_indices": np.where(is_leaf, 0, t.feature[order]).tolist(),
+        "split_type": [0] * t.node_count,
+        "sum_hessian": t.weighted_n_node_samples[order].tolist(),
+        "tree_param": {"num_deleted": "0", "num_feature": str(n_features),
+                       "num_nodes": str(t.node_count), "size_leaf_vector": "1"},
+    }
+
+
+def sklearn_trees_to_booster(model, n_features: int):
+    """
+    Re-expresses a fitted sklearn tree model as an XGBoost regression booster with the same
+    output (P(default) for trees/forests, the raw log-odds sum without its init score for
+    gradient boosting), so XGBoost's native TreeSHAP (pred_contribs) explains it.
+    """
+    import xgboost as xgb
+
+    if isinstance(model, DecisionTreeClassifier):
+        trees = [(model, model.tree_.value[:, 0, 1])]
+    elif isinstance(model, RandomForestClassifier):
+        # Class fractions per leaf, averaged over the forest
+        trees = [(est, est.tree_.value[:, 0, 1] / len(model.estimators_)) for est in model.estimators_]
+    elif isinstance(model, GradientBoostingClassifier):
+        trees = [(est, est.tree_.value[:, 0, 0] * model.learning_rate) for est in model.estimators_[:, 0]]
+    else:
+        raise CustomException(f"No tree conversion for model type {type(model).__name__}", sys)
+
+    document = {
+        "learner": {
+            "attributes": {}, "feature_names": [], "feature_types": [],
+            "gradient_booster": {
+                "model": {
+                    "cats": {"enc": [], "feature_segments": [], "sorted_idx": []},
+                    "gbtree_model_param": {"num_parallel_tree": "1", "num_trees": str(len(trees))},
+                    "iteration_indptr": list(range(len(trees) + 1)),
+                    "tree_info": [0] * len(trees),
+                    "trees": [_xgboost_tree_json(est, values, i, n_features) for i, (est, values) in enumerate(trees)],
+                },
+                "name": "gbtree",
+            },
+            "learner_model_param": {"base_score": "[0E0]", "boost_from_average": "0", "num_class": "0",
+                                    "num_feature": str(n_features), "num_target": "1"},
+            "objective": {"name": "reg:squarederror", "reg_loss_param": {"scale_pos_weight": "1"}},
+        },
+        "version": [3, 0, 0],
+    }
+    booster = xgb.Booster()
+    booster.load_model(bytearray(json.dumps(document).encode()))
+    return booster
+
+
+class ReasonCodeExplainer:
+    """
+    Per-row feature contributions of the served model, summed from the transformed (one-hot)
+    columns back to the 11 applicant fields.
+
+    - XGBoost: native TreeSHAP of the model's own booster (pred_contribs), in log-odds.
+    - sklearn trees: the same native TreeSHAP on an equivalent XGBoost booster built at training
+      time (probability for trees/forests, log-odds for gradient boosting).
+    - LogisticRegression: exact linear contributions coef * (x - E[x]), in log-odds.
+
+    Contributions of a row plus `expected_value` add up to the model output, so a positive
+    contribution is a field that pushed the applicant towards REJECT.
+    """
+    # file_digest of the model.pkl/preprocessor.pkl it explains (None for explainers of older versions)
+    source_digests = None
+
+    def __init__(self, kind: str, fields: list, field_index: np.ndarray, space: str, expected_value: float,
+                 booster=None, coef: np.ndarray = None, background_mean: np.ndarray = None):
+        self.kind = kind
+        self.fields = list(fields)
+        self.field_index = np.asarray(field_index, dtype=np.int64)
+        self.space = space
+        self.expected_value = float(expected_value)
+        self.booster = booster
+        self.coef = coef
+        self.background_mean = background_mean
+        # (n_columns, n_fields) 0/1 matrix summing one-hot columns into their field
+        self._grouping = sparse.csr_matrix(
+            (np.ones(self.field_index.shape[0]), (np.arange(self.field_index.shape[0]), self.field_index)),
+            shape=(self.field_index.shape[0], len(self.fields)),
+        )
+
+    def column_contributions(self, X, model=None) -> np.ndarray:
+        """(n, n_columns) contributions for the transformed matrix X (as returned by the preprocessor)."""
+        if self.kind == 'linear':
+            dense = X.toarray() if sparse.issparse(X) else np.asarray(X, dtype=np.float64)
+            return (dense - self.background_mean) * self.coef
+
+        import xgboost as xgb
+        if self.kind == 'xgboost':
+            # Same DMatrix as predict_proba: with CSR input, unstored zeros are missing values
+            booster = model.get_booster()
+            dmatrix = xgb.DMatrix(X, missing=model.missing)
+        else:
+            # sklearn trees read zeros as zeros: hand XGBoost a dense float32 matrix
+            booster = self.booster
+            dense = X.toarray() if sparse.issparse(X) else np.asarray(X)
+            dmatrix = xgb.DMatrix(dense.astype(np.float32), missing=np.nan)
+        return booster.predict(dmatrix, pred_contribs=True)[:, :-1]
+
+    def contributions(self, X, model=None) -> np.ndarray:
+        """(n, 11) contributions per applicant field, in APPLICANT field order of `fields`."""
+        return np.asarray(self._grouping.T.dot(self.column_contributions(X, model).T).T)
+
+    def top_reasons(self, X, model=None, top_k: int = 3) -> list:
+        """
+        The `top_k` fields with the largest positive contributions towards default, per row.
+        Fields that pushed towards approval (contribution <= 0) are never reasons, so a row can get fewer.
+        :return: List (one per row) of [{'feature': field, 'contribution': value}, ...], largest first.
+        """
+        contributions = self.contributions(X, model)
+        top_k = min(top_k, contributions.shape[1])
+        order = np.argsort(-contributions, axis=1, kind='stable')[:, :top_k]
+        values = np.take_along_axis(contributions, order, axis=1)
+        return [
+            [{'feature': self.fields[j], 'contribution': round(float(v), 6)}
+             for j, v in zip(row_order, row_values) if v > 0]
+            for row_order, row_values in zip(order.tolist(), values.tolist())
+        ]
+
+
+class ReasonCodeBuilder:
+    def __init__(self):
+        self.reason_code_config = ReasonCodeConfig()
+
+    @staticmethod
+    def field_index(preprocessor) -> tuple:
+        """Maps every transformed column to the index of the applicant field it came from."""
+        consts = ModelCompiler._preprocessor_constants(preprocessor)
+        fields = consts['numerical_features'] + consts['nominal_features']
+        index = np.empty(consts['n_outputs'], dtype=np.int64)
+        n_num = len(consts['numerical_features'])
+        index[:n_num] = np.arange(n_num)
+        for j, (categories, offset) in enumerate(zip(consts['categories'], consts['cat_offsets'])):
+            index[offset:offset + len(categories)] = n_num + j
+        for feature, categories, offset in consts['extra_categories']:
+            index[offset:offset + len(categories)] = n_num + consts['nominal_features'].index(feature)
+        return fields, index
+
+    def build(self, preprocessor, model, X_background) -> ReasonCodeExplainer:
+        """Builds the explainer for `model`; X_background is a sample of transformed training rows."""
+        fields, index = self.field_index(preprocessor)
+        n_columns = index.shape[0]
+
+        if isinstance(model, LogisticRegression):
+            background_mean = np.asarray(X_background.mean(axis=0), dtype=np.float64).ravel()
+            coef = model.coef_.ravel().astype(np.float64)
+            expected_value = float(model.intercept_[0] + coef @ background_mean)
+            return ReasonCodeExplainer('linear', fields, index, 'log_odds', expected_value,
+                                       coef=coef, background_mean=background_mean)
+
+        import xgboost as xgb
+        if type(model).__name__ == 'XGBClassifier':
+            explainer = ReasonCodeExplainer('xgboost', fields, index, 'log_odds', 0.0)
+        else:
+            booster = sklearn_trees_to_booster(model, n_columns)
+            space = 'log_odds' if isinstance(model, GradientBoostingClassifier) else 'probability'
+            explainer = ReasonCodeExplainer('tree', fields, index, space, 0.0, booster=booster)
+
+        # TreeSHAP's bias column is the cover-weighted expected output (constant over rows)
+        sample = X_background[:1]
+        if explainer.kind == 'xgboost':
+            bias = model.get_booster().predict(xgb.DMatrix(sample, missing=model.missing), pred_contribs=True)[0, -1]
+        else:
+            dense = sample.toarray() if sparse.issparse(sample) else np.asarray(sample)
+            bias = explainer.booster.predict(xgb.DMatrix(dense.astype(np.float32)), pred_contribs=True)[0, -1]
+            if isinstance(model, GradientBoostingClassifier):
+                bias += float(model._raw_predict_init(np.zeros((1, n_columns)))[0, 0])
+        explainer.expected_value = float(bias)
+        return explainer
+
+    @staticmethod
+    def verify_additivity(explainer: ReasonCodeExplainer, model, X) -> float:
+        """Max |sum(contributions) + expected value - model output| on X (0 up to float32 rounding)."""
+        if not X.shape[0]:
+            return 0.0
+        total = explainer.column_contributions(X, model).sum(axis=1) + explainer.expected_value
+        if explainer.kind == 'xgboost':
+            output = model.predict(X, output_margin=True)
+        elif explainer.space == 'log_odds':
+            output = model.decision_function(X)
+        else:
+            output = model.predict_proba(X)[:, 1]
+        return float(np.max(np.abs(total - output)))
+
+    def initiate_reason_codes(self, preprocessor_path: str, model_path: str, background_data_path: str):
+        """
+        Builds the reason-code explainer for the saved preprocessor + model, with background
+        expectations from (a sample of) the training data, checks additivity and saves it.
+        :return: Tuple of (explainer file path, report dict).
+        """
+        try:
+            logging.info("Building reason-code explainer.")
+            preprocessor = load_object(preprocessor_path)
+            model = load_object(model_path)
+
+            features = load_frame(background_data_path).drop(columns=['loan_status'], errors='ignore')
+            if len(features) > self.reason_code_config.background_rows:
+                features = features.sample(self.reason_code_config.background_rows, random_state=42)
+            X_background = preprocessor.transform(features)
+
+            explainer = self.build(preprocessor, model, X_background)
+            report = {
+                'kind': explainer.kind,
+                'space': explainer.space,
+                'expected_value': explainer.expected_value,
+                'max_additivity_error': self.verify_additivity(explainer, model, X_background[:1000]),
+            }
+            logging.info(f"Reason-code explainer: {report}")
+
+            explainer.source_digests = source_digests(model_path, preprocessor_path)
+            file_path = self.reason_code_config.explainer_file_path
+            save_object(file_path, explainer)
+            return file_path, report
+
+        except Exception as e:
+            raise CustomException(e, sys)
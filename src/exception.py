@@ -7,8 +7,13 @@ def error_message_detail(error, error_detail:sys):
     :param error_detail: sys.exc_info() output
     """
     _, _, exc_tb = error_detail.exc_info()
-    file_name = exc_tb.tb_frame.f_code.co_filename
-    line_number = exc_tb.tb_lineno
+    if exc_tb is None:
+        # Raised directly (not while handling another exception): report the raising frame
+        frame = sys._getframe(2)
+        file_name, line_number = frame.f_code.co_filename, frame.f_lineno
+    else:
+        file_name = exc_tb.tb_frame.f_code.co_filename
+        line_number = exc_tb.tb_lineno
     error_message = "Error occurred in python script name [{0}] line number [{1}] error message [{2}]".format(
         file_name, line_number, str(error)
     )
@@ -1,10 +1,40 @@
 import logging
+import logging.handlers
 import os
 import sys # Import sys for stdout handler
+import json
+import queue
+import atexit
+import random
+import itertools
+import reprlib
+from dataclasses import dataclass
 from datetime import datetime
 
-# Define the log file name
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+
+@dataclass
+class LoggingConfig:
+    """Log destination, format and hot-path cost controls (all overridable via environment)."""
+    # Defaults to one timestamped file per process, so concurrent gunicorn workers never share
+    # (and never rotate) the same file; set LOG_FILE to a fixed name for a single process.
+    log_file: str = os.getenv("LOG_FILE", f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log")
+    level: str = os.getenv("LOG_LEVEL", "INFO")
+    # "text" keeps the classic line format; "json" emits one JSON object per line
+    log_format: str = os.getenv("LOG_FORMAT", "text")
+    # Callers only enqueue the record; a background thread formats and writes it
+    async_mode: bool = os.getenv("LOG_ASYNC", "1") == "1"
+    # Size-based rotation of the file handler (0 disables rotation)
+    max_bytes: int = int(float(os.getenv("LOG_MAX_MB", "50")) * 1024 * 1024)
+    backup_count: int = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    # Per-logger sampling of INFO/DEBUG records, e.g. "request=0.01,batch=0.1"
+    sample_rates: str = os.getenv("LOG_SAMPLE_RATES", "request=0.01")
+    # Longest payload (characters) log_payload() writes for one request
+    max_payload_chars: int = int(os.getenv("LOG_MAX_PAYLOAD_CHARS", "512"))
+    # Records dropped (rather than blocking the caller) once this many are waiting
+    queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+
+logging_config = LoggingConfig()
 
 # Define the logs directory path
 LOGS_DIR = os.path.join(os.getcwd(), "logs")
@@ -13,17 +43,207 @@ LOGS_DIR = os.path.join(os.getcwd(), "logs")
 os.makedirs(LOGS_DIR, exist_ok=True)
 
 # Define the full log file path
+LOG_FILE = logging_config.log_file
 LOG_FILE_PATH = os.path.join(LOGS_DIR, LOG_FILE)
 
-# CRITICAL FIX 2: Add logging.StreamHandler(sys.stdout) to capture logs in AWS EB
-logging.basicConfig(
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-    handlers=[
-        logging.FileHandler(LOG_FILE_PATH), # Keeps the local file logging
-        logging.StreamHandler(sys.stdout)  # Sends logs to standard output for AWS EB
-    ]
-)
+TEXT_FORMAT = "[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and goes into the JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, location, message and any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` fraction of records below WARNING; warnings and errors always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def keep(self, level: int) -> bool:
+        return level >= logging.WARNING or random.random() < self.rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # log_payload() samples before building the record and marks survivors as sampled
+        return getattr(record, "sampled", False) or self.keep(record.levelno)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller: records are enqueued with put_nowait and dropped
+    (and counted) when the queue is full. Formatting is left to the listener thread; only the
+    message arguments and traceback are resolved here, so later mutation cannot change them.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_sample_rates(spec: str) -> dict:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+class _PayloadRepr(reprlib.Repr):
+    """reprlib.Repr that keeps dict insertion order and never visits more than `maxdict` items."""
+
+    def repr_dict(self, x, level):
+        if not x:
+            return "{}"
+        if level <= 0:
+            return "{...}"
+        items = [f"{self.repr1(key, level - 1)}: {self.repr1(value, level - 1)}"
+                 for key, value in itertools.islice(x.items(), self.maxdict)]
+        if len(x) > self.maxdict:
+            items.append("...")
+        return "{" + ", ".join(items) + "}"
+
+
+def _bounded_repr(payload, max_chars: int) -> str:
+    """
+    repr(payload) capped at `max_chars`. reprlib cuts long strings and large containers while they
+    are rendered, so a huge payload costs about as much as a small one instead of a full repr.
+    """
+    limits = _PayloadRepr()
+    limits.maxlevel = 2
+    limits.maxstring = limits.maxother = limits.maxlong = max_chars
+    # A container never shows more elements than could fit in max_chars anyway
+    limits.maxdict = limits.maxlist = limits.maxtuple = limits.maxset = max(max_chars // 16, 1)
+    limits.maxfrozenset = limits.maxdeque = limits.maxarray = limits.maxlist
+    text = limits.repr(payload)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}... [truncated]"
+    return text
+
+
+def log_payload(logger: logging.Logger, message: str, payload, level: int = logging.INFO,
+                max_chars: int = None):
+    """
+    Logs `message` followed by a repr of `payload` capped at `max_chars` (LOG_MAX_PAYLOAD_CHARS).
+    Level and sampling are decided before any LogRecord is created, so a request whose log is
+    sampled out pays only a level check and one random draw. A kept record's repr is built here,
+    on the caller's thread, with reprlib size limits rather than as a full repr.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    for sampler in logger.filters:
+        if isinstance(sampler, SamplingFilter) and not sampler.keep(level):
+            return
+    max_chars = logging_config.max_payload_chars if max_chars is None else max_chars
+    logger.log(level, "%s %s", message, _bounded_repr(payload, max_chars),
+               extra={"sampled": True}, stacklevel=2)
+
+
+def _build_handlers(config: LoggingConfig) -> list:
+    log_file_path = os.path.join(LOGS_DIR, config.log_file)
+    if config.max_bytes > 0:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file_path, maxBytes=config.max_bytes, backupCount=config.backup_count
+        )
+    else:
+        file_handler = logging.FileHandler(log_file_path) # Keeps the local file logging
+    # CRITICAL FIX 2: Add logging.StreamHandler(sys.stdout) to capture logs in AWS EB
+    handlers = [file_handler, logging.StreamHandler(sys.stdout)]
+    formatter = JsonFormatter() if config.log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _stop_listener(listener):
+    """Drains the queue and closes the handlers; safe to call more than once."""
+    if listener._thread is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def configure_logging(config: LoggingConfig = logging_config):
+    """
+    Installs the root handlers (file + stdout), either directly or behind a queue drained by a
+    background QueueListener, and attaches a SamplingFilter to each logger in `sample_rates`.
+    :return: The QueueListener in async mode (stopped and flushed at exit), else None.
+    """
+    global log_listener
+    if log_listener is not None:
+        _stop_listener(log_listener)  # reconfiguring: flush and retire the previous background thread
+        log_listener = None
+
+    handlers = _build_handlers(config)
+    listener = None
+    if config.async_mode:
+        log_queue = queue.Queue(maxsize=config.queue_size)
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        atexit.register(_stop_listener, listener)  # drains whatever is still queued
+        queue_handler = DroppingQueueHandler(log_queue)
+        handlers = [queue_handler]
+
+        def _restart_in_child():
+            if listener is not log_listener:
+                return
+            # Threads do not survive fork (e.g. gunicorn --preload): give the child its own queue and listener
+            listener.queue = queue_handler.queue = queue.Queue(maxsize=config.queue_size)
+            listener._thread = None
+            listener.start()
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_in_child)
+
+    logging.basicConfig(level=config.level, handlers=handlers, force=True)
+
+    for name, rate in _parse_sample_rates(config.sample_rates).items():
+        logger = logging.getLogger(name)
+        for existing in [f for f in logger.filters if isinstance(f, SamplingFilter)]:
+            logger.removeFilter(existing)
+        if rate < 1.0:
+            logger.addFilter(SamplingFilter(rate))
+    log_listener = listener
+    return listener
+
+
+log_listener = None
+configure_logging()
 
 if __name__ == "__main__":
     logging.info("Logging setup test completed, sending logs to file and stdout.")
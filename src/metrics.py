@@ -0,0 +1,244 @@
+import os
+import time
+import bisect
+import threading
+
+from src.logger import logging
+
+# Default bucket upper bounds (inclusive), chosen for the serving path
+LATENCY_MS_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket histogram (count of observations <= each upper bound, plus +Inf).
+    Quantiles are estimated by linear interpolation inside the bucket that contains them.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str = "", buckets=LATENCY_MS_BUCKETS, labels: dict = None):
+        self.name = name
+        self.help = help_text
+        self.labels = dict(labels or {})
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot: > largest bound
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def quantile(self, q: float, counts=None, total=None) -> float:
+        counts = counts if counts is not None else list(self._counts)
+        total = total if total is not None else sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower  # open-ended bucket: report its lower bound
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        """Cumulative bucket counts, count/sum/mean and p50/p95/p99 estimates."""
+        with self._lock:
+            counts, total, value_sum = list(self._counts), self._count, self._sum
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else repr(bound)] = cumulative
+        return {
+            "count": total,
+            "sum": round(value_sum, 6),
+            "mean": round(value_sum / total, 6) if total else 0.0,
+            "p50": round(self.quantile(0.50, counts, total), 6),
+            "p95": round(self.quantile(0.95, counts, total), 6),
+            "p99": round(self.quantile(0.99, counts, total), 6),
+            "buckets": buckets,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+
+
+class Gauge:
+    """A value that goes up and down (e.g. current queue depth)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str = "", labels: dict = None):
+        self.name = name
+        self.help = help_text
+        self.labels = dict(labels or {})
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> dict:
+        return {"value": self._value}
+
+
+class Counter(Gauge):
+    """A monotonically increasing total (requests, errors, ...)."""
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        super().inc(amount)
+
+    def set(self, value: float):
+        raise TypeError("Counters cannot be set, use inc()")
+
+
+class Span:
+    """
+    Times a block into a histogram in milliseconds (optionally also logging it):
+
+        with Span(stage_histogram):
+            ...
+
+    Costs two perf_counter calls and one histogram update, so it can stay on in production.
+    """
+    __slots__ = ("histogram", "log", "_start", "elapsed_ms")
+
+    def __init__(self, histogram: Histogram, log: bool = False):
+        self.histogram = histogram
+        self.log = log
+        self.elapsed_ms = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed_ms = (time.perf_counter() - self._start) * 1000
+        self.histogram.observe(self.elapsed_ms)
+        if self.log:
+            labels = ",".join(f"{k}={v}" for k, v in self.histogram.labels.items())
+            logging.info(f"span {self.histogram.name}{{{labels}}} {self.elapsed_ms:.2f} ms")
+        return False
+
+
+def _label_text(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in sorted(labels.items())
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Named metrics of this worker process; get-or-create, so modules can declare what they use."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, labels: dict = None, **kwargs):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                kinds = {type(m) for (n, _), m in self._metrics.items() if n == name}
+                if kinds and kinds != {cls}:
+                    raise TypeError(f"Metric {name!r} already registered as {kinds.pop().__name__}")
+                metric = self._metrics[key] = cls(name, *args, labels=labels, **kwargs)
+            elif type(metric) is not cls:
+                raise TypeError(f"Metric {name!r} already registered as {type(metric).__name__}")
+            return metric
+
+    def histogram(self, name: str, help_text: str = "", buckets=LATENCY_MS_BUCKETS, labels: dict = None) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets, labels=labels)
+
+    def gauge(self, name: str, help_text: str = "", labels: dict = None) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels=labels)
+
+    def counter(self, name: str, help_text: str = "", labels: dict = None) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels=labels)
+
+    def stage_histograms(self, name: str, help_text: str, stages, label: str = "stage") -> dict:
+        """Pre-resolves one labelled histogram per stage, so hot paths skip the registry lookup."""
+        return {stage: self.histogram(name, help_text, labels={label: stage}) for stage in stages}
+
+    def all(self) -> dict:
+        with self._lock:
+            return dict(self._metrics)
+
+    def snapshot(self) -> dict:
+        result = {}
+        for (name, labels), metric in sorted(self.all().items()):
+            result[name + _label_text(dict(labels))] = metric.snapshot()
+        return result
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        families = {}
+        for (name, _), metric in sorted(self.all().items()):
+            families.setdefault(name, []).append(metric)
+
+        lines = []
+        for name, family in families.items():
+            first = family[0]
+            if first.help:
+                lines.append(f"# HELP {name} {first.help}")
+            lines.append(f"# TYPE {name} {first.kind}")
+            for metric in family:
+                if isinstance(metric, Histogram):
+                    snap = metric.snapshot()
+                    for bound, count in snap["buckets"].items():
+                        labels = _label_text({**metric.labels, "le": bound})
+                        lines.append(f"{name}_bucket{labels} {count}")
+                    lines.append(f"{name}_sum{_label_text(metric.labels)} {_number(snap['sum'])}")
+                    lines.append(f"{name}_count{_label_text(metric.labels)} {snap['count']}")
+                else:
+                    lines.append(f"{name}{_label_text(metric.labels)} {_number(metric.value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, file_path: str):
+        """Writes the exposition atomically, e.g. for node_exporter's textfile collector."""
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, file_path)
+
+
+# One registry per worker process
+metrics = MetricsRegistry()
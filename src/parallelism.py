@@ -0,0 +1,105 @@
+import os
+from dataclasses import dataclass
+
+from src.logger import logging
+
+CPU_COUNT = os.cpu_count() or 1
+
+
+@dataclass
+class ParallelismProfile:
+    """CPU budget of one kind of process."""
+    name: str
+    # joblib n_jobs of sklearn objects (ColumnTransformer, RandomForest, ...)
+    n_jobs: int
+    # XGBoost's own OpenMP threads
+    model_threads: int
+    # BLAS / OpenMP thread pools of NumPy, SciPy and the model libraries (threadpoolctl)
+    blas_threads: int
+
+
+# training: one process owns the machine, so every layer may use all cores.
+# serving: many gunicorn workers (and micro-batcher threads) share the cores; each request
+# runs single-threaded, so concurrent requests scale across workers instead of
+# oversubscribing the cores with nested joblib/OpenMP/BLAS pools.
+PROFILES = {
+    "training": ParallelismProfile(
+        name="training",
+        n_jobs=int(os.getenv("TRAINING_N_JOBS", str(CPU_COUNT))),
+        model_threads=int(os.getenv("TRAINING_MODEL_THREADS", str(CPU_COUNT))),
+        blas_threads=int(os.getenv("TRAINING_BLAS_THREADS", str(CPU_COUNT))),
+    ),
+    "serving": ParallelismProfile(
+        name="serving",
+        n_jobs=int(os.getenv("SERVING_N_JOBS", "1")),
+        model_threads=int(os.getenv("SERVING_MODEL_THREADS", "1")),
+        blas_threads=int(os.getenv("SERVING_BLAS_THREADS", "1")),
+    ),
+}
+
+# Profile applied to artifacts as they are written: they are unpickled by serving workers
+SAVE_PROFILE = "serving"
+
+_active_profile = os.getenv("PARALLELISM_PROFILE", "serving")
+_thread_limits = None
+
+
+def get_profile(name: str = None) -> ParallelismProfile:
+    """Returns the named profile, or the one this process was configured with."""
+    return PROFILES[name or _active_profile]
+
+
+def _walk(obj):
+    """Yields `obj` and every estimator nested in it (pipelines, column transformers, frozen wrappers)."""
+    yield obj
+    children = []
+    if hasattr(obj, "transformers_"):
+        children = [transformer for _, transformer, _ in obj.transformers_]
+    elif hasattr(obj, "transformers"):
+        children = [transformer for _, transformer, _ in obj.transformers]
+    elif hasattr(obj, "steps"):
+        children = [step for _, step in obj.steps]
+    elif type(obj).__name__ == "FrozenEstimator":
+        children = [obj.estimator]
+    for child in children:
+        yield from _walk(child)
+
+
+def apply_profile(obj, profile: ParallelismProfile = None):
+    """
+    Sets n_jobs of every sklearn object and XGBoost's thread count inside `obj` (in place) to the
+    profile's budget. Objects without such parameters (arrays, dicts, ...) are left untouched.
+    :return: obj
+    """
+    profile = profile or get_profile()
+    for estimator in _walk(obj):
+        if not hasattr(estimator, "get_params") or type(estimator).__name__ == "LogisticRegression":
+            continue  # n_jobs is a no-op for binary LR (deprecated since scikit-learn 1.8)
+        params = estimator.get_params(deep=False)
+        if type(estimator).__name__.startswith("XGB"):
+            estimator.set_params(n_jobs=profile.model_threads)
+        elif "n_jobs" in params:
+            estimator.set_params(n_jobs=profile.n_jobs)
+    return obj
+
+
+def configure_process(name: str):
+    """
+    Makes `name` this process's profile: artifacts loaded from now on get its budget, and the
+    BLAS/OpenMP pools already loaded into the process are capped at its blas_threads.
+    Child processes inherit the profile and the OpenMP/BLAS caps through the environment.
+    """
+    global _active_profile, _thread_limits
+    profile = PROFILES[name]
+    _active_profile = name
+    os.environ["PARALLELISM_PROFILE"] = name
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[variable] = str(profile.blas_threads)
+
+    from threadpoolctl import threadpool_limits
+    if _thread_limits is not None:
+        _thread_limits.restore_original_limits()
+    _thread_limits = threadpool_limits(limits=profile.blas_threads)
+    logging.info(f"Parallelism profile '{name}': n_jobs={profile.n_jobs}, "
+                 f"model_threads={profile.model_threads}, blas_threads={profile.blas_threads}")
+    return profile
@@ -0,0 +1,354 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_object
+
+
+@dataclass
+class ArtifactRegistryConfig:
+    """Controls how often artifact files are re-checked for a newer version."""
+    # Minimum seconds between two os.stat() checks of the same artifact.
+    check_interval: float = float(os.getenv("ARTIFACT_CHECK_INTERVAL", "1.0"))
+    # When True, a changed mtime/size is confirmed with a SHA-256 of the file before
+    # reloading, so a plain `touch` or an identical re-copy does not trigger a reload.
+    use_content_hash: bool = os.getenv("ARTIFACT_CONTENT_HASH", "0") == "1"
+    # A changed bundle is reloaded only once its newest file is this many seconds old, so a
+    # writer replacing preprocessor.pkl and then model.pkl is never seen half-way.
+    settle_seconds: float = float(os.getenv("ARTIFACT_SETTLE_SECONDS", "1.0"))
+
+
+@dataclass
+class ArtifactEntry:
+    """A loaded artifact together with the file signature it was loaded from."""
+    obj: object
+    version: str
+    signature: tuple
+    loaded_at: float
+    load_seconds: float
+    last_checked: float
+    hits: int = 0
+    loads: int = 1
+    failed_reloads: int = 0
+    # SHA-256 of the loaded file, computed on first content_digest() call (or at load with use_content_hash)
+    sha256: str = None
+    path: str = None
+
+    def content_digest(self) -> str:
+        """SHA-256 of the artifact file (same as stage_cache.file_digest), hashed once per version."""
+        if self.sha256 is None:
+            self.sha256 = _file_sha256(self.path)
+        return self.sha256
+
+
+@dataclass
+class ArtifactBundle:
+    """
+    Artifacts that only make sense together (model, preprocessor, threshold), loaded as one
+    version: a changed member is reloaded off to the side and the whole set swapped at once.
+    """
+    # name -> ArtifactEntry, None for an optional file that does not exist
+    entries: dict
+    signature: tuple
+    last_checked: float
+    hits: int = 0
+    loads: int = 1
+    failed_reloads: int = 0
+
+    @property
+    def version(self) -> str:
+        return "/".join(entry.version for entry in self.entries.values() if entry is not None)
+
+    def get(self, name: str):
+        """The loaded object of member `name`, or None for a missing optional file."""
+        entry = self.entries[name]
+        return None if entry is None else entry.obj
+
+
+def _file_signature(file_path: str) -> tuple:
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactRegistry:
+    """
+    Process-wide cache of deserialized artifacts (model.pkl, preprocessor.pkl, ...).
+
+    Each artifact is loaded once per worker process. On access the file signature
+    (mtime + size, optionally confirmed by a content hash) is re-checked at most every
+    `check_interval` seconds; when it changed, the new version is loaded off to the side
+    and swapped in atomically, so concurrent requests see either the old or the new
+    object, never a partially loaded one.
+    """
+
+    def __init__(self, config: ArtifactRegistryConfig = None):
+        self.config = config or ArtifactRegistryConfig()
+        self._entries = {}
+        self._bundles = {}
+        self._lock = threading.Lock()
+        self._misses = 0
+        self._reload_listeners = []
+
+    def add_reload_listener(self, callback):
+        """Registers `callback(file_path)`, called after an artifact is hot-reloaded or the registry is cleared (path None)."""
+        self._reload_listeners.append(callback)
+
+    def _notify_reload(self, file_path):
+        for callback in list(self._reload_listeners):
+            try:
+                callback(file_path)
+            except Exception as e:
+                logging.warning(f"Artifact reload listener {callback!r} failed: {e}")
+
+    def get(self, file_path: str, loader=load_object):
+        """Returns the cached object for `file_path`, (re)loading it if the file changed."""
+        return self.get_entry(file_path, loader=loader).obj
+
+    def version(self, file_path: str) -> str:
+        """Returns the version string of the currently cached artifact."""
+        return self.get_entry(file_path).version
+
+    def content_digest(self, file_path: str, loader=load_object) -> str:
+        """SHA-256 of the cached version of `file_path` (same as stage_cache.file_digest), hashed once per version."""
+        return self.get_entry(file_path, loader=loader).content_digest()
+
+    def get_entry(self, file_path: str, loader=load_object) -> ArtifactEntry:
+        try:
+            key = os.path.abspath(file_path)
+            entry = self._entries.get(key)
+            now = time.monotonic()
+
+            if entry is not None and now - entry.last_checked < self.config.check_interval:
+                entry.hits += 1
+                return entry
+
+            with self._lock:
+                # Re-read under the lock: another thread may have just (re)loaded it.
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._misses += 1
+                    entry = self._load(key, loader)
+                    self._entries[key] = entry
+                    return entry
+
+                if now - entry.last_checked >= self.config.check_interval:
+                    entry = self._refresh(key, entry, loader)
+                    entry.last_checked = now
+                entry.hits += 1
+                return entry
+
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _load(self, key: str, loader, signature: tuple = None, content_hash: str = None) -> ArtifactEntry:
+        signature = signature or _file_signature(key)
+        if self.config.use_content_hash and content_hash is None:
+            content_hash = _file_sha256(key)
+
+        start = time.perf_counter()
+        obj = loader(key)
+        load_seconds = time.perf_counter() - start
+
+        version = content_hash[:12] if content_hash else f"{signature[0]}-{signature[1]}"
+        logging.info(f"Loaded artifact {key} (version {version}) in {load_seconds * 1000:.1f} ms")
+        return ArtifactEntry(
+            obj=obj,
+            version=version,
+            signature=signature,
+            loaded_at=time.time(),
+            load_seconds=load_seconds,
+            last_checked=time.monotonic(),
+            sha256=content_hash,
+            path=key,
+        )
+
+    def _refresh(self, key: str, entry: ArtifactEntry, loader) -> ArtifactEntry:
+        """Reloads `key` if its file changed; keeps serving the old object on failure."""
+        try:
+            signature = _file_signature(key)
+            if signature == entry.signature:
+                return entry
+
+            content_hash = None
+            if self.config.use_content_hash:
+                content_hash = _file_sha256(key)
+                if content_hash[:12] == entry.version:
+                    # Same bytes, new mtime (touch / re-copy): no reload needed.
+                    entry.signature = signature
+                    return entry
+
+            new_entry = self._load(key, loader, signature=signature, content_hash=content_hash)
+            new_entry.hits = entry.hits
+            new_entry.loads = entry.loads + 1
+            new_entry.failed_reloads = entry.failed_reloads
+            self._entries[key] = new_entry
+            logging.info(f"Hot-reloaded artifact {key}: {entry.version} -> {new_entry.version}")
+            self._notify_reload(key)
+            return new_entry
+
+        except Exception as e:
+            # The file may be mid-copy or temporarily missing: keep the last good version.
+            entry.failed_reloads += 1
+            logging.warning(f"Reload of artifact {key} failed, keeping version {entry.version}: {e}")
+            return entry
+
+    # --- Bundles: artifacts swapped together ---
+
+    def get_bundle(self, files: dict, loaders: dict = None, optional=()) -> ArtifactBundle:
+        """
+        Returns the cached bundle of `files` ({name: path}), reloading it as a whole when any member changed.
+        :param loaders: {name: loader} for members that are not pickles (default load_object).
+        :param optional: Names whose file may be missing (their object is then None).
+        """
+        try:
+            key = tuple((name, os.path.abspath(path)) for name, path in files.items())
+            bundle = self._bundles.get(key)
+            now = time.monotonic()
+
+            if bundle is not None and now - bundle.last_checked < self.config.check_interval:
+                bundle.hits += 1
+                return bundle
+
+            with self._lock:
+                bundle = self._bundles.get(key)
+                if bundle is None:
+                    self._misses += 1
+                    # Nothing to serve yet: wait (at most settle_seconds) for a writer to finish the set
+                    age = self._settled_for(self._bundle_signature(key, optional))
+                    if age < self.config.settle_seconds:
+                        time.sleep(self.config.settle_seconds - age)
+                    bundle = self._load_bundle(key, loaders or {}, optional)
+                    self._bundles[key] = bundle
+                    return bundle
+
+                if now - bundle.last_checked >= self.config.check_interval:
+                    bundle = self._refresh_bundle(key, bundle, loaders or {}, optional)
+                bundle.hits += 1
+                return bundle
+
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _bundle_signature(key: tuple, optional) -> tuple:
+        return tuple(
+            None if name in optional and not os.path.exists(path) else _file_signature(path)
+            for name, path in key
+        )
+
+    @staticmethod
+    def _settled_for(signature: tuple) -> float:
+        """Seconds since the newest member file of a bundle signature was written."""
+        return time.time() - max(member[0] for member in signature if member is not None) / 1e9
+
+    def _load_bundle(self, key: tuple, loaders: dict, optional, previous: ArtifactBundle = None,
+                     attempts: int = 3) -> ArtifactBundle:
+        """Loads every changed member (unchanged ones are reused from `previous`) until no file moved meanwhile."""
+        for attempt in range(attempts):
+            signature = self._bundle_signature(key, optional)
+            entries = {}
+            for (name, path), member_signature in zip(key, signature):
+                old = previous.entries.get(name) if previous is not None else None
+                if member_signature is None:
+                    entries[name] = None
+                elif old is not None and old.signature == member_signature:
+                    entries[name] = old
+                else:
+                    entries[name] = self._load(path, loaders.get(name, load_object), signature=member_signature)
+            if self._bundle_signature(key, optional) == signature:
+                return ArtifactBundle(entries=entries, signature=signature, last_checked=time.monotonic())
+        raise RuntimeError(f"Artifacts kept changing while loading {[path for _, path in key]}")
+
+    def _refresh_bundle(self, key: tuple, bundle: ArtifactBundle, loaders: dict, optional) -> ArtifactBundle:
+        """Swaps in the new version of a changed bundle once its files settled; keeps the old one on failure."""
+        try:
+            signature = self._bundle_signature(key, optional)
+            if signature == bundle.signature:
+                bundle.last_checked = time.monotonic()
+                return bundle
+
+            if self._settled_for(signature) < self.config.settle_seconds:
+                # A writer may still be replacing the rest of the set: re-check on the next call
+                return bundle
+
+            new_bundle = self._load_bundle(key, loaders, optional, previous=bundle)
+            new_bundle.hits = bundle.hits
+            new_bundle.loads = bundle.loads + 1
+            new_bundle.failed_reloads = bundle.failed_reloads
+            self._bundles[key] = new_bundle
+            logging.info(f"Hot-reloaded artifact bundle {[path for _, path in key]}: "
+                         f"{bundle.version} -> {new_bundle.version}")
+            for (name, path) in key:
+                if new_bundle.entries[name] is not bundle.entries[name]:
+                    self._notify_reload(path)
+            return new_bundle
+
+        except Exception as e:
+            bundle.failed_reloads += 1
+            bundle.last_checked = time.monotonic()
+            logging.warning(f"Reload of artifact bundle {[path for _, path in key]} failed, "
+                            f"keeping version {bundle.version}: {e}")
+            return bundle
+
+    def stats(self) -> dict:
+        """Reports per-artifact version, load time and cache hits for monitoring."""
+        entries = dict(self._entries)
+        bundles = dict(self._bundles)
+        for key, bundle in bundles.items():
+            for (name, path) in key:
+                if bundle.entries[name] is not None:
+                    entries.setdefault(path, bundle.entries[name])
+        hits = sum(entry.hits for entry in self._entries.values()) + sum(bundle.hits for bundle in bundles.values())
+        return {
+            "hits": hits,
+            "misses": self._misses,
+            "hit_ratio": hits / (hits + self._misses) if hits + self._misses else 0.0,
+            "artifacts": {
+                key: {
+                    "version": entry.version,
+                    "loaded_at": entry.loaded_at,
+                    "load_ms": round(entry.load_seconds * 1000, 3),
+                    "hits": entry.hits,
+                    "loads": entry.loads,
+                    "failed_reloads": entry.failed_reloads,
+                }
+                for key, entry in entries.items()
+            },
+            "bundles": {
+                "+".join(name for name, _ in key): {
+                    "version": bundle.version,
+                    "hits": bundle.hits,
+                    "loads": bundle.loads,
+                    "failed_reloads": bundle.failed_reloads,
+                }
+                for key, bundle in bundles.items()
+            },
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bundles.clear()
+            self._misses = 0
+        self._notify_reload(None)
+
+
+# One registry per worker process; every PredictPipeline instance shares it.
+artifact_registry = ArtifactRegistry()
@@ -0,0 +1,221 @@
+import os
+import sys
+import math
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.components.drift_monitor import DriftMonitor, DriftMonitorConfig
+from src.parallelism import configure_process
+
+
+@dataclass
+class BatchScoringConfig:
+    """Controls chunking, parallelism and progress reporting of offline scoring."""
+    chunk_size: int = 100_000
+    n_workers: int = max(1, (os.cpu_count() or 2) - 1)
+    # Chunks submitted but not yet written; bounds memory to roughly
+    # max_pending_chunks * chunk_size rows regardless of the file size.
+    max_pending_chunks: int = 0  # 0 -> 2 * n_workers
+    progress_interval: float = 10.0  # seconds between progress log lines
+
+
+# --- Worker side: one PredictPipeline (and one artifact load) per process ---
+
+_worker_pipeline = None
+
+
+def _init_worker():
+    global _worker_pipeline
+    # n_workers processes share the cores: each one scores single-threaded
+    configure_process("serving")
+    _worker_pipeline = PredictPipeline()
+    # Warm the artifact cache once so the first chunk does not pay the unpickle cost
+    _worker_pipeline.artifacts()
+
+
+def _score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Scores one chunk; rows with unparseable values get an error instead of a prediction."""
+    pipeline = _worker_pipeline
+    clean_df, valid_mask, errors = pipeline.validate_batch(chunk, allow_missing=True)
+
+    predictions = pd.Series(pd.NA, index=chunk.index, dtype='Int8')
+    pd_scores = pd.Series(np.nan, index=chunk.index, dtype='float64')
+    if valid_mask.any():
+        predictions[valid_mask], pd_scores[valid_mask] = pipeline.predict_with_scores(clean_df[valid_mask])
+
+    # The chunk is this worker's own (unpickled) copy, so annotate it in place
+    chunk['pd'] = pd_scores
+    chunk['prediction'] = predictions
+    chunk['error'] = '' if valid_mask.all() else ['; '.join(row_errors) for row_errors in errors]
+    return chunk
+
+
+# --- Reader / writer helpers (CSV always, Parquet when pyarrow is installed) ---
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise CustomException("Parquet input/output requires the optional 'pyarrow' package.", sys)
+
+
+def _iter_chunks(input_path: str, chunk_size: int):
+    if input_path.endswith('.parquet'):
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(input_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # Raw text: validate_batch parses it, and every chunk gets the same column types
+        # (inference per chunk would make e.g. person_emp_length int64 in one and float64 in the next)
+        yield from pd.read_csv(input_path, chunksize=chunk_size, dtype=str)
+
+
+def _output_schema(input_path: str):
+    """Arrow schema of the scored output: the input columns as read by _iter_chunks, then pd/prediction/error."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    if input_path.endswith('.parquet'):
+        fields = [field for field in pq.ParquetFile(input_path).schema_arrow]
+    else:
+        fields = [pa.field(name, pa.string()) for name in pd.read_csv(input_path, nrows=0).columns]
+    scored = [pa.field('pd', pa.float64()), pa.field('prediction', pa.int8()), pa.field('error', pa.string())]
+    return pa.schema([field for field in fields if field.name not in ('pd', 'prediction', 'error')] + scored)
+
+
+class _ChunkWriter:
+    """Appends scored chunks to the output file in input order."""
+
+    def __init__(self, output_path: str, input_path: str):
+        self.output_path = output_path
+        self.is_parquet = output_path.endswith('.parquet')
+        self._parquet_writer = None
+        self._schema = None
+        self._wrote_header = False
+        dir_path = os.path.dirname(output_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        if self.is_parquet:
+            _require_pyarrow()
+            # Fixed up front: a schema taken from the first chunk would reject later chunks' values
+            self._schema = _output_schema(input_path)
+        elif os.path.exists(output_path):
+            os.remove(output_path)
+
+    def write(self, scored: pd.DataFrame):
+        if self.is_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(scored, schema=self._schema, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.output_path, self._schema)
+            self._parquet_writer.write_table(table)
+        else:
+            scored.to_csv(self.output_path, mode='a', header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+# --- Driver ---
+
+def score_file(input_path: str, output_path: str, config: BatchScoringConfig = None) -> dict:
+    """
+    Scores a CSV/Parquet loan book chunk by chunk on a process pool and streams the results
+    (input columns + 'pd' + 'prediction' + 'error') to `output_path` (.csv or .parquet).
+    :return: Summary dict with row counts, elapsed time, throughput and the drift of the whole file.
+    """
+    config = config or BatchScoringConfig()
+    max_pending = config.max_pending_chunks or 2 * config.n_workers
+    writer = None
+    # The whole file is one drift window
+    drift_monitor = DriftMonitor(DriftMonitorConfig(window_seconds=math.inf, n_slots=1))
+
+    try:
+        logging.info(f"Batch scoring {input_path} -> {output_path} "
+                     f"(chunk_size={config.chunk_size}, workers={config.n_workers})")
+        writer = _ChunkWriter(output_path, input_path)
+        start = last_report = time.perf_counter()
+        n_rows = n_failed = 0
+
+        def drain(pending: deque):
+            nonlocal n_rows, n_failed, last_report
+            scored = pending.popleft().result()
+            writer.write(scored)
+            n_rows += len(scored)
+            n_failed += int(scored['prediction'].isna().sum())
+            valid = scored['pd'].notna()
+            drift_monitor.observe_frame(scored[valid], scored['pd'][valid].to_numpy())
+
+            now = time.perf_counter()
+            if now - last_report >= config.progress_interval:
+                logging.info(f"Scored {n_rows:,} rows ({n_rows / (now - start):,.0f} rows/sec)")
+                last_report = now
+
+        # spawn: forking a parent that already initialised OpenMP/BLAS thread pools can deadlock
+        with ProcessPoolExecutor(max_workers=config.n_workers, initializer=_init_worker,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            # Futures are drained strictly in submission order, so the output keeps the input order
+            pending = deque()
+            for chunk in _iter_chunks(input_path, config.chunk_size):
+                pending.append(executor.submit(_score_chunk, chunk))
+                if len(pending) >= max_pending:
+                    drain(pending)
+            while pending:
+                drain(pending)
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            'rows': n_rows,
+            'failed_rows': n_failed,
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(n_rows / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+        drift = drift_monitor.report()
+        if drift.get('drifted'):
+            logging.warning(f"Batch scoring input drifted from training (PSI > {drift['psi_alert']}): {drift['drifted']}")
+        summary['drift'] = drift
+        logging.info(f"Batch scoring completed: {summary}")
+        return summary
+
+    except CustomException:
+        raise
+    except Exception as e:
+        raise CustomException(e, sys)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet loan book with the trained PD model.")
+    parser.add_argument("input_path", help="Input .csv or .parquet file with the 11 applicant columns.")
+    parser.add_argument("output_path", help="Output .csv or .parquet file.")
+    parser.add_argument("--chunk-size", type=int, default=BatchScoringConfig.chunk_size)
+    parser.add_argument("--workers", type=int, default=BatchScoringConfig.n_workers)
+    parser.add_argument("--progress-interval", type=float, default=BatchScoringConfig.progress_interval)
+    args = parser.parse_args()
+
+    score_file(
+        args.input_path,
+        args.output_path,
+        BatchScoringConfig(
+            chunk_size=args.chunk_size,
+            n_workers=args.workers,
+            progress_interval=args.progress_interval,
+        ),
+    )
@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import metrics, SIZE_BUCKETS
+
+
+@dataclass
+class MicroBatcherConfig:
+    """Latency/throughput knobs of the in-process request batcher."""
+    # Off by default: requests can only be coalesced when a worker serves several at once
+    # (gunicorn --worker-class gthread --threads N); sync workers handle one request at a time
+    enabled: bool = os.getenv("MICROBATCH", "0") == "1"
+    # Upper bound on rows scored by one preprocessor.transform + model.predict_proba call
+    max_batch_size: int = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+    # Longest a request waits for companions once the batcher has seen concurrent traffic
+    max_wait_ms: float = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+    # Batches averaging at most this many rows count as "no concurrency": dispatch without waiting
+    adaptive_min_batch: float = 1.5
+    # Seconds a caller waits for its result before giving up
+    result_timeout: float = float(os.getenv("MICROBATCH_TIMEOUT", "30"))
+
+
+class _Request:
+    __slots__ = ("features", "future", "enqueued_at")
+
+    def __init__(self, features):
+        self.features = features
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-applicant requests and scores them with one vectorized
+    PredictPipeline call (predict_records for CustomData records, predict_with_scores for
+    one-row DataFrames).
+
+    A single background thread takes the oldest queued request, drains whatever else is already
+    queued, and - only while traffic is concurrent (recent batches averaged more than
+    `adaptive_min_batch` rows) - waits up to `max_wait_ms` for more, capped at `max_batch_size`.
+    A lone request is therefore scored immediately, while under load requests that arrive during
+    a running batch form the next one. If a batch fails, its rows are re-scored one by one so a
+    bad row only fails its own caller.
+    """
+
+    def __init__(self, pipeline, config: MicroBatcherConfig = None):
+        self.pipeline = pipeline
+        self.config = config or MicroBatcherConfig()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._avg_batch_size = 1.0  # exponentially weighted
+
+        self.queue_depth = metrics.gauge("microbatch_queue_depth", "Requests waiting to be batched")
+        self.queue_depth_hist = metrics.histogram(
+            "microbatch_queue_depth_at_enqueue", "Queue depth seen by each arriving request", SIZE_BUCKETS)
+        self.batch_size = metrics.histogram("microbatch_batch_size", "Rows per scored batch", SIZE_BUCKETS)
+        self.wait_ms = metrics.histogram("microbatch_wait_ms", "Time a request spent queued before scoring")
+        self.score_ms = metrics.histogram("microbatch_score_ms", "Time to score one batch")
+
+    def _ensure_started(self):
+        # Started lazily so gunicorn workers forked after import each get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, features) -> Future:
+        """Queues one applicant (one-row DataFrame or CustomData record); the Future resolves to (prediction, pd_score)."""
+        self._ensure_started()
+        request = _Request(features)
+        self.queue_depth_hist.observe(self._queue.qsize())
+        self.queue_depth.inc()
+        self._queue.put(request)
+        return request.future
+
+    def predict_with_scores(self, features: pd.DataFrame):
+        """Drop-in for PredictPipeline.predict_with_scores on a one-row DataFrame."""
+        if len(features) != 1:
+            # Multi-row requests are already vectorized: score them directly
+            return self.pipeline.predict_with_scores(features)
+        prediction, pd_score = self.submit(features).result(timeout=self.config.result_timeout)
+        return [prediction], [pd_score]
+
+    def predict_record(self, record):
+        """Scores one CustomData record through the pandas-free PredictPipeline.predict_records path."""
+        return self.submit(record).result(timeout=self.config.result_timeout)
+
+    # -- batching thread --
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        cfg = self.config
+        deadline = batch[0].enqueued_at + cfg.max_wait_ms / 1000.0
+        wait_for_more = self._avg_batch_size > cfg.adaptive_min_batch
+
+        while len(batch) < cfg.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if not wait_for_more or remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _score(self, batch: list):
+        frames = [request for request in batch if isinstance(request.features, pd.DataFrame)]
+        records = [request for request in batch if not isinstance(request.features, pd.DataFrame)]
+        if frames and records:
+            self._score(frames)
+            self._score(records)
+            return
+        try:
+            if records:
+                preds, pd_scores = self.pipeline.predict_records([request.features for request in batch])
+            else:
+                features = pd.concat([request.features for request in batch], ignore_index=True)
+                preds, pd_scores = self.pipeline.predict_with_scores(features)
+            for request, pred, score in zip(batch, preds, pd_scores):
+                request.future.set_result((pred, score))
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            logging.warning(f"Micro-batch of {len(batch)} failed ({e}); re-scoring rows individually")
+            for request in batch:
+                self._score([request])
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self.queue_depth.dec(len(batch))
+            for request in batch:
+                self.wait_ms.observe((started - request.enqueued_at) * 1000)
+            self.batch_size.observe(len(batch))
+            self._avg_batch_size = 0.8 * self._avg_batch_size + 0.2 * len(batch)
+
+            try:
+                self._score(batch)
+            except Exception as e:
+                # Never let the batching thread die; fail the callers instead
+                error = CustomException(e, sys)
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(error)
+            self.score_ms.observe((time.perf_counter() - started) * 1000)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth.value,
+            "avg_batch_size": round(self._avg_batch_size, 2),
+            "queue_depth_at_enqueue": self.queue_depth_hist.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+            "wait_ms": self.wait_ms.snapshot(),
+            "score_ms": self.score_ms.snapshot(),
+        }
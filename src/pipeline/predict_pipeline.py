@@ -1,58 +1,387 @@
 import sys
+import numpy as np
 import pandas as pd
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import load_object 
+from src.pipeline.artifact_registry import artifact_registry
+from src.utils import load_json, load_object
+from src.schema import APPLICANT_FIELDS, APPLICANT_DTYPE, INTEGER_FIELDS, NUMERICAL_FEATURES, NOMINAL_FEATURES
+from src.components.model_compiler import CompiledScorer, ModelCompilerConfig
+from src.components.reason_codes import ReasonCodeConfig
+from src.metrics import metrics, Span
 import os
 
+# Per-stage timing spans of the serving hot path (histograms resolved once at import)
+_STAGES = metrics.stage_histograms(
+    "predict_stage_duration_ms", "Time spent in each PredictPipeline stage",
+    ["validate", "artifact_load", "transform", "predict", "validate_records", "build_frame", "compiled_score",
+     "reason_codes"],
+)
+
+# Precompiled validation rules for structured applicant arrays: field groups resolved once at import
+_NUMERIC_FIELDS = [name for name in APPLICANT_FIELDS if name not in NOMINAL_FEATURES]
+_CATEGORICAL_FIELDS = [name for name in APPLICANT_FIELDS if name in NOMINAL_FEATURES]
+
 class PredictPipeline:
+    # Column type rules used by the vectorized batch validation (same rules as the HTML form), from src.schema
+    INTEGER_COLUMNS = list(INTEGER_FIELDS)
+    FLOAT_COLUMNS = [name for name in NUMERICAL_FEATURES if name not in INTEGER_FIELDS]
+    CATEGORICAL_COLUMNS = list(NOMINAL_FEATURES)
+
     def __init__(self):
-        # Define the exact list of columns used during training
-        self.REQUIRED_COLUMNS = [
-            'person_age', 'person_income', 'person_home_ownership', 
-            'person_emp_length', 'loan_intent', 'loan_grade', 
-            'loan_amnt', 'loan_int_rate', 'loan_percent_income', 
-            'cb_person_default_on_file', 'cb_person_cred_hist_length'
-        ]
-        # Removed redundant 'pass' statement
+        # The exact list of columns used during training, in training order
+        self.REQUIRED_COLUMNS = list(APPLICANT_FIELDS)
+        self.model_path = os.path.join("artifacts", "model.pkl")
+        self.preprocessor_path = os.path.join('artifacts', "preprocessor.pkl")
+        self.threshold_path = os.path.join('artifacts', "threshold.json")
+        # Flat NumPy scorer exported after training; used by the pandas-free record path
+        self.compiled_scorer_path = ModelCompilerConfig().compiled_scorer_file_path
+        self.use_compiled_scorer = os.getenv("SERVE_COMPILED", "1") == "1"
+        # The compiled scorer wins on small batches; large ones amortize sklearn/XGBoost's
+        # per-call overhead and run faster through the native path
+        self.compiled_max_rows = int(os.getenv("SERVE_COMPILED_MAX_ROWS", "256"))
+        # Per-feature contributions (reason codes) saved alongside the model by the training pipeline
+        self.reason_code_config = ReasonCodeConfig()
+        # Artifacts are cached per worker process and hot-reloaded when the files change
+        self.registry = artifact_registry
+        # (side artifact, its version, model/preprocessor digests) already reported as not current
+        self._stale_reported = set()
 
-    def predict(self, features: pd.DataFrame):
+    def artifacts(self):
+        """Model, preprocessor and threshold of one version (swapped together when training replaces them)."""
+        return self.registry.get_bundle(
+            {'model': self.model_path, 'preprocessor': self.preprocessor_path, 'threshold': self.threshold_path},
+            loaders={'threshold': load_json}, optional=('threshold',),
+        )
+
+    @staticmethod
+    def _threshold_of(bundle):
+        summary = bundle.get('threshold')
+        return None if summary is None else float(summary['threshold'])
+
+    def get_threshold(self):
+        """Cost-optimal PD cut-off saved by ModelTrainer, or None for artifacts trained without one."""
+        return self._threshold_of(self.artifacts())
+
+    def model_version(self) -> str:
+        """Version of everything that decides a prediction: model, preprocessor and (if saved) threshold."""
+        return self.artifacts().version
+
+    def predict_with_scores(self, features: pd.DataFrame):
         """
-        Loads preprocessor and model, transforms features, and predicts the outcome.
+        Fetches the cached preprocessor and model, transforms features, and scores the outcome.
         :param features: A DataFrame containing new applicant data (11 features).
-        :return: Prediction array (0 or 1).
+        :return: Tuple of (prediction array (0 or 1), PD score array (probability of default)).
+        """
+        try:
+            preds, pd_scores, _, _ = self._score_frame(features)
+            return preds, pd_scores
+
+        except Exception as e:
+            # Raise the exception, which the calling app.py will catch and log fully
+            raise CustomException(f"Prediction Pipeline Crash: {e}", sys)
+
+    def predict_with_reasons(self, features: pd.DataFrame, top_k: int = None):
+        """
+        Like predict_with_scores, plus the top-k fields that pushed each applicant towards default.
+        :return: Tuple of (prediction array, PD score array, list of per-row reason lists or None
+                 when no explainer matches the current model).
         """
         try:
+            preds, pd_scores, data_scaled, bundle = self._score_frame(features)
+            model = bundle.get('model')
+            with Span(_STAGES["reason_codes"]):
+                explainer = self._reason_code_explainer(bundle)
+                reasons = None
+                if explainer is not None:
+                    top_k = self.reason_code_config.top_k if top_k is None else top_k
+                    reasons = explainer.top_reasons(data_scaled, model, top_k)
+            return preds, pd_scores, reasons
+
+        except Exception as e:
+            raise CustomException(f"Prediction Pipeline Crash: {e}", sys)
+
+    def _score_frame(self, features: pd.DataFrame, bundle=None):
+        """Validates, transforms and scores a DataFrame; also returns the transformed matrix and the artifact bundle."""
+        with Span(_STAGES["validate"]):
             # CRITICAL FIX: Validate that input features contain all required columns
             missing_cols = [col for col in self.REQUIRED_COLUMNS if col not in features.columns]
             if missing_cols:
                 raise CustomException(f"Input DataFrame is missing required columns: {missing_cols}", sys)
-                
+
             # Enforce column order before prediction
             features = features[self.REQUIRED_COLUMNS]
 
-            # Define paths
-            model_path = os.path.join("artifacts", "model.pkl")
-            preprocessor_path = os.path.join('artifacts', "preprocessor.pkl")
-            
-            # Load the saved objects
-            model = load_object(file_path=model_path)
-            preprocessor = load_object(file_path=preprocessor_path)
+        with Span(_STAGES["artifact_load"]):
+            # Fetch the artifacts (loaded once per worker, swapped in together when a new version lands)
+            bundle = bundle or self.artifacts()
+            model, preprocessor = bundle.get('model'), bundle.get('preprocessor')
+            threshold = self._threshold_of(bundle)
 
+        with Span(_STAGES["transform"]):
             # Transform the new data
             data_scaled = preprocessor.transform(features)
 
-            # Make the prediction
-            preds = model.predict(data_scaled)
-            return preds
+        with Span(_STAGES["predict"]):
+            # PD scores, then the decision at the cost-optimal cut-off (0.5 via model.predict if none saved)
+            # float64 like the compiled scorer's: float32 scores would be compared to the threshold in float32
+            pd_scores = model.predict_proba(data_scaled)[:, 1].astype(np.float64)
+            if threshold is None:
+                preds = model.predict(data_scaled)
+            else:
+                preds = (pd_scores >= threshold).astype(int)
+        return preds, pd_scores, data_scaled, bundle
+
+    def _is_current(self, file_path: str, loader, fallback: str, bundle) -> bool:
+        """
+        True when `file_path` exists and was built from the bundle's model.pkl/preprocessor.pkl, i.e. the
+        source_digests it recorded match their file_digest (copies, checkouts and re-saves keep them).
+        Otherwise logs once per artifact version that `fallback` applies.
+        """
+        sources = (bundle.entries['model'].content_digest(), bundle.entries['preprocessor'].content_digest())
+        if not os.path.exists(file_path):
+            reported, reason = (file_path, None) + sources, "is missing"
+        else:
+            entry = self.registry.get_entry(file_path, loader=loader)
+            if getattr(entry.obj, 'source_digests', None) == {'model': sources[0], 'preprocessor': sources[1]}:
+                return True
+            reported, reason = (file_path, entry.version) + sources, "was not built from the current model/preprocessor"
+        if reported not in self._stale_reported:
+            self._stale_reported.add(reported)
+            logging.warning(f"{file_path} {reason}; {fallback}.")
+        return False
+
+    def _reason_code_explainer(self, bundle):
+        """The ReasonCodeExplainer exported together with the bundle's model/preprocessor, or None."""
+        file_path = self.reason_code_config.explainer_file_path
+        if not self._is_current(file_path, load_object, "reason codes are omitted", bundle):
+            return None
+        return self.registry.get(file_path)
+
+    # --- Pandas-free path: CustomData records / NumPy structured arrays ---
+
+    @staticmethod
+    def to_applicant_array(records) -> np.ndarray:
+        """
+        Packs applicants into one structured array of APPLICANT_DTYPE.
+        :param records: A structured array, or a sequence of CustomData records / tuples in APPLICANT_FIELDS order.
+        """
+        if isinstance(records, np.ndarray) and records.dtype.names:
+            if records.dtype == APPLICANT_DTYPE:
+                return records
+            missing = [name for name in APPLICANT_FIELDS if name not in records.dtype.names]
+            if missing:
+                raise ValueError(f"Structured array is missing required fields: {missing}")
+            converted = np.empty(records.shape[0], dtype=APPLICANT_DTYPE)
+            for name in APPLICANT_FIELDS:
+                converted[name] = records[name]
+            return converted
+        rows = [record.as_tuple() if isinstance(record, CustomData) else tuple(record) for record in records]
+        return np.array(rows, dtype=APPLICANT_DTYPE)
+
+    def validate_records(self, records):
+        """
+        Validates a batch with one vectorized check per field group (numeric / categorical).
+        :return: Tuple of (structured array, boolean valid-row mask, list of per-row error lists).
+        """
+        applicants = self.to_applicant_array(records)
+        numeric = np.column_stack([applicants[name] for name in _NUMERIC_FIELDS])
+        categorical = np.column_stack([applicants[name] for name in _CATEGORICAL_FIELDS])
+
+        bad_numeric = ~np.isfinite(numeric)
+        bad_categorical = (categorical == None) | (categorical == '')  # noqa: E711 (elementwise on object arrays)
+        valid_mask = ~(bad_numeric.any(axis=1) | bad_categorical.any(axis=1))
+
+        errors = [[] for _ in range(len(applicants))]
+        for row_idx in np.flatnonzero(~valid_mask):
+            errors[row_idx] = (
+                [f"Invalid or missing required numeric input: {_NUMERIC_FIELDS[j]}" for j in np.flatnonzero(bad_numeric[row_idx])]
+                + [f"Invalid or missing required categorical input: {_CATEGORICAL_FIELDS[j]}" for j in np.flatnonzero(bad_categorical[row_idx])]
+            )
+
+        # Same truncation as the form path: int(float(value))
+        for name in INTEGER_FIELDS:
+            applicants[name] = np.trunc(applicants[name])
+        return applicants, valid_mask, errors
+
+    def _compiled_scorer(self, bundle):
+        """The CompiledScorer exported together with the bundle's model/preprocessor, or None."""
+        if not self.use_compiled_scorer:
+            return None
+        # A scorer compiled from other model.pkl/preprocessor.pkl bytes belongs to another training run
+        if not self._is_current(self.compiled_scorer_path, CompiledScorer.load, "scoring through the sklearn path",
+                                bundle):
+            return None
+        return self.registry.get(self.compiled_scorer_path, loader=CompiledScorer.load)
+
+    @staticmethod
+    def _applicant_frame(applicants: np.ndarray) -> pd.DataFrame:
+        frame = pd.DataFrame({name: applicants[name] for name in APPLICANT_FIELDS})
+        for name in INTEGER_FIELDS:
+            frame[name] = frame[name].astype('int64')
+        return frame
+
+    def predict_records(self, records):
+        """
+        Scores CustomData records or a structured array without building a DataFrame when the
+        compiled scorer is available and the batch is small (falls back to the sklearn path otherwise).
+        :return: Tuple of (prediction array (0 or 1), PD score array).
+        """
+        try:
+            with Span(_STAGES["validate_records"]):
+                applicants, valid_mask, errors = self.validate_records(records)
+                if not valid_mask.all():
+                    first_bad = int(np.flatnonzero(~valid_mask)[0])
+                    raise ValueError(f"Row {first_bad}: {'; '.join(errors[first_bad])}")
+
+            with Span(_STAGES["artifact_load"]):
+                bundle = self.artifacts()
+                scorer = self._compiled_scorer(bundle) if len(applicants) <= self.compiled_max_rows else None
+                threshold = self._threshold_of(bundle)
+
+            if scorer is None:
+                with Span(_STAGES["build_frame"]):
+                    frame = self._applicant_frame(applicants)
+                preds, pd_scores, _, _ = self._score_frame(frame, bundle)
+                return preds, pd_scores
 
+            with Span(_STAGES["compiled_score"]):
+                numeric = np.column_stack([applicants[name] for name in scorer.numerical_features])
+                categorical = [applicants[name] for name in scorer.nominal_features]
+                labels, pd_scores = scorer.score_arrays(numeric, categorical)
+                preds = labels if threshold is None else (pd_scores >= threshold).astype(int)
+            return preds, pd_scores
+
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException(f"Prediction Pipeline Crash: {e}", sys)
+
+    def explain_records(self, records, top_k: int = None):
+        """
+        Reason codes for CustomData records or a structured array (scored through the sklearn path).
+        :return: List of per-row reason lists, or None when no explainer matches the current model.
+        """
+        try:
+            applicants, valid_mask, errors = self.validate_records(records)
+            if not valid_mask.all():
+                first_bad = int(np.flatnonzero(~valid_mask)[0])
+                raise ValueError(f"Row {first_bad}: {'; '.join(errors[first_bad])}")
+            return self.predict_with_reasons(self._applicant_frame(applicants), top_k)[2]
+
+        except CustomException:
+            raise
         except Exception as e:
-            # Raise the exception, which the calling app.py will catch and log fully
             raise CustomException(f"Prediction Pipeline Crash: {e}", sys)
 
+    def predict(self, features: pd.DataFrame):
+        """
+        Predicts default (1) / no default (0) for each applicant.
+        :param features: A DataFrame containing new applicant data (11 features).
+        :return: Prediction array (0 or 1).
+        """
+        return self.predict_with_scores(features)[0]
+
+    def validate_batch(self, raw_df: pd.DataFrame, allow_missing: bool = False):
+        """
+        Coerces and validates a whole batch in one vectorized pass (one operation per column,
+        never per row).
+        :param raw_df: DataFrame of raw applicant values (strings or numbers) with REQUIRED_COLUMNS.
+        :param allow_missing: If True, empty values are left for the preprocessor's imputers and only
+                              present-but-unparseable values are errors (offline scoring of loan books).
+        :return: Tuple of (clean DataFrame, boolean valid-row mask, list of per-row error lists).
+        :raises ValueError: If a non-empty batch lacks required columns.
+        """
+        if len(raw_df) == 0:
+            raw_df = raw_df.reindex(columns=self.REQUIRED_COLUMNS)  # e.g. an empty JSON array: nothing to check
+        missing_cols = [col for col in self.REQUIRED_COLUMNS if col not in raw_df.columns]
+        if missing_cols:
+            raise ValueError(f"Batch is missing required columns: {missing_cols}")
+
+        n_rows = len(raw_df)
+        clean = {}
+        invalid = {}
+
+        for col in self.INTEGER_COLUMNS + self.FLOAT_COLUMNS:
+            raw = raw_df[col]
+            values = pd.to_numeric(raw, errors='coerce')
+            values = values.where(np.isfinite(values))
+            # JSON true/false would coerce to 1.0/0.0: booleans are not numbers here
+            if pd.api.types.is_bool_dtype(raw.dtype) or raw.dtype == object:
+                values = values.mask(raw.map(type).isin((bool, np.bool_)))
+            invalid_values = values.isna()
+            if allow_missing:
+                invalid_values &= raw.notna() & (raw.astype('string').str.strip() != '')
+            invalid[col] = invalid_values.to_numpy(dtype=bool)
+            # Same truncation as the single-row form path: int(float(value))
+            clean[col] = np.trunc(values) if col in self.INTEGER_COLUMNS else values
+
+        for col in self.CATEGORICAL_COLUMNS:
+            values = raw_df[col].astype('string').str.strip()
+            values = values.mask(values == '')
+            invalid[col] = np.zeros(n_rows, dtype=bool) if allow_missing else values.isna().to_numpy(dtype=bool)
+            clean[col] = values.astype(object).where(values.notna(), np.nan)
+
+        invalid_matrix = np.column_stack([invalid[col] for col in self.REQUIRED_COLUMNS])
+        valid_mask = ~invalid_matrix.any(axis=1)
+
+        # Build messages only for the (usually few) rows that failed
+        errors = [[] for _ in range(n_rows)]
+        for col_idx, col in enumerate(self.REQUIRED_COLUMNS):
+            for row_idx in np.flatnonzero(invalid_matrix[:, col_idx]):
+                kind = 'categorical' if col in self.CATEGORICAL_COLUMNS else 'numeric'
+                errors[row_idx].append(f"Invalid or missing required {kind} input: {col}")
+
+        clean_df = pd.DataFrame(clean, index=raw_df.index)[self.REQUIRED_COLUMNS]
+        if not allow_missing:
+            for col in self.INTEGER_COLUMNS:
+                clean_df[col] = clean_df[col].fillna(0).astype('int64')
+        return clean_df, valid_mask, errors
+
+    def predict_batch(self, raw_df: pd.DataFrame, allow_missing: bool = False, top_k: int = 0):
+        """
+        Validates and scores a batch of applicants with a single transform/predict call.
+        Rows that fail validation are reported individually and do not fail the batch.
+        :param top_k: If > 0, each scored row also gets its top_k reason codes (one batched explain call).
+        :return: List of per-row result dicts, in input order.
+        :raises ValueError: Batch-level validation errors (missing columns), unwrapped for the caller's response.
+        """
+        clean_df, valid_mask, errors = self.validate_batch(raw_df, allow_missing=allow_missing)
+        try:
+            preds, pd_scores, reasons = np.empty(0, dtype=int), np.empty(0), None
+            if valid_mask.any():
+                if top_k > 0:
+                    preds, pd_scores, reasons = self.predict_with_reasons(clean_df[valid_mask], top_k)
+                else:
+                    preds, pd_scores = self.predict_with_scores(clean_df[valid_mask])
+
+            results = []
+            pred_iter = zip(preds.tolist(), pd_scores.tolist())
+            reason_iter = iter(reasons) if reasons is not None else None
+            for row_idx, is_valid in enumerate(valid_mask.tolist()):
+                if is_valid:
+                    prediction, pd_score = next(pred_iter)
+                    results.append({
+                        'row': row_idx,
+                        'prediction': int(prediction),
+                        'pd': round(pd_score, 6),
+                        'decision': 'REJECT' if prediction == 1 else 'APPROVE',
+                    })
+                    if reason_iter is not None:
+                        results[-1]['reasons'] = next(reason_iter)
+                else:
+                    results.append({'row': row_idx, 'errors': errors[row_idx]})
+            return results
+
+        except CustomException:
+            raise
+        except Exception as e:
+            raise CustomException(f"Batch Prediction Crash: {e}", sys)
+
 class CustomData:
-    # ... (CustomData class remains the same as it is instantiated with clean data from app.py)
-    
+    # Compact applicant record: fixed slots instead of a per-instance __dict__
+    __slots__ = APPLICANT_FIELDS
+
     def __init__(self, 
                  person_age: int,
                  person_income: int,
@@ -79,22 +408,20 @@ class CustomData:
         self.cb_person_default_on_file = cb_person_default_on_file
         self.cb_person_cred_hist_length = cb_person_cred_hist_length
 
+    def as_tuple(self) -> tuple:
+        """Field values in APPLICANT_FIELDS order (one row of an APPLICANT_DTYPE array)."""
+        return tuple(getattr(self, name) for name in APPLICANT_FIELDS)
+
+    def as_dict(self) -> dict:
+        return dict(zip(APPLICANT_FIELDS, self.as_tuple()))
+
+    def __repr__(self) -> str:
+        return f"CustomData({self.as_dict()})"
+
     def get_data_as_dataframe(self):
         """Converts user input variables into a single Pandas DataFrame."""
         try:
-            custom_data_input_dict = {
-                'person_age': [self.person_age],
-                'person_income': [self.person_income],
-                'person_home_ownership': [self.person_home_ownership],
-                'person_emp_length': [self.person_emp_length],
-                'loan_intent': [self.loan_intent],
-                'loan_grade': [self.loan_grade],
-                'loan_amnt': [self.loan_amnt],
-                'loan_int_rate': [self.loan_int_rate],
-                'loan_percent_income': [self.loan_percent_income],
-                'cb_person_default_on_file': [self.cb_person_default_on_file],
-                'cb_person_cred_hist_length': [self.cb_person_cred_hist_length]
-            }
+            custom_data_input_dict = {name: [getattr(self, name)] for name in APPLICANT_FIELDS}
             return pd.DataFrame(custom_data_input_dict)
             
         except Exception as e:
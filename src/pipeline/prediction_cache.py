@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from src.logger import logging
+from src.metrics import metrics
+from src.schema import APPLICANT_FIELDS, INTEGER_FIELDS, NOMINAL_FEATURES
+
+
+@dataclass
+class PredictionCacheConfig:
+    """Size and freshness limits of the per-worker prediction cache."""
+    enabled: bool = os.getenv("PREDICTION_CACHE", "0") == "1"
+    max_entries: int = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "100000"))
+    # Seconds a cached decision stays valid (re-submissions of one application arrive within minutes)
+    ttl_seconds: float = float(os.getenv("PREDICTION_CACHE_TTL", "900"))
+    # Estimated memory of keys + values + bookkeeping; least recently used entries are evicted beyond it
+    max_memory_mb: float = float(os.getenv("PREDICTION_CACHE_MAX_MB", "32"))
+
+
+def _canonical_value(name: str, value) -> str:
+    """Normalizes one feature the way the serving path does: int(float(x)) / float(x) / stripped category."""
+    if name in NOMINAL_FEATURES:
+        return str(value).strip()
+    number = float(value)
+    if name in INTEGER_FIELDS:
+        return str(int(number))
+    return repr(number + 0.0)  # + 0.0 folds -0.0 into 0.0
+
+
+def applicant_key(applicant, model_version: str) -> bytes:
+    """
+    Canonical 128-bit hash of the 11 normalized features plus the model version, so equal
+    applications submitted as strings, ints or floats share one entry.
+    :param applicant: CustomData record or mapping with APPLICANT_FIELDS.
+    """
+    get = applicant.get if isinstance(applicant, dict) else (lambda name: getattr(applicant, name))
+    text = "\x1f".join([model_version] + [_canonical_value(name, get(name)) for name in APPLICANT_FIELDS])
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+# Per-entry size estimate: 16-byte key object, (prediction, pd, expiry) tuple and its floats,
+# plus the OrderedDict node and hash-table slot
+_ENTRY_BYTES = sys.getsizeof(b"0" * 16) + sys.getsizeof((0, 0.0, 0.0)) + 2 * sys.getsizeof(0.0) + 120
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of (prediction, pd_score) per canonical applicant key.
+
+    Entries expire after `ttl_seconds`; the least recently used entry is evicted once
+    `max_entries` or the memory cap is reached. Keys include the model version, and the whole
+    cache is dropped when the ArtifactRegistry hot-reloads an artifact, so a new model never
+    serves decisions of the previous one.
+    """
+
+    def __init__(self, config: PredictionCacheConfig = None):
+        self.config = config or PredictionCacheConfig()
+        self.capacity = max(1, min(self.config.max_entries,
+                                   int(self.config.max_memory_mb * 1024 * 1024 // _ENTRY_BYTES)))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = metrics.counter("prediction_cache_hits_total", "Predictions served from the cache")
+        self.misses = metrics.counter("prediction_cache_misses_total", "Predictions not found in the cache")
+        self.evictions = {
+            reason: metrics.counter("prediction_cache_evictions_total", "Entries removed from the cache",
+                                    labels={"reason": reason})
+            for reason in ("lru", "ttl")
+        }
+        self.invalidations = metrics.counter("prediction_cache_invalidations_total",
+                                             "Cache flushes caused by artifact reloads")
+        self.size = metrics.gauge("prediction_cache_entries", "Entries currently cached")
+        self.hit_ratio = metrics.gauge("prediction_cache_hit_ratio", "Cache hits / lookups since start")
+
+    def get(self, key: bytes):
+        """Returns the cached (prediction, pd_score) for `key`, or None when missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= now:
+                del self._entries[key]
+                self.evictions["ttl"].inc()
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+            self.size.set(len(self._entries))
+        (self.hits if entry is not None else self.misses).inc()
+        lookups = self.hits.value + self.misses.value
+        self.hit_ratio.set(self.hits.value / lookups)
+        return None if entry is None else entry[:2]
+
+    def put(self, key: bytes, prediction: int, pd_score: float):
+        expires_at = time.monotonic() + self.config.ttl_seconds
+        with self._lock:
+            self._entries[key] = (int(prediction), float(pd_score), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions["lru"].inc()
+            self.size.set(len(self._entries))
+
+    def invalidate(self, file_path=None):
+        """Drops every entry (registered as an ArtifactRegistry reload listener)."""
+        with self._lock:
+            n_entries = len(self._entries)
+            self._entries.clear()
+            self.size.set(0)
+        self.invalidations.inc()
+        logging.info(f"Prediction cache invalidated ({n_entries} entries) after reload of {file_path or 'all artifacts'}")
+
+    def stats(self) -> dict:
+        lookups = self.hits.value + self.misses.value
+        return {
+            "enabled": self.config.enabled,
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "ttl_seconds": self.config.ttl_seconds,
+            "estimated_mb": round(len(self._entries) * _ENTRY_BYTES / 1024 ** 2, 3),
+            "hits": int(self.hits.value),
+            "misses": int(self.misses.value),
+            "hit_ratio": self.hits.value / lookups if lookups else 0.0,
+            "evictions": {reason: int(counter.value) for reason, counter in self.evictions.items()},
+            "invalidations": int(self.invalidations.value),
+        }
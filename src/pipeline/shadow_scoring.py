@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+import zlib
+import atexit
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.metrics import metrics
+from src.schema import APPLICANT_FIELDS, TARGET_COLUMN
+from src.utils import save_json, load_json, load_frame, misclassification_cost
+from src.components.model_registry import ModelRegistry
+from src.pipeline.prediction_cache import applicant_key
+
+
+@dataclass
+class ShadowScoringConfig:
+    """Challenger models scored in the background next to the serving champion."""
+    enabled: bool = os.getenv("SHADOW_SCORING", "0") == "1"
+    # Comma-separated "model name" / "version/model name"; empty = runner-up of the latest training run
+    challengers: str = os.getenv("SHADOW_CHALLENGERS", "")
+    n_threads: int = int(os.getenv("SHADOW_THREADS", "1"))
+    # Requests waiting for shadow scoring beyond this are dropped, never queued without bound
+    max_pending: int = int(os.getenv("SHADOW_MAX_PENDING", "1000"))
+    log_file_path: str = os.getenv("SHADOW_LOG", os.path.join("artifacts", "shadow", "shadow_log.bin"))
+    # Records buffered per process before one appending write
+    flush_records: int = int(os.getenv("SHADOW_FLUSH_RECORDS", "256"))
+
+
+# One fixed-size little-endian record (32 bytes) per applicant and challenger
+SHADOW_RECORD_DTYPE = np.dtype([
+    ('ts', '<f8'),              # unix time of the champion decision
+    ('applicant', '<u8'),       # first 8 bytes of the canonical applicant hash (joins with outcomes)
+    ('challenger', '<u2'),      # id -> "version/model name" in the .challengers.json sidecar
+    ('champion_pred', 'u1'),
+    ('challenger_pred', 'u1'),
+    ('champion_pd', '<f4'),
+    ('challenger_pd', '<f4'),
+    ('latency_us', '<f4'),      # challenger scoring time per row
+])
+
+
+def challenger_id(version: str, model_name: str) -> int:
+    """Stable 16-bit id of a challenger, identical in every worker process."""
+    return zlib.crc32(f"{version}/{model_name}".encode()) & 0xFFFF
+
+
+def applicant_hash(applicant) -> int:
+    """Model-independent 64-bit applicant hash (CustomData record or field mapping)."""
+    return int.from_bytes(applicant_key(applicant, "")[:8], 'little')
+
+
+def _sidecar_path(log_file_path: str) -> str:
+    return f"{log_file_path}.challengers.json"
+
+
+class ShadowLogWriter:
+    """
+    Appends SHADOW_RECORD_DTYPE records to one binary file shared by all workers: records are
+    buffered per process and written with a single O_APPEND write, so concurrent workers never
+    interleave inside a record.
+    """
+
+    def __init__(self, file_path: str, flush_records: int = 256):
+        self.file_path = file_path
+        self.flush_records = max(1, flush_records)
+        self._buffer = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+        atexit.register(self.flush)
+
+    def append(self, records: np.ndarray):
+        with self._lock:
+            self._buffer.append(records)
+            if sum(len(chunk) for chunk in self._buffer) >= self.flush_records:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = np.concatenate(self._buffer).tobytes()
+        self._buffer = []
+        fd = os.open(self.file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def read_shadow_log(file_path: str) -> pd.DataFrame:
+    """Loads a shadow log (memory-mapped) as a DataFrame with a readable 'challenger_name' column."""
+    try:
+        records = np.memmap(file_path, dtype=SHADOW_RECORD_DTYPE, mode='r') if os.path.getsize(file_path) else \
+            np.empty(0, dtype=SHADOW_RECORD_DTYPE)
+        frame = pd.DataFrame(records)
+        sidecar = _sidecar_path(file_path)
+        names = {int(k): v for k, v in load_json(sidecar).items()} if os.path.exists(sidecar) else {}
+        frame['challenger_name'] = frame['challenger'].map(names)
+        return frame
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class ShadowScorer:
+    """
+    Scores the configured challengers from the ModelRegistry for every request the champion
+    answered, on a background thread pool: callers only enqueue (applicants, champion results)
+    and return, so shadow scoring adds nothing to response latency. Each challenger uses its own
+    registered preprocessor and cost-optimal threshold; results go to the binary shadow log.
+    """
+
+    def __init__(self, pipeline, config: ShadowScoringConfig = None, model_registry: ModelRegistry = None):
+        self.config = config or ShadowScoringConfig()
+        # Champion PredictPipeline: its validation rules and ArtifactRegistry are reused for the challengers
+        self.pipeline = pipeline
+        self.registry = pipeline.registry
+        self.model_registry = model_registry or ModelRegistry()
+        self._executor = None
+        self._executor_pid = None
+        self._writer = None
+        self._challengers = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        self.dropped = metrics.counter("shadow_dropped_total", "Shadow scoring requests dropped (queue full or error)")
+        self.pending = metrics.gauge("shadow_pending", "Requests waiting for shadow scoring")
+
+    def _start(self):
+        """Resolves challengers and starts the pool on first use (per process: forked workers get their own)."""
+        if self._executor is not None and self._executor_pid == os.getpid():
+            return True
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                return True
+            try:
+                challengers = []
+                for version, name in self.model_registry.challengers(self.config.challengers):
+                    paths = self.model_registry.paths(version, name)
+                    challengers.append({'id': challenger_id(version, name), 'name': f"{version}/{name}", **paths})
+            except CustomException as e:
+                logging.warning(f"Shadow scoring disabled: {e}")
+                self.config.enabled = False
+                return False
+            self._challengers = challengers
+            self._writer = ShadowLogWriter(self.config.log_file_path, self.config.flush_records)
+            self._update_sidecar()
+            self._executor = ThreadPoolExecutor(max_workers=self.config.n_threads, thread_name_prefix="shadow")
+            self._executor_pid = os.getpid()
+            logging.info(f"Shadow scoring {len(challengers)} challenger(s): {[c['name'] for c in challengers]}")
+            return True
+
+    def _update_sidecar(self):
+        sidecar = _sidecar_path(self.config.log_file_path)
+        names = load_json(sidecar) if os.path.exists(sidecar) else {}
+        names.update({str(c['id']): c['name'] for c in self._challengers})
+        save_json(sidecar, names)
+
+    def submit(self, applicants, champion_preds, champion_pds):
+        """
+        Queues shadow scoring of a batch the champion has just answered.
+        :param applicants: List of CustomData records, or the raw DataFrame given to predict_batch.
+        :param champion_preds: Champion decisions (of the valid rows only, for a raw DataFrame).
+        """
+        if not self.config.enabled or not self._start():
+            return
+        with self._lock:
+            if self._pending >= self.config.max_pending:
+                self.dropped.inc()
+                return
+            self._pending += 1
+            self.pending.set(self._pending)
+        self._executor.submit(self._score, applicants, np.asarray(champion_preds), np.asarray(champion_pds), time.time())
+
+    def _score(self, applicants, champion_preds, champion_pds, ts):
+        try:
+            # Same validation/typing as the champion saw; invalid batch rows were not scored by it either
+            if isinstance(applicants, pd.DataFrame):
+                clean_df, valid_mask, _ = self.pipeline.validate_batch(applicants)
+                frame = clean_df[valid_mask]
+            else:
+                frame = self.pipeline._applicant_frame(self.pipeline.validate_records(applicants)[0])
+            keys = [applicant_hash(row) for row in frame.to_dict('records')]
+
+            for challenger in self._challengers if len(frame) else []:
+                start = time.perf_counter()
+                preprocessor = self.registry.get(challenger['preprocessor'])
+                model = self.registry.get(challenger['model'])
+                pd_scores = model.predict_proba(preprocessor.transform(frame))[:, 1].astype(np.float64)
+                preds = (pd_scores >= challenger['threshold']).astype(np.uint8)
+                elapsed_us = (time.perf_counter() - start) * 1e6 / max(len(frame), 1)
+
+                records = np.empty(len(frame), dtype=SHADOW_RECORD_DTYPE)
+                records['ts'] = ts
+                records['applicant'] = keys
+                records['challenger'] = challenger['id']
+                records['champion_pred'] = champion_preds
+                records['challenger_pred'] = preds
+                records['champion_pd'] = champion_pds
+                records['challenger_pd'] = pd_scores
+                records['latency_us'] = elapsed_us
+                self._writer.append(records)
+
+                metrics.counter("shadow_scored_total", "Applicants scored by each challenger",
+                                labels={"challenger": challenger['name']}).inc(len(frame))
+                metrics.counter("shadow_disagreements_total", "Challenger decisions differing from the champion",
+                                labels={"challenger": challenger['name']}).inc(int(np.sum(preds != champion_preds)))
+        except Exception as e:
+            self.dropped.inc()
+            logging.warning(f"Shadow scoring failed: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.pending.set(self._pending)
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.config.enabled,
+            "challengers": [c['name'] for c in self._challengers or []],
+            "pending": self._pending,
+            "dropped": int(self.dropped.value),
+            "log_file": self.config.log_file_path,
+        }
+
+
+def compare_costs(log: pd.DataFrame, outcomes: pd.DataFrame) -> pd.DataFrame:
+    """
+    5:1 misclassification cost of champion vs each challenger on the logged applicants whose
+    outcome (loan_status) is now known. The latest log record per applicant and challenger wins.
+    :param outcomes: Applicant columns plus loan_status.
+    """
+    labels = pd.DataFrame({
+        'applicant': np.fromiter((applicant_hash(row) for row in outcomes[list(APPLICANT_FIELDS)].to_dict('records')),
+                                 dtype=np.uint64, count=len(outcomes)),
+        TARGET_COLUMN: outcomes[TARGET_COLUMN].to_numpy(dtype=np.int64),
+    }).drop_duplicates('applicant', keep='last')
+    joined = log.sort_values('ts').drop_duplicates(['applicant', 'challenger'], keep='last').merge(labels, on='applicant')
+
+    rows = []
+    for name, group in joined.groupby('challenger_name'):
+        y_true = group[TARGET_COLUMN].to_numpy()
+        rows.append({
+            'challenger': name,
+            'applicants': len(group),
+            'champion_cost': misclassification_cost(y_true, group['champion_pred'].to_numpy()),
+            'challenger_cost': misclassification_cost(y_true, group['challenger_pred'].to_numpy()),
+            'disagreement_rate': round(float(np.mean(group['champion_pred'] != group['challenger_pred'])), 4),
+        })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare champion and shadow challenger costs on known outcomes.")
+    parser.add_argument("outcomes", help="CSV/Feather/Parquet of applicants with their loan_status.")
+    parser.add_argument("--log", default=ShadowScoringConfig.log_file_path)
+    args = parser.parse_args()
+
+    report = compare_costs(read_shadow_log(args.log), load_frame(args.outcomes))
+    print(report.to_string(index=False) if len(report) else "No logged applicant has a known outcome yet.")
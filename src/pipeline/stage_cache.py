@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import joblib
+import numpy as np
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+@dataclass
+class StageCacheConfig:
+    """Location and eviction limits of the content-addressed training stage cache."""
+    cache_dir: str = os.path.join("artifacts", "stage_cache")
+    enabled: bool = os.getenv("STAGE_CACHE", "1") != "0"
+    # Eviction: entries unused for longer than max_age_days are dropped, then the least
+    # recently used entries until the cache fits in max_size_mb (0 disables a limit).
+    max_size_mb: float = float(os.getenv("STAGE_CACHE_MAX_MB", "2048"))
+    max_age_days: float = float(os.getenv("STAGE_CACHE_MAX_AGE_DAYS", "30"))
+
+
+# --- Fingerprinting ---
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digests(model_path: str, preprocessor_path: str) -> dict:
+    """file_digest of the model and preprocessor a derived artifact (compiled scorer, explainer) is built from."""
+    return {'model': file_digest(model_path), 'preprocessor': file_digest(preprocessor_path)}
+
+
+_PARALLELISM_PARAMS = ("n_jobs", "nthread")
+
+
+def _update(digest, value):
+    """Feeds a stable, type-tagged encoding of `value` into `digest`."""
+    if hasattr(value, "get_params") and not isinstance(value, type):
+        # sklearn / xgboost estimators: class + own params (nested estimators recurse).
+        # Thread counts come from the parallelism profile and do not change the fitted result.
+        digest.update(f"<{type(value).__module__}.{type(value).__qualname__}>".encode())
+        params = value.get_params(deep=False)
+        _update(digest, {k: v for k, v in params.items() if k not in _PARALLELISM_PARAMS})
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=str):
+            _update(digest, str(key))
+            _update(digest, value[key])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _update(digest, item)
+        digest.update(b"]")
+    elif isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        digest.update(f"<ndarray {array.dtype.str} {array.shape}>".encode())
+        digest.update(array.view(np.uint8).reshape(-1) if array.size else b"")
+    elif hasattr(value, "tocsr") and hasattr(value, "nnz"):
+        # scipy.sparse: hash the canonical CSR buffers
+        matrix = value.tocsr()
+        digest.update(f"<sparse {matrix.shape}>".encode())
+        for part in (matrix.data, matrix.indices, matrix.indptr):
+            _update(digest, part)
+    elif isinstance(value, np.generic):
+        _update(digest, value.item())
+    elif callable(value) and hasattr(value, "__qualname__"):
+        # Functions/classes (e.g. a FunctionTransformer's func): their repr holds a memory address
+        digest.update(f"<callable {getattr(value, '__module__', '')}.{value.__qualname__}>".encode())
+    else:
+        digest.update(f"<{type(value).__name__}>{value!r}".encode())
+
+
+def fingerprint(*parts) -> str:
+    """Content key of a stage: hash over its inputs (file digests, arrays) and config/params."""
+    digest = hashlib.sha256()
+    for part in parts:
+        _update(digest, part)
+    return digest.hexdigest()
+
+
+# --- Cache ---
+
+class StageCache:
+    """
+    Content-addressed store of training stage outputs.
+
+    An entry lives in `<cache_dir>/<stage>/<key>/` and holds the stage's return value
+    (result.joblib), copies of the artifact files it wrote, and meta.json with its size and
+    last-use time. On a hit the files are copied back to their artifact paths, so later
+    stages and the serving app see exactly what a fresh run would have produced.
+    """
+
+    def __init__(self, config: StageCacheConfig = None):
+        self.config = config or StageCacheConfig()
+        self.records = []
+
+    def _entry_dir(self, stage: str, key: str) -> str:
+        return os.path.join(self.config.cache_dir, stage.replace(" ", "_").replace(os.sep, "_"), key)
+
+    def get(self, stage: str, key: str):
+        """Returns (True, result) and restores the stage's files on a hit, else (False, None)."""
+        entry_dir = self._entry_dir(stage, key)
+        meta_path = os.path.join(entry_dir, "meta.json")
+        if not self.config.enabled or not os.path.exists(meta_path):
+            return False, None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            result = joblib.load(os.path.join(entry_dir, "result.joblib"))
+            for name, target_path in meta["files"].items():
+                os.makedirs(os.path.dirname(target_path) or ".", exist_ok=True)
+                tmp_path = f"{target_path}.tmp"
+                # copyfile (not copy2): a fresh mtime lets ArtifactRegistry notice the swap
+                shutil.copyfile(os.path.join(entry_dir, name), tmp_path)
+                os.replace(tmp_path, target_path)
+            meta["last_used"] = time.time()
+            self._write_meta(entry_dir, meta)
+            return True, result
+        except Exception as e:
+            # A damaged entry is treated as a miss and overwritten by the re-run
+            logging.warning(f"Ignoring unreadable stage cache entry {entry_dir}: {e}")
+            return False, None
+
+    def put(self, stage: str, key: str, result, files: dict = None):
+        """Stores `result` and copies of `files` ({name: artifact path}) under the stage key."""
+        if not self.config.enabled:
+            return
+        try:
+            entry_dir = self._entry_dir(stage, key)
+            tmp_dir = f"{entry_dir}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            joblib.dump(result, os.path.join(tmp_dir, "result.joblib"))
+            for name, source_path in (files or {}).items():
+                shutil.copyfile(source_path, os.path.join(tmp_dir, name))
+
+            size = sum(os.path.getsize(os.path.join(tmp_dir, name)) for name in os.listdir(tmp_dir))
+            now = time.time()
+            self._write_meta(tmp_dir, {
+                "stage": stage, "key": key, "files": dict(files or {}),
+                "size_bytes": size, "created": now, "last_used": now,
+            })
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _write_meta(entry_dir: str, meta: dict):
+        tmp_path = os.path.join(entry_dir, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(entry_dir, "meta.json"))
+
+    def run(self, stage: str, key: str, func, files: dict = None):
+        """
+        Returns the cached result of `stage` for `key`, or runs `func()` and caches its result.
+        :param files: {name: artifact path} written by `func` that must be restored on a hit.
+        """
+        start = time.perf_counter()
+        hit, result = self.get(stage, key)
+        if not hit:
+            result = func()
+            self.put(stage, key, result, files)
+        self.record(stage, hit, time.perf_counter() - start, key)
+        return result
+
+    def record(self, stage: str, hit: bool, seconds: float, key: str = ""):
+        """Adds a line to the run summary (for stages that call get/put themselves)."""
+        self.records.append({"stage": stage, "status": "hit" if hit else "miss",
+                             "seconds": round(seconds, 3), "key": key[:12]})
+
+    def summary(self) -> str:
+        """Per-stage hit/miss and timing table of this run."""
+        lines = [f"{'stage':<32} {'status':<6} {'seconds':>9}  key"]
+        for r in self.records:
+            lines.append(f"{r['stage']:<32} {r['status']:<6} {r['seconds']:>9.3f}  {r['key']}")
+        hits = sum(r["status"] == "hit" for r in self.records)
+        total = sum(r["seconds"] for r in self.records)
+        lines.append(f"{len(self.records)} stages, {hits} cache hits, {total:.3f}s total")
+        return "\n".join(lines)
+
+    def _entries(self) -> list:
+        entries = []
+        if not os.path.isdir(self.config.cache_dir):
+            return entries
+        for stage_dir in os.listdir(self.config.cache_dir):
+            stage_path = os.path.join(self.config.cache_dir, stage_dir)
+            if not os.path.isdir(stage_path):
+                continue
+            for key in os.listdir(stage_path):
+                meta_path = os.path.join(stage_path, key, "meta.json")
+                try:
+                    with open(meta_path) as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue  # in-progress .tmp entries and leftovers
+                entries.append((os.path.join(stage_path, key), meta))
+        return entries
+
+    def evict(self, max_size_mb: float = None, max_age_days: float = None) -> dict:
+        """
+        Drops entries unused for more than `max_age_days`, then the least recently used ones
+        until the cache is at most `max_size_mb`. Defaults come from the config.
+        :return: Counts and sizes of removed/kept entries.
+        """
+        try:
+            max_size_mb = self.config.max_size_mb if max_size_mb is None else max_size_mb
+            max_age_days = self.config.max_age_days if max_age_days is None else max_age_days
+            entries = sorted(self._entries(), key=lambda e: e[1]["last_used"])
+            now = time.time()
+            removed = freed = 0
+
+            def drop(entry_dir, meta):
+                nonlocal removed, freed
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                removed += 1
+                freed += meta["size_bytes"]
+
+            kept = []
+            for entry_dir, meta in entries:
+                if max_age_days and now - meta["last_used"] > max_age_days * 86400:
+                    drop(entry_dir, meta)
+                else:
+                    kept.append((entry_dir, meta))
+
+            total = sum(meta["size_bytes"] for _, meta in kept)
+            while max_size_mb and kept and total > max_size_mb * 1024 * 1024:
+                entry_dir, meta = kept.pop(0)  # least recently used first
+                drop(entry_dir, meta)
+                total -= meta["size_bytes"]
+
+            report = {"removed": removed, "freed_mb": round(freed / 1024 ** 2, 2),
+                      "kept": len(kept), "size_mb": round(total / 1024 ** 2, 2)}
+            logging.info(f"Stage cache eviction: {report}")
+            return report
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evict entries from the training stage cache.")
+    parser.add_argument("--max-size-mb", type=float, default=StageCacheConfig.max_size_mb)
+    parser.add_argument("--max-age-days", type=float, default=StageCacheConfig.max_age_days)
+    args = parser.parse_args()
+    print(StageCache().evict(max_size_mb=args.max_size_mb, max_age_days=args.max_age_days))
@@ -1,42 +1,242 @@
 import os
 import sys
+import argparse
 from src.exception import CustomException
 from src.logger import logging
 
 # Import all core components
-from src.components.data_ingestion import DataIngestion
-from src.components.data_transformation import DataTransformation
-from src.components.model_trainer import ModelTrainer
+from src.components.data_ingestion import DataIngestion, list_chunk_files
+from src.components.data_transformation import DataTransformation, load_transformed_chunks
+from src.components.model_trainer import ModelTrainer, STREAMING_TRAINERS, external_memory_supported
+from src.components.model_compiler import ModelCompiler
+from src.components.incremental_trainer import IncrementalTrainer
+from src.components.reason_codes import ReasonCodeBuilder
+from src.components.drift_monitor import DriftReferenceBuilder
+from src.pipeline.stage_cache import StageCache, fingerprint, file_digest
+from src.schema import RAW_DTYPES
+from src.utils import ARTIFACT_FORMAT
+from src.metrics import metrics, Span
+from src.parallelism import configure_process
+
+TRAINING_METRICS_PATH = os.path.join('artifacts', 'training_metrics.prom')
+
+
+def stage_span(stage: str) -> Span:
+    """Times (and logs) one training stage into training_stage_duration_ms{stage=...}."""
+    histogram = metrics.histogram(
+        "training_stage_duration_ms", "Wall time of each training pipeline stage",
+        buckets=(100, 1000, 10_000, 60_000, 300_000, 900_000, 3_600_000), labels={"stage": stage},
+    )
+    return Span(histogram, log=True)
+
+
+def run_incremental_training(new_data_path: str, force: bool = False) -> dict:
+    """Applies a file of newly performed loans to the current artifacts and recompiles on promotion."""
+    trainer = IncrementalTrainer()
+    with stage_span("incremental_update"):
+        report = trainer.initiate_incremental_training(new_data_path, force=force)
+    if report['promoted']:
+        with stage_span("compilation"):
+            compiled_path, _ = ModelCompiler().initiate_model_compilation(
+                trainer.transformation_config.preprocessor_obj_file_path,
+                trainer.trainer_config.trained_model_file_path,
+                trainer.incremental_config.holdout_data_path,
+                trainer.trainer_config.threshold_file_path,
+            )
+        with stage_span("reason_codes"):
+            explainer_path, _ = ReasonCodeBuilder().initiate_reason_codes(
+                trainer.transformation_config.preprocessor_obj_file_path,
+                trainer.trainer_config.trained_model_file_path,
+                trainer.incremental_config.holdout_data_path,
+            )
+        with stage_span("drift_reference"):
+            reference_path, _ = DriftReferenceBuilder().initiate_drift_reference(
+                trainer.transformation_config.preprocessor_obj_file_path,
+                trainer.trainer_config.trained_model_file_path,
+                trainer.incremental_config.holdout_data_path,
+                trainer.incremental_config.holdout_data_path,
+            )
+        logging.info(f"Promoted incrementally updated model; compiled scorer saved to {compiled_path}, "
+                     f"reason codes to {explainer_path}, drift reference to {reference_path}.")
+    metrics.write_textfile(TRAINING_METRICS_PATH)
+    return report
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the credit risk model (full run by default).")
+    parser.add_argument("--incremental", metavar="NEW_DATA_CSV",
+                        help="Update the current preprocessor/model from this file of new loans only.")
+    parser.add_argument("--force", action="store_true", help="Re-apply an already applied --incremental file.")
+    args = parser.parse_args()
+    # Training owns the machine; artifacts are still saved with the serving profile
+    configure_process("training")
+
     try:
+        if args.incremental:
+            logging.info(f"Starting incremental training from {args.incremental}.")
+            report = run_incremental_training(args.incremental, force=args.force)
+            logging.info(f"--- INCREMENTAL TRAINING FINISHED --- {report}")
+            sys.exit(0)
+
         logging.info("Starting End-to-End Training Pipeline for Credit Risk Model.")
         
+        # Content-addressed stage cache: a stage whose inputs and config hash to an existing
+        # key is skipped and its outputs are restored from artifacts/stage_cache/
+        stage_cache = StageCache()
+
         # --- 1. Data Ingestion ---
-        # Reads the raw CSV, splits it, and saves train/test CSVs to artifacts/
+        # Reads the raw CSV, splits it, and saves train/test artifacts to artifacts/
         logging.info("Starting Data Ingestion component.")
         ingestion = DataIngestion()
         
         # NOTE: This path must match your new P2P dataset file location
         raw_data_path = 'data/credit_risk_data.csv' 
-        train_path, test_path = ingestion.initiate_data_ingestion(raw_data_path)
-        logging.info("Data Ingestion completed.")
-        
-        # --- 2. Data Transformation ---
-        # Loads train/test data, fits the preprocessor (scaler/encoder), and saves preprocessor.pkl
-        logging.info("Starting Data Transformation component.")
+        ingestion_config = ingestion.ingestion_config
         transformation = DataTransformation()
-        train_arr, test_arr, preprocessor_path = transformation.initiate_data_transformation(
-            train_path, test_path
-        )
-        logging.info("Data Transformation completed. Preprocessor saved.")
+        trainer = ModelTrainer()
+        streaming_trainer = trainer.model_trainer_config.streaming_trainer
+        if streaming_trainer not in STREAMING_TRAINERS:
+            raise ValueError(f"Unknown STREAMING_TRAINER {streaming_trainer!r}, expected one of {list(STREAMING_TRAINERS)}")
+        external_memory = ingestion_config.streaming and streaming_trainer == 'external_memory'
+        if external_memory and not external_memory_supported():
+            # e.g. the python:3.9 image, which cannot install xgboost >= 3.0
+            logging.warning("This xgboost has no external-memory DMatrix (xgboost >= 3.0 needed): falling back to "
+                            "STREAMING_TRAINER=in_memory, which needs the full transformed matrix in RAM.")
+            external_memory = False
+
+        if ingestion_config.streaming:
+            # Out-of-core mode (STREAMING_INGESTION=1): chunked hash-split ingestion, streaming
+            # preprocessor statistics and transformed part files. The external-memory trainer reads
+            # the part files directly; STREAMING_TRAINER=in_memory stacks them into one CSR, which
+            # must fit in RAM. Directory outputs bypass the stage cache.
+            with stage_span("ingestion"):
+                train_chunks_dir, test_chunks_dir = ingestion.initiate_streaming_ingestion(raw_data_path)
+            logging.info("Streaming Data Ingestion completed.")
+
+            logging.info("Starting streaming Data Transformation component.")
+            with stage_span("transformation"):
+                train_out_dir, test_out_dir, preprocessor_path = \
+                    transformation.initiate_streaming_transformation(train_chunks_dir, test_chunks_dir)
+                if not external_memory:
+                    X_train, y_train = load_transformed_chunks(train_out_dir)
+                    X_test, y_test = load_transformed_chunks(test_out_dir)
+            # Compilation and the holdout PD histogram use the first test part, reason-code backgrounds and
+            # the feature histograms the first train part: samples, not the whole split
+            test_parts, train_parts = list_chunk_files(test_chunks_dir), list_chunk_files(train_chunks_dir)
+            test_path, background_path = test_parts[0], train_parts[0]
+            logging.info("Streaming Data Transformation completed. Preprocessor saved.")
+            logging.info(f"Compilation check and drift PD reference sample test part 1 of {len(test_parts)}; "
+                         f"reason codes and drift feature reference sample train part 1 of {len(train_parts)}.")
+        else:
+            ingestion_key = fingerprint(
+                file_digest(raw_data_path), ingestion_config.test_size, ingestion_config.random_state,
+                RAW_DTYPES, ingestion_config.train_data_path, ingestion_config.test_data_path,
+            )
+            with stage_span("ingestion"):
+                train_path, test_path = stage_cache.run(
+                    "ingestion", ingestion_key,
+                    lambda: ingestion.initiate_data_ingestion(raw_data_path),
+                    files={
+                        "train": ingestion_config.train_data_path,
+                        "test": ingestion_config.test_data_path,
+                        "data": ingestion_config.raw_data_path,
+                    },
+                )
+            background_path = train_path
+            logging.info("Data Ingestion completed.")
+
+            # --- 2. Data Transformation ---
+            # Loads train/test data, fits the preprocessor (scaler/encoder), and saves preprocessor.pkl
+            logging.info("Starting Data Transformation component.")
+            transformation_key = fingerprint(
+                file_digest(train_path), file_digest(test_path),
+                transformation.get_data_transformer_object(),  # feature lists + imputer/scaler/encoder params
+                ARTIFACT_FORMAT,
+            )
+            with stage_span("transformation"):
+                X_train, y_train, X_test, y_test, preprocessor_path = stage_cache.run(
+                    "transformation", transformation_key,
+                    lambda: transformation.initiate_data_transformation(train_path, test_path),
+                    files={"preprocessor": transformation.data_transformation_config.preprocessor_obj_file_path},
+                )
+            logging.info("Data Transformation completed. Preprocessor saved.")
         
         # --- 3. Model Trainer ---
-        # Trains multiple models, evaluates against the Cost Function (5:1 loss), and saves model.pkl
+        # Trains multiple models, evaluates against the Cost Function (5:1 loss), and saves model.pkl.
+        # Each model is cached separately, so only new or re-parameterised models are fitted.
         logging.info("Starting Model Training component.")
-        trainer = ModelTrainer()
-        best_model_name, best_cost = trainer.initiate_model_trainer(train_arr, test_arr)
+        with stage_span("training"):
+            if external_memory:
+                best_model_name, best_cost = trainer.initiate_external_memory_trainer(
+                    train_out_dir, test_out_dir, preprocessor_path=preprocessor_path
+                )
+            else:
+                best_model_name, best_cost = trainer.initiate_model_trainer(
+                    X_train, y_train, X_test, y_test, stage_cache=stage_cache, preprocessor_path=preprocessor_path
+                )
         
+        # --- 4. Model Compilation ---
+        # Exports preprocessor + best model as a flat NumPy scorer and verifies it against sklearn on the test split
+        logging.info("Starting Model Compilation component.")
+        compiler = ModelCompiler()
+        model_path = trainer.model_trainer_config.trained_model_file_path
+        threshold_path = trainer.model_trainer_config.threshold_file_path
+        compile_key = fingerprint(
+            file_digest(preprocessor_path), file_digest(model_path), file_digest(test_path),
+            file_digest(threshold_path), compiler.model_compiler_config.compiled_scorer_file_path,
+        )
+        with stage_span("compilation"):
+            compiled_path, compile_report = stage_cache.run(
+                "compilation", compile_key,
+                lambda: compiler.initiate_model_compilation(preprocessor_path, model_path, test_path, threshold_path),
+                files={"compiled_scorer": compiler.model_compiler_config.compiled_scorer_file_path},
+            )
+        logging.info(f"Model Compilation completed. Compiled scorer saved to {compiled_path}.")
+
+        # --- 5. Reason Codes ---
+        # Per-feature contribution explainer (TreeSHAP / linear) with background expectations from the train split
+        logging.info("Starting Reason Code component.")
+        reason_builder = ReasonCodeBuilder()
+        reason_config = reason_builder.reason_code_config
+        reason_key = fingerprint(
+            file_digest(preprocessor_path), file_digest(model_path), file_digest(background_path),
+            reason_config.background_rows, reason_config.explainer_file_path,
+        )
+        with stage_span("reason_codes"):
+            explainer_path, reason_report = stage_cache.run(
+                "reason_codes", reason_key,
+                lambda: reason_builder.initiate_reason_codes(preprocessor_path, model_path, background_path),
+                files={"reason_codes": reason_config.explainer_file_path},
+            )
+        logging.info(f"Reason Codes completed. Explainer saved to {explainer_path}.")
+
+        # --- 6. Drift Reference ---
+        # Feature histograms of the training data and the holdout PD distribution for the serving drift monitor
+        logging.info("Starting Drift Reference component.")
+        drift_builder = DriftReferenceBuilder()
+        drift_config = drift_builder.drift_monitor_config
+        drift_key = fingerprint(
+            file_digest(preprocessor_path), file_digest(model_path), file_digest(background_path),
+            file_digest(test_path), drift_config.n_bins, drift_config.reference_rows, drift_config.reference_file_path,
+        )
+        with stage_span("drift_reference"):
+            reference_path, drift_rows = stage_cache.run(
+                "drift_reference", drift_key,
+                lambda: drift_builder.initiate_drift_reference(preprocessor_path, model_path, background_path, test_path),
+                files={"drift_reference": drift_config.reference_file_path},
+            )
+        logging.info(f"Drift Reference completed. Reference saved to {reference_path}.")
+
+        # The logger also streams to stdout, so the summary shows up on the console
+        logging.info(f"Stage cache summary:\n{stage_cache.summary()}")
+        stage_cache.evict()
+
+        # Stage timings for node_exporter's textfile collector (or a CI artifact)
+        metrics.gauge("training_best_cost", "Misclassification cost of the promoted model",
+                      labels={"model": best_model_name}).set(best_cost)
+        metrics.write_textfile(TRAINING_METRICS_PATH)
+        logging.info(f"Training metrics written to {TRAINING_METRICS_PATH}")
+
         logging.info(f"--- END-TO-END TRAINING PIPELINE SUCCESSFUL ---")
         logging.info(f"Best Model: {best_model_name}, Final Misclassification Cost: {best_cost}")
 
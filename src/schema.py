@@ -0,0 +1,85 @@
+import os
+import numpy as np
+
+# --- Column schema of the P2P credit risk dataset (12 columns) ---
+
+TARGET_COLUMN = 'loan_status'
+
+NUMERICAL_FEATURES = [
+    'person_age',
+    'person_income',
+    'person_emp_length',
+    'loan_amnt',
+    'loan_int_rate',
+    'loan_percent_income',
+    'cb_person_cred_hist_length'
+]
+
+NOMINAL_FEATURES = [
+    'person_home_ownership',
+    'loan_intent',
+    'loan_grade',
+    'cb_person_default_on_file'
+]
+
+# Explicit dtypes used when reading the raw CSV and when exchanging data between pipeline
+# stages, so no stage relies on per-file type inference. The four nominal columns travel as
+# pandas categoricals (Arrow dictionary arrays in Feather/Parquet). Integer-valued features
+# are read as floats so a blank cell becomes NaN for the median imputer instead of failing
+# the read; only the target must always be present.
+WIDE_DTYPES = {
+    'person_age': 'float64',
+    'person_income': 'float64',
+    'person_home_ownership': 'category',
+    'person_emp_length': 'float64',
+    'loan_intent': 'category',
+    'loan_grade': 'category',
+    'loan_amnt': 'float64',
+    'loan_int_rate': 'float64',
+    TARGET_COLUMN: 'int64',
+    'loan_percent_income': 'float64',
+    'cb_person_default_on_file': 'category',
+    'cb_person_cred_hist_length': 'float64',
+}
+
+# Compact plan: numeric features as float32 (the preprocessor casts its input to float32
+# anyway, see DataTransformation, so serving inputs are rounded the same way), the target as
+# int8 and categorical codes: 33 instead of 68 bytes per row (plus the small category dictionaries).
+COMPACT_DTYPES = {
+    'person_age': 'float32',
+    'person_income': 'float32',
+    'person_home_ownership': 'category',
+    'person_emp_length': 'float32',
+    'loan_intent': 'category',
+    'loan_grade': 'category',
+    'loan_amnt': 'float32',
+    'loan_int_rate': 'float32',
+    TARGET_COLUMN: 'int8',
+    'loan_percent_income': 'float32',
+    'cb_person_default_on_file': 'category',
+    'cb_person_cred_hist_length': 'float32',
+}
+
+DTYPE_PLANS = {'compact': COMPACT_DTYPES, 'wide': WIDE_DTYPES}
+DTYPE_PLAN = os.getenv("DTYPE_PLAN", "compact").strip().lower()
+if DTYPE_PLAN not in DTYPE_PLANS:
+    raise ValueError(f"Unknown DTYPE_PLAN {DTYPE_PLAN!r}, expected one of {sorted(DTYPE_PLANS)}")
+RAW_DTYPES = DTYPE_PLANS[DTYPE_PLAN]
+
+# Format of the train/test/raw artifacts exchanged between stages: 'feather' (Arrow IPC,
+# memory-mapped on read), 'parquet', or 'csv'. Columnar formats need the pyarrow package.
+DATA_ARTIFACT_FORMAT = os.getenv("DATA_ARTIFACT_FORMAT", "feather")
+
+# Serving-side applicant record: the 11 model inputs in the order used for training.
+# Numerics travel as float64 (NaN = missing) so one structured array holds a whole batch;
+# integer columns are truncated like the form path's int(float(value)).
+APPLICANT_FIELDS = (
+    'person_age', 'person_income', 'person_home_ownership',
+    'person_emp_length', 'loan_intent', 'loan_grade',
+    'loan_amnt', 'loan_int_rate', 'loan_percent_income',
+    'cb_person_default_on_file', 'cb_person_cred_hist_length',
+)
+INTEGER_FIELDS = ('person_age', 'person_income', 'loan_amnt', 'cb_person_cred_hist_length')
+APPLICANT_DTYPE = np.dtype([
+    (name, 'O' if name in NOMINAL_FEATURES else 'f8') for name in APPLICANT_FIELDS
+])
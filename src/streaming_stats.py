@@ -0,0 +1,121 @@
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantile sketch (compactor hierarchy in the style of KLL).
+
+    Level h holds items of weight 2**h. When a level exceeds `k` items it is sorted and every
+    other item (random offset) is promoted to the next level, halving the level's size while
+    keeping ranks unbiased. Memory is O(k log(n / k)); the rank error is a small fraction of a
+    percent of n for the default k, which is ample for median imputation.
+    """
+
+    def __init__(self, k: int = 2048, seed: int = 0):
+        self.k = k
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Adds the non-missing entries of `values`."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        self.count += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch"):
+        """Folds another sketch (e.g. from a parallel worker) into this one."""
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0, dtype=np.float64))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if items.size > self.k:
+                items = np.sort(items)
+                odd = items.size % 2
+                # An odd item out stays at this level, so no weight is lost
+                self.levels[h] = items[-1:] if odd else np.empty(0, dtype=np.float64)
+                promoted = items[:items.size - odd][self._rng.integers(2)::2]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile of everything added so far (NaN when empty)."""
+        values = np.concatenate(self.levels)
+        if values.size == 0:
+            return float('nan')
+        weights = np.concatenate([np.full(items.size, 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='mergesort')
+        cumulative = np.cumsum(weights[order])
+        index = int(np.searchsorted(cumulative, q * cumulative[-1], side='left'))
+        return float(values[order][min(index, values.size - 1)])
+
+
+class RunningMoments:
+    """Per-column count / mean / sum of squared deviations of non-missing values, merged chunk by chunk (Chan et al.)."""
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self.mean = np.zeros(n_columns, dtype=np.float64)
+        self.m2 = np.zeros(n_columns, dtype=np.float64)
+        self.n_missing = np.zeros(n_columns, dtype=np.int64)
+
+    def _merge(self, count, mean, m2):
+        total = self.count + count
+        safe_total = np.maximum(total, 1)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / safe_total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / safe_total
+        self.count = total
+
+    def update(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        observed = ~np.isnan(X)
+        count = observed.sum(axis=0)
+        self.n_missing += X.shape[0] - count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(X, axis=0) / np.maximum(count, 1), 0.0)
+            m2 = np.nansum((X - mean) ** 2, axis=0)
+        self._merge(count, mean, m2)
+
+    def imputed(self, fill_values) -> "RunningMoments":
+        """Moments after replacing every missing value by `fill_values` (what imputer -> scaler sees)."""
+        result = RunningMoments(self.count.shape[0])
+        result.count, result.mean, result.m2 = self.count.copy(), self.mean.copy(), self.m2.copy()
+        result._merge(self.n_missing, np.asarray(fill_values, dtype=np.float64), np.zeros_like(self.m2))
+        return result
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Population variance (ddof=0), as StandardScaler uses."""
+        return self.m2 / np.maximum(self.count, 1)
+
+
+class CategoryCounter:
+    """Exact per-column category counts (nominal columns have a handful of levels)."""
+
+    def __init__(self, columns):
+        self.counts = {col: {} for col in columns}
+
+    def update(self, frame):
+        for col, counts in self.counts.items():
+            for value, n in frame[col].value_counts(dropna=True).items():
+                if n:  # categorical columns also report their unobserved levels
+                    counts[value] = counts.get(value, 0) + int(n)
+
+    def categories(self, col) -> list:
+        return sorted(self.counts[col])
+
+    def mode(self, col):
+        """Most frequent value; ties go to the smallest value, like SimpleImputer(strategy='most_frequent')."""
+        return min(self.counts[col].items(), key=lambda item: (-item[1], item[0]))[0]
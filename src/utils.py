@@ -1,33 +1,168 @@
 import os
 import sys
+import time
+import tempfile
+import resource
+import multiprocessing
+import json
 import joblib  # CRITICAL: Replace dill with joblib for ML artifacts and compression
+import numpy as np
 import pandas as pd
+from scipy import sparse
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, confusion_matrix
+from sklearn.model_selection import train_test_split
 
 from src.exception import CustomException
 from src.logger import logging
+from src.parallelism import SAVE_PROFILE, ParallelismProfile, apply_profile, get_profile
 
 # --- File Handling Functions ---
 
-def save_object(file_path: str, obj):
-    """Saves a Python object as a .pkl file using joblib (with compression)."""
+# On-disk format of pickled artifacts:
+#   'gzip' - joblib with gzip level 3 (smallest files; every process inflates a private copy)
+#   'mmap' - uncompressed joblib; NumPy arrays inside are loaded with mmap_mode='r', so all
+#            gunicorn workers share their pages through the OS page cache
+ARTIFACT_FORMATS = ('gzip', 'mmap')
+ARTIFACT_FORMAT = os.getenv("ARTIFACT_FORMAT", "gzip")
+
+
+def is_compressed_artifact(file_path: str) -> bool:
+    """True unless the file starts like a plain pickle (protocol 2+ opcode), i.e. joblib compressed it."""
+    with open(file_path, 'rb') as f:
+        return f.read(1) != b'\x80'
+
+
+def save_object(file_path: str, obj, artifact_format: str = None):
+    """
+    Saves a Python object as a .pkl file using joblib.
+    Estimators are first set (in place) to the serving parallelism profile, the budget they are loaded with.
+    :param artifact_format: 'gzip' or 'mmap' (see ARTIFACT_FORMAT); defaults to the ARTIFACT_FORMAT env setting.
+    """
     try:
+        artifact_format = artifact_format or ARTIFACT_FORMAT
+        if artifact_format not in ARTIFACT_FORMATS:
+            raise ValueError(f"Unknown artifact format {artifact_format!r}, expected one of {ARTIFACT_FORMATS}")
+
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
         
         # Use joblib's native compression, level 3 is a good balance of speed/ratio.
-        # This replaces the old dill/open logic.
-        joblib.dump(obj, file_path, compress=('gzip', 3))
+        # This replaces the old dill/open logic. The 'mmap' format skips compression so the
+        # arrays can be memory-mapped (joblib aligns them in the file for that).
+        # Write to a temp file and rename so readers (e.g. the serving ArtifactRegistry)
+        # never observe a half-written artifact; existing maps keep the old inode alive.
+        apply_profile(obj, get_profile(SAVE_PROFILE))
+        tmp_path = f"{file_path}.tmp-{os.getpid()}"
+        compress = ('gzip', 3) if artifact_format == 'gzip' else 0
+        joblib.dump(obj, tmp_path, compress=compress)
+        os.replace(tmp_path, file_path)
 
     except Exception as e:
         raise CustomException(e, sys)
 
 
 def load_object(file_path: str):
-    """Loads a Python object from a .pkl file using joblib."""
+    """
+    Loads a Python object from a .pkl file using joblib (memory-mapping arrays of uncompressed files).
+    Estimators get the parallelism profile of the loading process (see src.parallelism.configure_process).
+    """
+    try:
+        # joblib automatically handles reading compressed files; mmap_mode only applies to
+        # uncompressed ones (joblib warns and ignores it otherwise)
+        if is_compressed_artifact(file_path):
+            obj = joblib.load(file_path)
+        else:
+            obj = joblib.load(file_path, mmap_mode='r')
+        return apply_profile(obj)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def save_json(file_path: str, obj: dict):
+    """Saves a small JSON artifact (e.g. threshold.json) atomically next to the pickles."""
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+        tmp_path = f"{file_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(obj, f, indent=2)
+        os.replace(tmp_path, file_path)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_json(file_path: str) -> dict:
+    """Loads a JSON artifact."""
     try:
-        # joblib automatically handles reading compressed files
-        return joblib.load(file_path)
+        with open(file_path) as f:
+            return json.load(f)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+# --- Tabular Data Artifacts (stage-to-stage exchange) ---
+
+def _columnar_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def data_artifact_path(directory: str, name: str, file_format: str) -> str:
+    """Builds e.g. artifacts/train.feather; falls back to CSV when pyarrow is not installed."""
+    if file_format != 'csv' and not _columnar_available():
+        logging.warning(f"pyarrow is not installed; writing {name} as CSV instead of {file_format}.")
+        file_format = 'csv'
+    return os.path.join(directory, f"{name}.{file_format}")
+
+
+def save_frame(df: pd.DataFrame, file_path: str):
+    """Saves a DataFrame as Feather (uncompressed Arrow IPC), Parquet or CSV based on the extension."""
+    try:
+        dir_path = os.path.dirname(file_path)
+        os.makedirs(dir_path, exist_ok=True)
+
+        tmp_path = f"{file_path}.tmp-{os.getpid()}"
+        if file_path.endswith(('.feather', '.arrow')):
+            import pyarrow.feather as feather
+            # Uncompressed so the reader can memory-map it instead of decoding
+            feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+        elif file_path.endswith('.parquet'):
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_csv(tmp_path, index=False, header=True)
+        os.replace(tmp_path, file_path)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_frame(file_path: str, dtypes: dict = None, columns: list = None) -> pd.DataFrame:
+    """
+    Loads a DataFrame written by save_frame. Feather files are memory-mapped and converted
+    without copying numeric columns where Arrow allows it; CSV is parsed with `dtypes`.
+    """
+    try:
+        if file_path.endswith(('.feather', '.arrow')):
+            import pyarrow.feather as feather
+            table = feather.read_table(file_path, columns=columns, memory_map=True)
+            df = table.to_pandas(split_blocks=True)
+        elif file_path.endswith('.parquet'):
+            df = pd.read_parquet(file_path, columns=columns)
+        else:
+            df = pd.read_csv(file_path, usecols=columns, dtype=dtypes)
+
+        if dtypes:
+            # Enforce the declared schema (no-op for columnar files written from the same schema)
+            df = df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns and str(df[col].dtype) != str(dtype)})
+        return df
 
     except Exception as e:
         raise CustomException(e, sys)
@@ -35,38 +170,223 @@ def load_object(file_path: str):
 
 # --- Financial Evaluation Function ---
 
-def evaluate_models(X_train, y_train, X_test, y_test, models: dict):
+# Misclassification cost weights: a missed default (FN) costs 5x a wrongly rejected good loan (FP)
+FN_COST = 5
+FP_COST = 1
+
+
+def misclassification_cost(y_true, y_pred) -> int:
+    """Total Misclassification Cost = (5 * FN) + (1 * FP)."""
+    TN, FP, FN, TP = confusion_matrix(y_true, y_pred, labels=[0, 1]).ravel()
+    return int(FN_COST * FN + FP_COST * FP)
+
+
+def find_cost_optimal_threshold(y_true, scores):
+    """
+    Finds the PD threshold minimising (5 * FN) + (1 * FP) for the rule `score >= threshold -> default`.
+
+    Scores are sorted once; cumulative sums give TP/FP for every cut between distinct scores,
+    so all candidate thresholds are costed in O(n log n) instead of one confusion matrix each.
+    :return: Tuple of (threshold, total cost at that threshold).
+    """
+    y_true = np.asarray(y_true).astype(np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    if scores.size == 0:
+        return 0.5, 0
+
+    order = np.argsort(-scores, kind='mergesort')
+    sorted_scores = scores[order]
+    sorted_y = y_true[order]
+
+    # Predicting the top-k scores as defaults: TP(k), FP(k) for k = 0..n
+    tp = np.concatenate([[0], np.cumsum(sorted_y)])
+    fp = np.concatenate([[0], np.cumsum(1 - sorted_y)])
+    fn = tp[-1] - tp
+    cost = FN_COST * fn + FP_COST * fp
+
+    # Only cuts between distinct scores are realisable thresholds
+    valid = np.ones(cost.shape[0], dtype=bool)
+    valid[1:-1] = sorted_scores[:-1] != sorted_scores[1:]
+    k = int(np.flatnonzero(valid)[np.argmin(cost[valid])])
+
+    if k == 0:
+        threshold = float(np.nextafter(sorted_scores[0], np.inf))  # nobody is flagged
+    elif k == scores.size:
+        threshold = 0.0  # everybody is flagged
+    else:
+        # Midpoint between the last flagged and the first unflagged score
+        threshold = float((sorted_scores[k - 1] + sorted_scores[k]) / 2)
+    return threshold, int(cost[k])
+
+
+def reset_peak_memory() -> bool:
+    """
+    Resets the process's peak resident set size (VmHWM) so that peak_memory_mb covers only what follows.
+    :return: False where /proc/self/clear_refs is unavailable (non-Linux): the peak is then process-wide.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_memory_mb() -> float:
+    """Peak resident set size in MB since the last reset_peak_memory (VmHWM), else since process start (ru_maxrss, KB on Linux)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# scikit-learn's sparse tree splitter is several times slower than the dense one on this mostly
+# numeric data, so single trees and forests get a float32 dense view (the dtype trees use
+# internally anyway) as long as it stays below this size; larger matrices are fitted sparse.
+DENSE_TREE_MAX_MB = float(os.getenv("DENSE_TREE_MAX_MB", "512"))
+
+
+# Share of the training rows held out (stratified) to choose each model's cost-optimal PD
+# threshold, so the test split only ever measures the cost of an already fixed decision rule.
+THRESHOLD_VALIDATION_FRACTION = float(os.getenv("THRESHOLD_VALIDATION_FRACTION", "0.2"))
+
+
+def threshold_validation_split(y, fraction: float = None, random_state: int = 42):
+    """
+    Stratified (fit, validation) row indices of the training split for threshold selection.
+    :return: Tuple of sorted index arrays (sorted so CSR/memory-mapped row slices stay sequential).
+    """
+    fraction = THRESHOLD_VALIDATION_FRACTION if fraction is None else fraction
+    rows = np.arange(len(y))
+    fit_idx, val_idx = train_test_split(rows, test_size=fraction, random_state=random_state, stratify=np.asarray(y))
+    return np.sort(fit_idx), np.sort(val_idx)
+
+
+def densify_for_model(model, X):
+    """Returns X as dense float32 for sklearn trees/forests when it is small enough, else X unchanged."""
+    if not sparse.issparse(X) or not isinstance(model, (DecisionTreeClassifier, RandomForestClassifier)):
+        return X
+    if X.shape[0] * X.shape[1] * 4 > DENSE_TREE_MAX_MB * 1024 * 1024:
+        return X
+    return X.astype(np.float32, copy=False).toarray()
+
+
+def _fit_and_evaluate(model, X_train, y_train, X_test, y_test):
+    """
+    Fits one model and scores it with the Total Misclassification Cost (5:1 penalty) on the test
+    split, at the cost-optimal decision threshold chosen on a validation share of the training rows.
+    The returned model is not refitted on the validation rows: a refit would shift the PD scores
+    that the threshold was chosen on, so the saved threshold would no longer match the served model.
+    """
+    start = time.perf_counter()
+    reset_peak_memory()
+    y_train = np.asarray(y_train)
+    fit_idx, val_idx = threshold_validation_split(y_train)
+    X_fit, X_val = densify_for_model(model, X_train[fit_idx]), densify_for_model(model, X_train[val_idx])
+    X_test = densify_for_model(model, X_test)
+
+    # Train model (on the training rows outside the threshold validation share)
+    model.fit(X_fit, y_train[fit_idx])
+
+    # Pick the cost-optimal cut-off on the validation rows, then cost that fixed rule on the test split
+    threshold, validation_cost = find_cost_optimal_threshold(y_train[val_idx], model.predict_proba(X_val)[:, 1])
+    y_test_proba = model.predict_proba(X_test)[:, 1].astype(np.float64)  # compared in float64, as served
+    y_test_pred = (y_test_proba >= threshold).astype(int)
+    
+    # Calculate Confusion Matrix: [[TN, FP], [FN, TP]]
+    cm = confusion_matrix(y_test, y_test_pred, labels=[0, 1])
+    TN, FP, FN, TP = cm.ravel()
+    
+    # Total Misclassification Cost = (Cost of FN * FN) + (Cost of FP * FP)
+    # Cost = (5 * FN) + (1 * FP)
+    TOTAL_MISCLASSIFICATION_COST = (FN_COST * FN) + (FP_COST * FP)
+    
+    test_model_accuracy = accuracy_score(y_test, y_test_pred)
+    
+    return model, {
+        'Accuracy': test_model_accuracy,
+        'Total Cost': int(TOTAL_MISCLASSIFICATION_COST),
+        'Confusion Matrix': cm.tolist(),
+        'Threshold': threshold,
+        'Validation Cost': int(validation_cost),
+        # Cost of the implicit 0.5 cut-off (model.predict), for comparison
+        'Default Threshold Cost': misclassification_cost(y_test, model.predict(X_test)),
+        'Wall Time (s)': round(time.perf_counter() - start, 3),
+        'Peak Memory (MB)': round(peak_memory_mb(), 1),
+    }
+
+
+def limit_model_threads(model, n_threads: int):
+    """Caps the model's own thread pools (sklearn n_jobs / XGBoost threads) to n_threads; BLAS is capped separately."""
+    apply_profile(model, ParallelismProfile(name="limit", n_jobs=n_threads, model_threads=n_threads,
+                                            blas_threads=n_threads))
+
+
+def _evaluate_model_worker(task):
+    """Process-pool worker: fits one candidate on the memory-mapped train/test arrays."""
+    model_name, model, data_path, n_threads = task
+    from threadpoolctl import threadpool_limits
+
+    limit_model_threads(model, n_threads)
+    # mmap_mode='r': every worker reads the same pages from the OS page cache instead of a private copy
+    data = joblib.load(data_path, mmap_mode='r')
+    with threadpool_limits(limits=n_threads):
+        model, metrics = _fit_and_evaluate(
+            model, data['X_train'], data['y_train'], data['X_test'], data['y_test']
+        )
+    return model_name, model, metrics
+
+
+def evaluate_models(X_train, y_train, X_test, y_test, models: dict, n_jobs: int = 1, cpus_per_model: int = 1):
     """
     Trains models and evaluates based on the Total Misclassification Cost (5:1 penalty).
     Returns a report keyed by model name.
+
+    With n_jobs == 1 the candidates are fitted one after another in this process, each with the
+    training profile's thread budget (TRAINING_N_JOBS/TRAINING_MODEL_THREADS). With n_jobs > 1 they
+    are fitted concurrently in a process pool (one fresh process per model) on train/test arrays
+    dumped once to a memory-mapped file; each model is limited to `cpus_per_model` threads. The
+    fitted estimators replace the entries of `models` so callers can save the winner as before.
+    'Peak Memory (MB)' is the peak RSS during each model's fit and evaluation (reset_peak_memory);
+    where the peak cannot be reset, serial runs report the cumulative process peak.
     """
     try:
         report = {}
-        for model_name, model in models.items():
-            
-            # Train model
-            model.fit(X_train, y_train)
-
-            # Predict on test data
-            y_test_pred = model.predict(X_test)
-            
-            # Calculate Confusion Matrix: [[TN, FP], [FN, TP]]
-            cm = confusion_matrix(y_test, y_test_pred)
-            TN, FP, FN, TP = cm.ravel()
-            
-            # Total Misclassification Cost = (Cost of FN * FN) + (Cost of FP * FP)
-            # Cost = (5 * FN) + (1 * FP)
-            TOTAL_MISCLASSIFICATION_COST = (5 * FN) + (1 * FP)
-            
-            test_model_accuracy = accuracy_score(y_test, y_test_pred)
-            
-            report[model_name] = {
-                'Accuracy': test_model_accuracy,
-                'Total Cost': TOTAL_MISCLASSIFICATION_COST,
-                'Confusion Matrix': cm.tolist()
-            }
-
-        return report
+        if n_jobs == 1:
+            if not reset_peak_memory():
+                logging.warning("Peak RSS cannot be reset here: serial 'Peak Memory (MB)' is cumulative over the models.")
+            profile = get_profile('training')
+            for model_name, model in models.items():
+                apply_profile(model, profile)
+                models[model_name], report[model_name] = _fit_and_evaluate(
+                    model, X_train, y_train, X_test, y_test
+                )
+            return report
+
+        with tempfile.TemporaryDirectory(prefix='evaluate_models_') as tmp_dir:
+            data_path = os.path.join(tmp_dir, 'train_test.joblib')
+            joblib.dump(
+                {'X_train': X_train, 'y_train': y_train, 'X_test': X_test, 'y_test': y_test},
+                data_path,
+            )
+            tasks = [(name, model, data_path, cpus_per_model) for name, model in models.items()]
+            logging.info(f"Evaluating {len(tasks)} models on {n_jobs} processes ({cpus_per_model} CPU(s) each).")
+
+            # maxtasksperchild=1: a fresh worker per model keeps the peak-memory numbers separate
+            # spawn: forking a parent that already initialised OpenMP/BLAS thread pools can deadlock
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(processes=min(n_jobs, len(tasks)), maxtasksperchild=1) as pool:
+                for model_name, model, metrics in pool.imap_unordered(_evaluate_model_worker, tasks):
+                    models[model_name] = model
+                    report[model_name] = metrics
+                    logging.info(f"Model {model_name} evaluated in {metrics['Wall Time (s)']}s")
+
+        # Keep the report in the same order as the models dict
+        return {model_name: report[model_name] for model_name in models}
 
     except Exception as e:
         raise CustomException(e, sys)
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from xgboost import XGBClassifier
+
+from src.schema import RAW_DTYPES, TARGET_COLUMN
+from src.utils import save_object, save_json, find_cost_optimal_threshold
+from src.components.data_transformation import DataTransformation
+from src.components.model_compiler import CompiledScorer, ModelCompiler, stamp_source_digests
+from src.components.reason_codes import ReasonCodeBuilder
+from src.pipeline.artifact_registry import ArtifactRegistry, ArtifactRegistryConfig
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.pipeline.stage_cache import source_digests
+
+DATA_PATH = "data/credit_risk_data.csv"
+
+
+@pytest.fixture
+def serving_pipeline(tmp_path):
+    """
+    PredictPipeline over a small XGBoost model saved in tmp_path (with threshold.json, a compiled
+    scorer and a reason-code explainer stamped with their source digests), plus the raw sample frame
+    and its transformed matrix.
+    """
+    data = pd.read_csv(DATA_PATH, dtype=RAW_DTYPES).sample(n=2000, random_state=0)
+    preprocessor = DataTransformation().get_data_transformer_object()
+    X = preprocessor.fit_transform(data)
+    model = XGBClassifier(n_estimators=10, random_state=42).fit(X, data[TARGET_COLUMN])
+
+    pipeline = PredictPipeline()
+    pipeline.model_path = str(tmp_path / "model.pkl")
+    pipeline.preprocessor_path = str(tmp_path / "preprocessor.pkl")
+    pipeline.threshold_path = str(tmp_path / "threshold.json")
+    pipeline.compiled_scorer_path = str(tmp_path / "compiled_scorer.npz")
+    pipeline.reason_code_config.explainer_file_path = str(tmp_path / "reason_codes.pkl")
+    pipeline.registry = ArtifactRegistry(ArtifactRegistryConfig(check_interval=0.0, settle_seconds=0.0))
+    save_object(pipeline.model_path, model)
+    save_object(pipeline.preprocessor_path, preprocessor)
+    threshold, _ = find_cost_optimal_threshold(data[TARGET_COLUMN], model.predict_proba(X)[:, 1])
+    save_json(pipeline.threshold_path, {'model': 'XGBoost', 'threshold': threshold})
+    arrays = ModelCompiler().compile(preprocessor, model)
+    digests = source_digests(pipeline.model_path, pipeline.preprocessor_path)
+    arrays['meta'] = stamp_source_digests(arrays['meta'], digests)
+    CompiledScorer.save(pipeline.compiled_scorer_path, arrays)
+    explainer = ReasonCodeBuilder().build(preprocessor, model, X[:500])
+    explainer.source_digests = digests
+    save_object(pipeline.reason_code_config.explainer_file_path, explainer)
+    return pipeline, data, X
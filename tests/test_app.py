@@ -0,0 +1,145 @@
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as serving
+from src.exception import CustomException
+from src.schema import APPLICANT_FIELDS
+
+
+@pytest.fixture
+def client(serving_pipeline, monkeypatch):
+    """Flask test client whose module-level PredictPipeline serves the tmp_path artifacts."""
+    pipeline, data, _ = serving_pipeline
+    monkeypatch.setattr(serving, 'predict_pipeline', pipeline)
+    return serving.app.test_client(), pipeline, data[list(APPLICANT_FIELDS)].head(5).reset_index(drop=True)
+
+
+def _records(frame):
+    return frame.astype(object).where(frame.notna(), None).to_dict(orient='records')
+
+
+def test_batch_json_array_scores_every_row(client):
+    test_client, pipeline, rows = client
+    response = test_client.post('/predict/batch', json=_records(rows))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['n_rows'], body['n_scored'], body['n_failed']) == (5, 5, 0)
+    _, expected = pipeline.predict_with_scores(pipeline.validate_batch(rows)[0])
+    np.testing.assert_allclose([row['pd'] for row in body['results']], expected, atol=1e-6)
+    assert [row['row'] for row in body['results']] == list(range(5))
+
+
+def test_batch_applications_wrapper_and_reasons(client):
+    test_client, _, rows = client
+    response = test_client.post('/predict/batch?reasons=2', json={'applications': _records(rows)})
+    assert response.status_code == 200
+    for row in response.get_json()['results']:
+        assert len(row['reasons']) <= 2
+        assert all(reason['contribution'] > 0 for reason in row['reasons'])
+
+
+def test_batch_mixed_rows_report_per_row_errors(client):
+    test_client, _, rows = client
+    records = _records(rows)
+    records[1]['person_income'] = 'not-a-number'
+    records[3]['loan_intent'] = ''
+    body = test_client.post('/predict/batch', json=records).get_json()
+    assert (body['n_rows'], body['n_scored'], body['n_failed']) == (5, 3, 2)
+    assert body['results'][1] == {'row': 1, 'errors': ["Invalid or missing required numeric input: person_income"]}
+    assert body['results'][3] == {'row': 3, 'errors': ["Invalid or missing required categorical input: loan_intent"]}
+    assert all('prediction' in body['results'][i] for i in (0, 2, 4))
+
+
+def test_batch_rejects_boolean_numeric_fields(client):
+    test_client, _, rows = client
+    records = _records(rows)
+    records[0]['loan_int_rate'] = True
+    records[2]['person_age'] = False
+    body = test_client.post('/predict/batch', json=records).get_json()
+    assert (body['n_rows'], body['n_scored'], body['n_failed']) == (5, 3, 2)
+    assert body['results'][0] == {'row': 0, 'errors': ["Invalid or missing required numeric input: loan_int_rate"]}
+    assert body['results'][2] == {'row': 2, 'errors': ["Invalid or missing required numeric input: person_age"]}
+
+
+def test_monitoring_failure_does_not_fail_a_scored_batch(client, monkeypatch):
+    test_client, _, rows = client
+
+    def broken(*args):
+        raise IndexError("drift histogram replaced")
+
+    monkeypatch.setattr(serving.drift_monitor, 'observe_frame', broken)
+    monkeypatch.setattr(serving.shadow_scorer, 'submit', broken)
+    response = test_client.post('/predict/batch', json=_records(rows))
+    assert response.status_code == 200
+    assert response.get_json()['n_scored'] == 5
+
+
+def test_batch_empty_array_is_ok(client):
+    test_client, _, _ = client
+    response = test_client.post('/predict/batch', json=[])
+    assert response.status_code == 200
+    assert response.get_json() == {'n_rows': 0, 'n_scored': 0, 'n_failed': 0, 'results': []}
+
+
+def test_batch_missing_columns_is_400(client):
+    test_client, _, rows = client
+    response = test_client.post('/predict/batch', json=_records(rows.drop(columns=['loan_amnt', 'loan_grade'])))
+    assert response.status_code == 400
+    assert response.get_json() == {'error': "Batch is missing required columns: ['loan_grade', 'loan_amnt']"}
+
+
+@pytest.mark.parametrize("payload", [{'applications': 'x'}, 42, ['not-an-object']])
+def test_batch_malformed_json_is_400(client, payload):
+    test_client, _, _ = client
+    response = test_client.post('/predict/batch', json=payload)
+    assert response.status_code == 400
+
+
+def test_batch_csv_upload_and_csv_body(client):
+    test_client, _, rows = client
+    rows = rows.astype(str)
+    rows.loc[2, 'person_age'] = 'abc'
+    csv = rows.to_csv(index=False).encode()
+    upload = test_client.post('/predict/batch', data={'file': (io.BytesIO(csv), 'loans.csv')},
+                              content_type='multipart/form-data')
+    body = test_client.post('/predict/batch', data=csv, content_type='text/csv')
+    assert upload.status_code == body.status_code == 200
+    assert upload.get_json() == body.get_json()
+    assert upload.get_json()['results'][2] == {'row': 2, 'errors': ["Invalid or missing required numeric input: person_age"]}
+    assert upload.get_json()['n_scored'] == 4
+
+
+@pytest.mark.parametrize("wrap", [True, False])
+def test_batch_failure_body_does_not_leak(client, monkeypatch, wrap):
+    test_client, pipeline, rows = client
+
+    def crash(features):
+        try:
+            raise RuntimeError("secret detail")
+        except RuntimeError as e:
+            # CustomException text carries the script path and line number
+            raise CustomException(e, sys) if wrap else e
+
+    monkeypatch.setattr(pipeline, 'predict_with_scores', crash)
+    response = test_client.post('/predict/batch', json=_records(rows))
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'Batch prediction failed.'}
+    assert b"secret detail" not in response.data
+
+
+def test_validate_batch_allow_missing_keeps_blanks_for_imputers(serving_pipeline):
+    pipeline, data, _ = serving_pipeline
+    rows = data[list(APPLICANT_FIELDS)].head(3).astype(str).reset_index(drop=True)
+    rows.loc[0, 'person_emp_length'] = ''
+    rows.loc[1, 'person_emp_length'] = 'n/a'
+
+    _, strict_mask, _ = pipeline.validate_batch(rows)
+    clean, mask, errors = pipeline.validate_batch(rows, allow_missing=True)
+    assert strict_mask.tolist() == [False, False, True]
+    assert mask.tolist() == [True, False, True]
+    assert pd.isna(clean.loc[0, 'person_emp_length'])
+    assert errors[1] == ["Invalid or missing required numeric input: person_emp_length"]
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+
+from src.utils import save_object, save_json, load_json
+from src.pipeline.artifact_registry import ArtifactRegistry, ArtifactRegistryConfig
+
+
+def _bundle_files(tmp_path):
+    return {name: str(tmp_path / file_name) for name, file_name in
+            (('model', "model.pkl"), ('preprocessor', "preprocessor.pkl"), ('threshold', "threshold.json"))}
+
+
+def _write_version(files, version, gap=0.0):
+    # Same order as IncrementalTrainer: preprocessor first, then model, then threshold
+    save_object(files['preprocessor'], {'version': version})
+    time.sleep(gap)
+    save_object(files['model'], {'version': version})
+    save_json(files['threshold'], {'threshold': version})
+
+
+def _get(registry, files):
+    return registry.get_bundle(files, loaders={'threshold': load_json}, optional=('threshold',))
+
+
+def test_get_reloads_a_changed_file(tmp_path):
+    registry = ArtifactRegistry(ArtifactRegistryConfig(check_interval=0.0))
+    path = str(tmp_path / "model.pkl")
+    save_object(path, {'version': 1})
+    assert registry.get(path) == {'version': 1}
+    save_object(path, {'version': 2})
+    os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))  # a distinct mtime
+    assert registry.get(path) == {'version': 2}
+    assert registry.stats()['artifacts'][os.path.abspath(path)]['loads'] == 2
+
+
+def test_bundle_members_swap_together_while_files_are_rewritten(tmp_path):
+    files = _bundle_files(tmp_path)
+    _write_version(files, 0)
+    registry = ArtifactRegistry(ArtifactRegistryConfig(check_interval=0.0, settle_seconds=0.05))
+    seen, mismatches, done = set(), [], threading.Event()
+
+    def reader():
+        while not done.is_set():
+            bundle = _get(registry, files)
+            versions = (bundle.get('model')['version'], bundle.get('preprocessor')['version'],
+                        bundle.get('threshold')['threshold'])
+            seen.add(versions[0])
+            if len(set(versions)) != 1:
+                mismatches.append(versions)
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for version in range(1, 6):
+        _write_version(files, version, gap=0.01)
+        time.sleep(0.15)
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    assert mismatches == []
+    assert len(seen) > 2 and max(seen) == 5
+
+
+def test_bundle_waits_for_files_to_settle(tmp_path):
+    files = _bundle_files(tmp_path)
+    _write_version(files, 0)
+    for path in files.values():
+        os.utime(path, ns=(time.time_ns() - 120 * 10**9,) * 2)  # written two minutes ago
+    registry = ArtifactRegistry(ArtifactRegistryConfig(check_interval=0.0, settle_seconds=60.0))
+    assert _get(registry, files).get('model') == {'version': 0}
+    save_object(files['preprocessor'], {'version': 1})  # model.pkl not replaced yet
+    bundle = _get(registry, files)
+    assert (bundle.get('model'), bundle.get('preprocessor')) == ({'version': 0}, {'version': 0})
+
+
+def test_bundle_keeps_last_good_version_and_optional_member(tmp_path):
+    files = _bundle_files(tmp_path)
+    save_object(files['preprocessor'], {'version': 0})
+    save_object(files['model'], {'version': 0})
+    registry = ArtifactRegistry(ArtifactRegistryConfig(check_interval=0.0, settle_seconds=0.0))
+    first = _get(registry, files)
+    assert first.get('threshold') is None
+
+    with open(files['model'], 'wb') as f:
+        f.write(b"not a pickle")
+    assert _get(registry, files) is first
+    assert registry.stats()['bundles']['model+preprocessor+threshold']['failed_reloads'] == 1
+
+    _write_version(files, 1)
+    bundle = _get(registry, files)
+    assert (bundle.get('model'), bundle.get('threshold')) == ({'version': 1}, {'threshold': 1})
+    # Unchanged members are reused rather than reloaded
+    assert len(bundle.version.split('/')) == 3
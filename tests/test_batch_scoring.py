@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.schema import APPLICANT_FIELDS
+from src.pipeline.batch_scoring import BatchScoringConfig, score_file
+
+
+@pytest.fixture
+def loan_book(serving_pipeline, tmp_path, monkeypatch):
+    """30-row CSV whose person_emp_length is integer text in the first chunk, then fractional and blank."""
+    pipeline, data, _ = serving_pipeline
+    # Batch-scoring workers build a default PredictPipeline: give them artifacts/ in the working directory
+    os.makedirs(tmp_path / "artifacts")
+    for path in (pipeline.model_path, pipeline.preprocessor_path, pipeline.threshold_path):
+        shutil.copy(path, tmp_path / "artifacts" / os.path.basename(path))
+    monkeypatch.chdir(tmp_path)
+
+    rows = data[list(APPLICANT_FIELDS)].head(30).reset_index(drop=True).astype(object)
+    emp_length = rows['person_emp_length'].fillna(1).round().astype(int).astype(object)
+    emp_length[15], emp_length[25] = 2.5, None
+    rows['person_emp_length'] = emp_length
+    rows.loc[22, 'loan_amnt'] = 'unknown'
+    path = str(tmp_path / "book.csv")
+    rows.to_csv(path, index=False)
+    return pipeline, path
+
+
+@pytest.mark.parametrize("output_name", ["scored.parquet", "scored.csv"])
+def test_score_file_keeps_one_schema_across_chunks(loan_book, tmp_path, output_name):
+    pipeline, input_path = loan_book
+    output_path = str(tmp_path / output_name)
+    summary = score_file(input_path, output_path, BatchScoringConfig(chunk_size=10, n_workers=1))
+    assert (summary['rows'], summary['failed_rows']) == (30, 1)
+
+    scored = pd.read_parquet(output_path) if output_name.endswith('.parquet') else pd.read_csv(output_path)
+    assert len(scored) == 30
+    assert scored.loc[22, 'error'] == "Invalid or missing required numeric input: loan_amnt"
+    assert pd.isna(scored.loc[22, 'pd'])
+
+    raw = pd.read_csv(input_path, dtype=str)
+    clean, valid_mask, _ = pipeline.validate_batch(raw, allow_missing=True)
+    preds, pd_scores = pipeline.predict_with_scores(clean[valid_mask])
+    np.testing.assert_allclose(scored['pd'][valid_mask].to_numpy(), pd_scores)
+    assert scored['prediction'][valid_mask].astype(int).tolist() == preds.tolist()
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from xgboost import XGBClassifier
+
+from compress_artifacts import compress_artifacts, convert_artifacts, COMPILED_SCORER_FILES
+from src.schema import RAW_DTYPES, TARGET_COLUMN
+from src.utils import save_object, load_object, is_compressed_artifact
+from src.components.data_transformation import DataTransformation
+from src.components.model_compiler import CompiledScorer, ModelCompiler, stamp_source_digests
+from src.pipeline.stage_cache import source_digests
+
+DATA_PATH = "data/credit_risk_data.csv"
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    """Gzip model, preprocessor and compiled scorer of a small XGBoost fit, plus rows to score."""
+    data = pd.read_csv(DATA_PATH, dtype=RAW_DTYPES).sample(n=3000, random_state=0)
+    features = data.drop(columns=[TARGET_COLUMN])
+    preprocessor = DataTransformation().get_data_transformer_object()
+    model = XGBClassifier(n_estimators=20, random_state=42).fit(preprocessor.fit_transform(data), data[TARGET_COLUMN])
+
+    paths = {'model': str(tmp_path / "model.pkl"), 'preprocessor': str(tmp_path / "preprocessor.pkl")}
+    save_object(paths['model'], model, artifact_format='gzip')
+    save_object(paths['preprocessor'], preprocessor, artifact_format='gzip')
+    arrays = ModelCompiler().compile(preprocessor, model)
+    arrays['meta'] = stamp_source_digests(arrays['meta'], source_digests(paths['model'], paths['preprocessor']))
+    CompiledScorer.save(str(tmp_path / COMPILED_SCORER_FILES['gzip']), arrays)
+    expected = model.predict_proba(preprocessor.transform(features))[:, 1]
+    return paths, features, expected
+
+
+def _scores(paths, features):
+    model, preprocessor = load_object(paths['model']), load_object(paths['preprocessor'])
+    return model.predict_proba(preprocessor.transform(features))[:, 1]
+
+
+def test_mmap_then_compress_round_trip(artifacts):
+    paths, features, expected = artifacts
+    convert_artifacts('mmap', paths['model'], paths['preprocessor'])
+    assert not is_compressed_artifact(paths['model'])
+
+    # Keep the memory-mapped objects alive while compress rewrites their files
+    mapped_model, mapped_preprocessor = load_object(paths['model']), load_object(paths['preprocessor'])
+    compress_artifacts(paths['model'], paths['preprocessor'])
+
+    assert is_compressed_artifact(paths['model']) and is_compressed_artifact(paths['preprocessor'])
+    np.testing.assert_array_equal(_scores(paths, features), expected)
+    np.testing.assert_array_equal(mapped_model.predict_proba(mapped_preprocessor.transform(features))[:, 1], expected)
+
+    artifacts_dir = os.path.dirname(paths['model'])
+    scorer = CompiledScorer.load(os.path.join(artifacts_dir, COMPILED_SCORER_FILES['gzip']))
+    np.testing.assert_array_equal(scorer.predict_proba(features), expected.astype(np.float64))
+    # Still recognised as built from the (rewritten) model and preprocessor
+    assert scorer.source_digests == source_digests(paths['model'], paths['preprocessor'])
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from src.utils import find_cost_optimal_threshold, misclassification_cost, FN_COST, FP_COST
+
+
+def _brute_force_cost(y, scores, threshold) -> int:
+    """Confusion-matrix cost of the served rule `score >= threshold -> default`."""
+    return misclassification_cost(y, (scores >= threshold).astype(int))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_threshold_matches_brute_force_on_tied_scores(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 60))
+    y = (rng.random(n) < rng.uniform(0.05, 0.6)).astype(int)
+    # Few distinct values so that ties are common
+    scores = rng.integers(0, int(rng.integers(1, 12)), n) / 10.0
+
+    threshold, cost = find_cost_optimal_threshold(y, scores)
+
+    # Every realisable rule: flag nobody, or flag all scores >= each distinct value
+    candidates = [np.inf] + list(np.unique(scores))
+    best = min(_brute_force_cost(y, scores, cut) for cut in candidates)
+    assert cost == best
+    assert _brute_force_cost(y, scores, threshold) == cost
+
+
+def test_threshold_edge_cases():
+    assert find_cost_optimal_threshold([], []) == (0.5, 0)
+    # All defaults: flag everybody
+    threshold, cost = find_cost_optimal_threshold([1, 1, 1], [0.2, 0.2, 0.9])
+    assert cost == 0 and threshold <= 0.2
+    # No defaults: flag nobody, even at the top score
+    threshold, cost = find_cost_optimal_threshold([0, 0], [0.7, 0.7])
+    assert cost == 0 and threshold > 0.7
+    # A lone default among many goods costs FN_COST to miss, FP_COST per good to catch
+    y, scores = [1] + [0] * 10, [0.1] * 11
+    assert find_cost_optimal_threshold(y, scores)[1] == min(FN_COST, 10 * FP_COST)
+
+
+@pytest.mark.parametrize("y, scores", [
+    ([1], [0.3]),
+    ([0], [0.3]),
+    # One tied block with both classes: flag all of it or none of it
+    ([1, 0, 0, 0, 0, 0], [0.5] * 6),
+    ([1, 1, 0, 0, 0, 0], [0.5] * 6),
+    # Defaults ranked below goods
+    ([0, 0, 1, 1], [0.9, 0.8, 0.2, 0.1]),
+])
+def test_threshold_matches_brute_force_on_small_cases(y, scores):
+    y, scores = np.asarray(y), np.asarray(scores)
+    threshold, cost = find_cost_optimal_threshold(y, scores)
+    candidates = [np.inf] + list(np.unique(scores))
+    assert cost == min(_brute_force_cost(y, scores, cut) for cut in candidates)
+    assert _brute_force_cost(y, scores, threshold) == cost
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.schema import COMPACT_DTYPES, WIDE_DTYPES, RAW_DTYPES, TARGET_COLUMN
+from src.utils import data_artifact_path, load_frame
+from src.components.data_ingestion import DataIngestion
+from src.components.data_transformation import DataTransformation
+
+DATA_PATH = "data/credit_risk_data.csv"
+
+
+@pytest.fixture
+def csv_with_blank_integers(tmp_path):
+    """The first 200 raw rows with person_age blank in row 0 and person_income blank in row 1."""
+    with open(DATA_PATH) as f:
+        lines = [next(f) for _ in range(201)]
+    header = lines[0].strip().split(',')
+    for row, col in ((1, 'person_age'), (2, 'person_income')):
+        cells = lines[row].rstrip('\n').split(',')
+        cells[header.index(col)] = ''
+        lines[row] = ','.join(cells) + '\n'
+    path = tmp_path / "blank_integers.csv"
+    path.write_text(''.join(lines))
+    return str(path)
+
+
+@pytest.mark.parametrize("dtypes", [COMPACT_DTYPES, WIDE_DTYPES], ids=["compact", "wide"])
+def test_blank_integer_cells_read_as_missing(csv_with_blank_integers, dtypes):
+    df = pd.read_csv(csv_with_blank_integers, dtype=dtypes)
+    assert np.isnan(df.loc[0, 'person_age']) and np.isnan(df.loc[1, 'person_income'])
+
+
+def test_ingestion_keeps_blank_integer_cells_for_the_imputer(csv_with_blank_integers, tmp_path):
+    ingestion = DataIngestion()
+    config = ingestion.ingestion_config
+    config.train_data_path = data_artifact_path(str(tmp_path), "train", "csv")
+    config.test_data_path = data_artifact_path(str(tmp_path), "test", "csv")
+    config.raw_data_path = data_artifact_path(str(tmp_path), "data", "csv")
+    train_path, test_path = ingestion.initiate_data_ingestion(csv_with_blank_integers)
+
+    frames = [load_frame(path, dtypes=RAW_DTYPES) for path in (train_path, test_path)]
+    both = pd.concat(frames)
+    assert len(both) == 200
+    assert both[['person_age', 'person_income']].isna().sum().sum() == 2
+
+    preprocessor = DataTransformation().get_data_transformer_object()
+    X = preprocessor.fit_transform(both.drop(columns=[TARGET_COLUMN]))
+    dense = X.toarray() if hasattr(X, 'toarray') else X
+    assert not np.isnan(dense).any()
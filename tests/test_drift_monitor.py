@@ -0,0 +1,104 @@
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import save_json
+from src.pipeline.artifact_registry import ArtifactRegistry, ArtifactRegistryConfig
+from src.components.drift_monitor import (DriftMonitor, DriftMonitorConfig, SCORE_KEY, _numeric_spec,
+                                          _categorical_spec, population_stability_index, binned_ks)
+
+GRADES = ['A', 'B', 'C']
+
+
+def _save_reference(path, rng, n_bins=10):
+    ages = rng.normal(35, 8, 5000)
+    scores = rng.beta(2, 8, 5000)
+    save_json(path, {'features': {
+        'person_age': _numeric_spec(ages, n_bins),
+        'loan_grade': _categorical_spec(pd.Series(rng.choice(GRADES, 5000)), GRADES),
+        SCORE_KEY: _numeric_spec(scores, n_bins),
+    }})
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    path = str(tmp_path / "drift_reference.json")
+    _save_reference(path, np.random.default_rng(0))
+    config = DriftMonitorConfig(reference_file_path=path, enabled=True, window_seconds=60, n_slots=6, min_rows=100)
+    registry = ArtifactRegistry(ArtifactRegistryConfig(check_interval=0.0))
+    return DriftMonitor(config, registry=registry), path
+
+
+def _frame(rng, n, age_mean=35):
+    return pd.DataFrame({'person_age': rng.normal(age_mean, 8, n), 'loan_grade': rng.choice(GRADES, n)})
+
+
+def test_psi_and_ks_of_binned_shares():
+    expected = [0.25, 0.25, 0.25, 0.25, 0.0]  # last bin = missing, left out of both
+    assert population_stability_index(expected, expected) == 0.0
+    assert binned_ks(expected, expected) == 0.0
+    actual = [0.1, 0.2, 0.3, 0.4, 0.5]
+    shares = np.array([0.1, 0.2, 0.3, 0.4])
+    assert population_stability_index(expected, actual) == pytest.approx(np.sum((shares - 0.25) * np.log(shares / 0.25)))
+    assert binned_ks(expected, actual) == pytest.approx(0.2)
+
+
+def test_shifted_feature_is_flagged_only_with_enough_rows(monitor):
+    drift_monitor, _ = monitor
+    rng = np.random.default_rng(1)
+    few = _frame(rng, 50, age_mean=50)
+    drift_monitor.observe_frame(few, rng.beta(2, 8, 50), now=0)
+    report = drift_monitor.report(now=0)
+    assert report['rows'] == 50 and report['features']['person_age']['psi'] is None and report['drifted'] == []
+
+    many = _frame(rng, 2000, age_mean=50)
+    drift_monitor.observe_frame(many, rng.beta(2, 8, 2000), now=0)
+    report = drift_monitor.report(now=0)
+    assert report['drifted'] == ['person_age']
+    assert report['features']['loan_grade']['psi'] < 0.05
+
+
+def test_old_slots_rotate_out_of_the_window(monitor):
+    drift_monitor, _ = monitor
+    rng = np.random.default_rng(2)
+    for t in (0, 15, 35):
+        drift_monitor.observe_frame(_frame(rng, 200), rng.beta(2, 8, 200), now=t)
+    assert drift_monitor.report(now=35)['rows'] == 600
+    assert drift_monitor.report(window_seconds=10, now=35)['rows'] == 200
+    # At t=65 the slot of t=0 is outside the 60 s window; writing t=60 reuses (zeroes) it
+    drift_monitor.observe({'person_age': 30, 'loan_grade': 'B'}, 0.1, now=60)
+    assert drift_monitor.report(now=65)['rows'] == 401
+
+
+def test_observe_survives_concurrent_reference_replacement(monitor):
+    drift_monitor, path = monitor
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # interleave the threads as often as possible
+    rng = np.random.default_rng(3)
+    errors, done = [], threading.Event()
+
+    def observer():
+        while not done.is_set():
+            try:
+                drift_monitor.observe({'person_age': 40, 'loan_grade': 'C'}, 0.2)
+                drift_monitor.report()
+            except Exception as e:  # pragma: no cover - the failure being tested for
+                errors.append(e)
+
+    threads = [threading.Thread(target=observer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for version in range(40):
+            # Histogram widths change between reference versions
+            _save_reference(path, rng, n_bins=2 + version % 2 * 18)
+            drift_monitor.report()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    done.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
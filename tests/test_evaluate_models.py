@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier
+
+from src.utils import evaluate_models
+
+TIMING_KEYS = ('Wall Time (s)', 'Peak Memory (MB)')
+
+
+def _models():
+    return {
+        'Logistic Regression': LogisticRegression(max_iter=500),
+        'Decision Tree': DecisionTreeClassifier(max_depth=4, random_state=0),
+        'Random Forest': RandomForestClassifier(n_estimators=20, max_depth=5, random_state=0),
+    }
+
+
+@pytest.fixture
+def train_test():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 6)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.8, size=600) > 0.8).astype(int)
+    return X[:450], y[:450], X[450:], y[450:]
+
+
+def test_parallel_evaluation_matches_serial(train_test):
+    X_train, y_train, X_test, y_test = train_test
+    serial_models, parallel_models = _models(), _models()
+    serial = evaluate_models(X_train, y_train, X_test, y_test, serial_models, n_jobs=1)
+    parallel = evaluate_models(X_train, y_train, X_test, y_test, parallel_models, n_jobs=2, cpus_per_model=1)
+
+    assert list(parallel) == list(serial) == list(_models())
+    for name in serial:
+        for key in TIMING_KEYS:
+            serial[name].pop(key)
+            parallel[name].pop(key)
+        assert parallel[name] == serial[name]
+        # The fitted estimators come back from the workers in place of the unfitted ones
+        np.testing.assert_array_equal(parallel_models[name].predict_proba(X_test),
+                                      serial_models[name].predict_proba(X_test))
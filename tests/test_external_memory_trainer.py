@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import xgboost
+from scipy import sparse
+from xgboost import XGBClassifier
+
+from src.components.data_transformation import save_transformed_chunk
+from src.exception import CustomException
+from src.components.model_trainer import (ModelTrainer, TransformedChunkIter, chunk_validation_mask,
+                                          external_memory_supported)
+
+
+def _write_parts(directory, n_parts=3, n_rows=600, n_features=12):
+    rng = np.random.default_rng(0)
+    paths, parts = [], []
+    for part in range(n_parts):
+        X = sparse.random(n_rows, n_features, density=0.4, format='csr', random_state=part, dtype=np.float32)
+        y = (rng.random(n_rows) < 0.25).astype(np.int8)
+        path = str(directory / f"part-{part:05d}.npz")
+        save_transformed_chunk(path, X, y)
+        paths.append(path)
+        parts.append((X, y))
+    return paths, parts
+
+
+@pytest.mark.skipif(not external_memory_supported(), reason="needs xgboost>=3.0 ExtMemQuantileDMatrix")
+def test_external_memory_fit_matches_in_memory_fit(tmp_path):
+    paths, parts = _write_parts(tmp_path)
+    fit_rows = TransformedChunkIter(paths, str(tmp_path / "cache"),
+                                    row_mask=lambda part, n_rows: ~chunk_validation_mask(part, n_rows))
+    booster = xgboost.train({'objective': 'binary:logistic', 'random_state': 42},
+                            xgboost.ExtMemQuantileDMatrix(fit_rows, max_bin=256), num_boost_round=20)
+    external = XGBClassifier()
+    external.load_model(bytearray(booster.save_raw('ubj')))
+
+    keep = [~chunk_validation_mask(part, len(y)) for part, (_, y) in enumerate(parts)]
+    X_fit = sparse.vstack([X[mask] for (X, _), mask in zip(parts, keep)], format='csr')
+    y_fit = np.concatenate([y[mask] for (_, y), mask in zip(parts, keep)])
+    in_memory = XGBClassifier(n_estimators=20, random_state=42).fit(X_fit, y_fit)
+
+    X_all = sparse.vstack([X for X, _ in parts], format='csr')
+    assert np.array_equal(external.predict_proba(X_all), in_memory.predict_proba(X_all))
+
+
+def test_chunk_validation_mask_is_repeatable():
+    first = chunk_validation_mask(3, 10_000)
+    assert np.array_equal(first, chunk_validation_mask(3, 10_000))
+    assert not np.array_equal(first, chunk_validation_mask(4, 10_000))
+    assert 0.18 < first.mean() < 0.22
+
+
+def test_external_memory_trainer_needs_xgboost_3(monkeypatch, tmp_path):
+    monkeypatch.delattr(xgboost, 'ExtMemQuantileDMatrix', raising=False)
+    assert not external_memory_supported()
+    with pytest.raises(CustomException, match="STREAMING_TRAINER=in_memory"):
+        ModelTrainer().initiate_external_memory_trainer(str(tmp_path), str(tmp_path))
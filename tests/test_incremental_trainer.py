@@ -0,0 +1,53 @@
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost
+from sklearn.linear_model import SGDClassifier
+from xgboost import XGBClassifier
+
+from src.schema import RAW_DTYPES, TARGET_COLUMN
+from src.components.data_transformation import DataTransformation
+from src.components.incremental_trainer import IncrementalTrainer, _remap_xgboost, _remap_linear
+
+DATA_PATH = "data/credit_risk_data.csv"
+
+
+@pytest.fixture(scope="module")
+def update():
+    """Preprocessor fitted on 2000 old rows, updated with 1000 new rows that include an unseen loan_intent."""
+    data = pd.read_csv(DATA_PATH, dtype=RAW_DTYPES).sample(n=3000, random_state=0).reset_index(drop=True)
+    old, new = data.iloc[:2000], data.iloc[2000:].copy()
+    new['loan_intent'] = new['loan_intent'].cat.add_categories(['CRYPTO'])
+    new.loc[new.index[:50], 'loan_intent'] = 'CRYPTO'
+
+    preprocessor = DataTransformation().get_data_transformer_object()
+    X_old = preprocessor.fit_transform(old.drop(columns=[TARGET_COLUMN]))
+    updated, stats, new_categories = IncrementalTrainer().update_preprocessor(
+        preprocessor, new.drop(columns=[TARGET_COLUMN]))
+    X_old_updated = updated.transform(old.drop(columns=[TARGET_COLUMN]))
+    assert new_categories == {'loan_intent': ['CRYPTO']}
+    assert not np.allclose(stats['old_mean'], stats['new_mean'])
+    return old[TARGET_COLUMN].to_numpy(), X_old, X_old_updated, stats, len(stats['new_mean'])
+
+
+def test_remapped_xgboost_keeps_margins_on_old_rows(update):
+    y_old, X_old, X_old_updated, stats, n_num = update
+    model = XGBClassifier(n_estimators=30, max_depth=4, random_state=42).fit(X_old, y_old)
+    booster = _remap_xgboost(model, n_num, stats['old_mean'], stats['old_scale'], stats['new_mean'],
+                             stats['new_scale'], X_old_updated.shape[1], float32_inputs=stats['float32_inputs'])
+    before = model.get_booster().predict(xgboost.DMatrix(X_old, missing=model.missing), output_margin=True)
+    after = booster.predict(xgboost.DMatrix(X_old_updated, missing=model.missing), output_margin=True)
+    np.testing.assert_array_equal(after, before)
+
+
+def test_remapped_linear_model_keeps_margins_on_old_rows(update):
+    y_old, X_old, X_old_updated, stats, n_num = update
+    model = SGDClassifier(loss='log_loss', random_state=42).fit(X_old, y_old)
+    remapped = _remap_linear(copy.deepcopy(model), n_num, stats['old_mean'], stats['old_scale'],
+                             stats['new_mean'], stats['new_scale'], X_old_updated.shape[1])
+    before, after = model.decision_function(X_old), remapped.decision_function(X_old_updated)
+    # Exact in real arithmetic; the float32 features are rounded differently under the two scalings
+    np.testing.assert_allclose(after, before, rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(remapped.predict(X_old_updated), model.predict(X_old))
@@ -0,0 +1,21 @@
+import logging
+
+from src.logger import log_payload
+
+
+def test_log_payload_is_bounded(caplog):
+    logger = logging.getLogger("test_log_payload")
+    payload = {'applications': [{'person_income': 'x' * 10_000, 'loan_amnt': i} for i in range(100_000)]}
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        log_payload(logger, "Batch:", payload, max_chars=200)
+    message = caplog.records[-1].getMessage()
+    assert message.startswith("Batch: {'applications': [{")
+    assert len(message) <= len("Batch: ") + 200 + len("... [truncated]")
+
+
+def test_log_payload_small_payload_is_plain_repr(caplog):
+    logger = logging.getLogger("test_log_payload")
+    payload = {'person_age': 30, 'loan_intent': 'EDUCATION'}
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        log_payload(logger, "Input:", payload)
+    assert caplog.records[-1].getMessage() == f"Input: {payload!r}"
@@ -0,0 +1,76 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+
+
+class _FakePipeline:
+    """Scores records as (x > 10, x / 100); a negative x fails the whole call, like a bad row would."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.first_call = threading.Event()
+
+    def predict_records(self, records):
+        self.calls.append([record["x"] for record in records])
+        if len(self.calls) == 1:
+            # Hold the first batch so the next requests queue up behind it
+            self.first_call.set()
+            assert self.release.wait(5)
+        if any(record["x"] < 0 for record in records):
+            raise ValueError("negative x")
+        return [int(record["x"] > 10) for record in records], [record["x"] / 100 for record in records]
+
+    def predict_with_scores(self, features: pd.DataFrame):
+        self.calls.append(list(features["x"]))
+        return list((features["x"] > 10).astype(int)), list(features["x"] / 100)
+
+
+@pytest.fixture
+def batcher():
+    pipeline = _FakePipeline()
+    return MicroBatcher(pipeline, MicroBatcherConfig(enabled=True, max_batch_size=64, max_wait_ms=2,
+                                                     result_timeout=5))
+
+
+def test_batched_requests_get_their_own_results(batcher):
+    pipeline = batcher.pipeline
+    first = batcher.submit({"x": 1})
+    assert pipeline.first_call.wait(5)
+    futures = {x: batcher.submit({"x": x}) for x in (5, 20, 7, 30)}
+    pipeline.release.set()
+
+    assert first.result(5) == (0, 0.01)
+    for x, future in futures.items():
+        assert future.result(5) == (int(x > 10), x / 100)
+    # The four requests queued behind the first batch were scored in one call, in arrival order
+    assert pipeline.calls == [[1], [5, 20, 7, 30]]
+
+
+def test_failed_batch_is_rescored_row_by_row(batcher):
+    pipeline = batcher.pipeline
+    batcher.submit({"x": 1})
+    assert pipeline.first_call.wait(5)
+    futures = {x: batcher.submit({"x": x}) for x in (5, -1, 30)}
+    pipeline.release.set()
+
+    assert futures[5].result(5) == (0, 0.05)
+    assert futures[30].result(5) == (1, 0.3)
+    with pytest.raises(ValueError, match="negative x"):
+        futures[-1].result(5)
+    assert pipeline.calls[1:] == [[5, -1, 30], [5], [-1], [30]]
+
+    # The batching thread survives the failure
+    assert batcher.predict_record({"x": 50}) == (1, 0.5)
+
+
+def test_one_row_frames_go_through_predict_with_scores(batcher):
+    batcher.pipeline.release.set()
+    preds, scores = batcher.predict_with_scores(pd.DataFrame({"x": [40]}))
+    assert preds == [1] and scores == [0.4]
+    # Multi-row frames are already vectorized and are scored as they are
+    preds, _ = batcher.predict_with_scores(pd.DataFrame({"x": [1, 40]}))
+    assert preds == [0, 1] and batcher.pipeline.calls == [[40], [1, 40]]
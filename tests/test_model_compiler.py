@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from xgboost import XGBClassifier
+
+from src.schema import COMPACT_DTYPES, WIDE_DTYPES, TARGET_COLUMN
+from src.utils import find_cost_optimal_threshold
+from src.components.data_transformation import DataTransformation
+from src.components.model_compiler import CompiledScorer, ModelCompiler, _LIBM_EXP, _libm_exp
+
+DATA_PATH = "data/credit_risk_data.csv"
+
+# Small but complete versions of ModelTrainer's candidates, one per compiled model kind
+MODELS = {
+    "linear": lambda: LogisticRegression(random_state=42, max_iter=1000),
+    "tree": lambda: DecisionTreeClassifier(random_state=42),
+    "forest": lambda: RandomForestClassifier(n_estimators=20, random_state=42),
+    "gradient_boosting": lambda: GradientBoostingClassifier(n_estimators=30, random_state=42),
+    "xgboost": lambda: XGBClassifier(n_estimators=50, random_state=42, eval_metric='logloss'),
+}
+PLANS = {"compact": (COMPACT_DTYPES, True), "wide": (WIDE_DTYPES, False)}
+
+
+@pytest.fixture(scope="module", params=list(PLANS))
+def fitted_preprocessor(request):
+    """Preprocessor of the dtype plan fitted on a train sample, plus train and holdout frames."""
+    dtypes, float32_features = PLANS[request.param]
+    data = pd.read_csv(DATA_PATH, dtype=dtypes).sample(n=8000, random_state=0)
+    train, holdout = data.iloc[:6000], data.iloc[6000:]
+
+    transformation = DataTransformation()
+    transformation.data_transformation_config.float32_features = float32_features
+    preprocessor = transformation.get_data_transformer_object()
+    X_train = preprocessor.fit_transform(train)
+    return preprocessor, X_train, train[TARGET_COLUMN].to_numpy(), holdout
+
+
+@pytest.fixture(scope="module", params=list(MODELS))
+def compiled(request, fitted_preprocessor):
+    preprocessor, X_train, y_train, holdout = fitted_preprocessor
+    model = MODELS[request.param]().fit(X_train, y_train)
+    arrays = ModelCompiler().compile(preprocessor, model)
+    assert json.loads(str(arrays['meta']))['kind'] == request.param
+    return CompiledScorer(arrays), preprocessor, model, holdout.drop(columns=[TARGET_COLUMN]), holdout[TARGET_COLUMN]
+
+
+def test_compiled_labels_and_probabilities_match(compiled):
+    scorer, preprocessor, model, holdout, _ = compiled
+    report = ModelCompiler.verify_equivalence(scorer, preprocessor, model, holdout)
+    assert report['rows'] == len(holdout)
+    assert report['label_mismatches'] == 0
+    assert report['max_abs_proba_diff'] == 0.0
+
+
+def test_compiled_threshold_decisions_match(compiled):
+    scorer, preprocessor, model, holdout, y_holdout = compiled
+    expected = model.predict_proba(preprocessor.transform(holdout))[:, 1]
+    threshold, _ = find_cost_optimal_threshold(y_holdout, expected)
+    # The cost-optimal cut-off plus cut-offs sitting exactly on scored PDs (the worst case)
+    thresholds = [threshold, 0.5] + list(np.unique(expected)[::40])
+    for cut in thresholds:
+        report = ModelCompiler.verify_equivalence(scorer, preprocessor, model, holdout, threshold=cut)
+        assert report['decision_mismatches'] == 0, report
+
+
+def test_compiled_scorer_handles_missing_and_unseen_values(compiled):
+    scorer, preprocessor, model, holdout, _ = compiled
+    rows = holdout.head(4).copy()
+    rows['loan_int_rate'] = rows['loan_int_rate'].astype('float64')
+    rows.loc[rows.index[0], 'loan_int_rate'] = np.nan
+    rows.loc[rows.index[1], 'person_emp_length'] = np.nan
+    rows['loan_intent'] = rows['loan_intent'].astype(object)
+    rows.loc[rows.index[2], 'loan_intent'] = 'NOT_A_KNOWN_INTENT'
+    report = ModelCompiler.verify_equivalence(scorer, preprocessor, model, rows, threshold=0.5)
+    assert report['label_mismatches'] == 0
+    assert report['decision_mismatches'] == 0
+
+
+@pytest.mark.parametrize("dtype, scale", [(np.float32, 5), (np.float32, 60), (np.float64, 5), (np.float64, 400)])
+def test_vectorized_exp_matches_the_c_library(dtype, scale):
+    if _LIBM_EXP[np.dtype(dtype)] is None:
+        pytest.skip("C library exp not available")
+    x = (np.random.default_rng(0).standard_normal(200_000) * scale).astype(dtype)
+    x[:5] = [0.0, 88.8, -104.0, 1e-30, -1e-30]  # overflow/underflow for float32, tiny arguments
+    expected = np.fromiter(map(_LIBM_EXP[np.dtype(dtype)], x.tolist()), dtype=dtype, count=x.size)
+    assert np.array_equal(_libm_exp(x), expected)
@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from src.schema import APPLICANT_FIELDS, TARGET_COLUMN
+from src.utils import save_object
+from src.components.model_registry import ModelRegistry, ModelRegistryConfig
+from src.pipeline.shadow_scoring import (ShadowScorer, ShadowScoringConfig, applicant_hash, challenger_id,
+                                         read_shadow_log)
+
+
+def _report(cost_a, cost_b):
+    return {'Model A': {'Total Cost': np.int64(cost_a), 'Threshold': np.float64(0.3)},
+            'Model B': {'Total Cost': cost_b, 'Threshold': 0.4}}
+
+
+@pytest.fixture
+def preprocessor_path(tmp_path):
+    path = str(tmp_path / "preprocessor.pkl")
+    save_object(path, {'scaler': 'fitted'})
+    return path
+
+
+def test_identical_run_is_registered_once(tmp_path, preprocessor_path):
+    registry = ModelRegistry(ModelRegistryConfig(registry_dir=str(tmp_path / "registry"), keep_versions=5))
+    models = {'Model A': {'weights': 1}, 'Model B': {'weights': 2}}
+    version = registry.register_run(preprocessor_path, models, _report(10, 12), 'Model A')
+    assert registry.register_run(preprocessor_path, models, _report(10, 12), 'Model A') == version
+    assert [entry['version'] for entry in registry.versions()] == [version]
+
+    paths = registry.paths(version, 'Model B')
+    assert os.path.exists(paths['model']) and paths['threshold'] == 0.4
+    assert registry.latest()['costs'] == {'Model A': 10, 'Model B': 12}
+    # A different report is a different run
+    assert registry.register_run(preprocessor_path, models, _report(11, 12), 'Model A') != version
+
+
+def test_oldest_versions_are_pruned(tmp_path, preprocessor_path):
+    registry = ModelRegistry(ModelRegistryConfig(registry_dir=str(tmp_path / "registry"), keep_versions=2))
+    models = {'Model A': {'weights': 1}, 'Model B': {'weights': 2}}
+    versions = [registry.register_run(preprocessor_path, models, _report(cost, 20), 'Model A')
+                for cost in (10, 11, 12)]
+
+    assert [entry['version'] for entry in registry.versions()] == versions[1:]
+    assert not os.path.exists(os.path.join(registry.config.registry_dir, versions[0]))
+    assert all(os.path.isdir(os.path.join(registry.config.registry_dir, v)) for v in versions[1:])
+    # The runner-up of the latest training run is the default challenger
+    assert registry.challengers() == [(versions[2], 'Model B')]
+
+
+def test_shadow_log_round_trip(tmp_path, serving_pipeline):
+    pipeline, data, X = serving_pipeline
+    challenger = DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, data[TARGET_COLUMN])
+    registry = ModelRegistry(ModelRegistryConfig(registry_dir=str(tmp_path / "registry")))
+    version = registry.register_run(
+        pipeline.preprocessor_path, {'XGBoost': pipeline.registry.get(pipeline.model_path), 'Decision Tree': challenger},
+        {'XGBoost': {'Total Cost': 100, 'Threshold': 0.3}, 'Decision Tree': {'Total Cost': 120, 'Threshold': 0.35}},
+        'XGBoost')
+
+    log_path = str(tmp_path / "shadow" / "shadow_log.bin")
+    scorer = ShadowScorer(pipeline, ShadowScoringConfig(enabled=True, log_file_path=log_path, flush_records=1000),
+                          model_registry=registry)
+    sample = data[list(APPLICANT_FIELDS)].head(40).reset_index(drop=True)
+    _, valid_mask, _ = pipeline.validate_batch(sample)
+    applicants = sample[valid_mask].head(25).reset_index(drop=True)
+    champion_preds, champion_pds = pipeline.predict_with_scores(applicants)
+    scorer.submit(applicants, champion_preds, champion_pds)
+    scorer._executor.shutdown(wait=True)
+    scorer.flush()
+
+    log = read_shadow_log(log_path)
+    assert len(log) == 25
+    assert (log['challenger'] == challenger_id(version, 'Decision Tree')).all()
+    assert (log['challenger_name'] == f"{version}/Decision Tree").all()
+    assert list(log['applicant']) == [applicant_hash(row) for row in applicants.to_dict('records')]
+    np.testing.assert_array_equal(log['champion_pred'], np.asarray(champion_preds, dtype=np.uint8))
+    np.testing.assert_array_equal(log['champion_pd'], np.asarray(champion_pds, dtype=np.float32))
+    X_applicants = pipeline.registry.get(pipeline.preprocessor_path).transform(applicants)
+    expected_pds = challenger.predict_proba(X_applicants)[:, 1].astype(np.float32)
+    np.testing.assert_allclose(log['challenger_pd'], expected_pds, rtol=1e-6)
+    np.testing.assert_array_equal(log['challenger_pred'], (expected_pds >= 0.35).astype(np.uint8))
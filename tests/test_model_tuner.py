@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from src.components.model_tuner import ModelTuner, ModelTunerConfig
+
+
+@pytest.fixture
+def training_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(450, 5))
+    y = (X[:, 0] - 0.7 * X[:, 2] + rng.normal(scale=0.8, size=450) > 0.9).astype(int)
+    return X, y
+
+
+def _tuner(checkpoint, **overrides):
+    config = ModelTunerConfig(checkpoint_file_path=str(checkpoint), n_candidates=9, eta=3,
+                              min_resource_fraction=1 / 3, cv_folds=3, n_jobs=1, **overrides)
+    return ModelTuner(config)
+
+
+def _trial_keys(checkpoint):
+    with open(checkpoint) as f:
+        return [(r["model"], r["candidate"], r["rung"]) for r in map(json.loads, f)]
+
+
+def test_resume_skips_checkpointed_trials(tmp_path, training_data):
+    X, y = training_data
+    models = {"Decision Tree": DecisionTreeClassifier(random_state=0)}
+    checkpoint = tmp_path / "tuning_checkpoint.jsonl"
+
+    # Interrupted search: the trial budget stops it after 4 of the 9 first-rung trials
+    _tuner(checkpoint, max_trials=4).tune(models, X, y)
+    interrupted = _trial_keys(checkpoint)
+    assert len(interrupted) == 4
+
+    resumed = _tuner(checkpoint).tune(models, X, y)
+    keys = _trial_keys(checkpoint)
+    # Resuming only appends the missing trials: 9 candidates at rung 0, the best 3 at rung 1
+    assert keys[:4] == interrupted
+    assert len(keys) == len(set(keys)) == 12
+
+    uninterrupted = _tuner(tmp_path / "fresh.jsonl").tune(models, X, y)
+    assert resumed == uninterrupted
+
+    # A finished search is replayed from the checkpoint without running any trial
+    assert _tuner(checkpoint).tune(models, X, y) == resumed
+    assert len(_trial_keys(checkpoint)) == 12
+
+
+def test_checkpoint_of_other_data_is_ignored(tmp_path, training_data):
+    X, y = training_data
+    models = {"Decision Tree": DecisionTreeClassifier(random_state=0)}
+    checkpoint = tmp_path / "tuning_checkpoint.jsonl"
+    _tuner(checkpoint, max_trials=4).tune(models, X, y)
+
+    _tuner(checkpoint, max_trials=2).tune(models, X[::-1].copy(), y[::-1].copy())
+    with open(checkpoint) as f:
+        searches = [json.loads(line)["search"] for line in f]
+    assert len(searches) == 6 and len(set(searches)) == 2
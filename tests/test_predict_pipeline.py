@@ -0,0 +1,57 @@
+import os
+import logging
+
+import numpy as np
+import pytest
+from xgboost import XGBClassifier
+
+from src.schema import APPLICANT_FIELDS, TARGET_COLUMN
+from src.utils import save_object
+from src.pipeline.predict_pipeline import CustomData
+
+
+def test_compiled_scorer_is_matched_by_digest_not_mtime(serving_pipeline):
+    pipeline, _, _ = serving_pipeline
+    # A checkout or copy can leave the scorer older than model.pkl
+    model_mtime = os.stat(pipeline.model_path).st_mtime_ns
+    os.utime(pipeline.compiled_scorer_path, ns=(model_mtime - 10**9, model_mtime - 10**9))
+    assert pipeline._compiled_scorer(pipeline.artifacts()) is not None
+
+
+def test_compiled_scorer_of_another_model_is_disabled_once(serving_pipeline, caplog):
+    pipeline, data, X = serving_pipeline
+    save_object(pipeline.model_path, XGBClassifier(n_estimators=3, random_state=0).fit(X, data[TARGET_COLUMN]))
+    with caplog.at_level(logging.WARNING):
+        assert pipeline._compiled_scorer(pipeline.artifacts()) is None
+        assert pipeline._compiled_scorer(pipeline.artifacts()) is None
+    warnings = [record for record in caplog.records if "not built from the current model" in record.getMessage()]
+    assert len(warnings) == 1
+
+
+@pytest.fixture
+def records(serving_pipeline):
+    """300 complete applicants as CustomData records (more than SERVE_COMPILED_MAX_ROWS=256)."""
+    pipeline, data, _ = serving_pipeline
+    rows = data[list(APPLICANT_FIELDS)].dropna().head(300)
+    return pipeline, [CustomData(**row) for row in rows.to_dict(orient='records')]
+
+
+def test_predict_records_is_identical_on_both_sides_of_the_compiled_row_cap(records):
+    pipeline, applicants = records
+    assert pipeline.compiled_max_rows == 256 and pipeline._compiled_scorer(pipeline.artifacts()) is not None
+    # 300 rows: sklearn path; <= 256 rows per call: compiled scorer
+    native = pipeline.predict_records(applicants)
+    compiled = [pipeline.predict_records(applicants[start:start + 150]) for start in (0, 150)]
+    np.testing.assert_array_equal(native[0], np.concatenate([preds for preds, _ in compiled]))
+    np.testing.assert_array_equal(native[1], np.concatenate([scores for _, scores in compiled]))
+
+
+def test_predict_records_accepts_structured_arrays(records):
+    pipeline, applicants = records
+    structured = pipeline.to_applicant_array(applicants[:100])
+    preds, pd_scores = pipeline.predict_records(applicants[:100])
+    for batch in (structured, structured[list(reversed(APPLICANT_FIELDS))]):  # field order does not matter
+        np.testing.assert_array_equal(pipeline.predict_records(batch)[0], preds)
+        np.testing.assert_array_equal(pipeline.predict_records(batch)[1], pd_scores)
+    with pytest.raises(ValueError, match="missing required fields"):
+        pipeline.to_applicant_array(structured[['person_age', 'loan_grade']])
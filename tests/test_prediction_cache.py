@@ -0,0 +1,82 @@
+import os
+import time
+import types
+
+import pytest
+
+import src.pipeline.prediction_cache as prediction_cache_module
+from src.utils import save_object
+from src.pipeline.artifact_registry import ArtifactRegistry, ArtifactRegistryConfig
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig, applicant_key
+
+APPLICANT = {
+    'person_age': 30, 'person_income': 55000, 'person_home_ownership': 'RENT',
+    'person_emp_length': 4.0, 'loan_intent': 'EDUCATION', 'loan_grade': 'B',
+    'loan_amnt': 9000, 'loan_int_rate': 11.5, 'loan_percent_income': 0.16,
+    'cb_person_default_on_file': 'N', 'cb_person_cred_hist_length': 5,
+}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache_module, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def _key(i):
+    return applicant_key({**APPLICANT, 'loan_amnt': 1000 + i}, "v1")
+
+
+def test_key_normalizes_inputs_and_includes_model_version():
+    as_text = {name: str(value) for name, value in APPLICANT.items()}
+    as_text['person_home_ownership'] = ' RENT '
+    as_text['person_age'] = '30.0'
+    assert applicant_key(as_text, "v1") == applicant_key(APPLICANT, "v1")
+    assert applicant_key(APPLICANT, "v2") != applicant_key(APPLICANT, "v1")
+    assert applicant_key({**APPLICANT, 'loan_int_rate': 11.6}, "v1") != applicant_key(APPLICANT, "v1")
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(PredictionCacheConfig(enabled=True, max_entries=10, ttl_seconds=60))
+    cache.put(_key(0), 1, 0.8)
+    clock[0] += 59
+    assert cache.get(_key(0)) == (1, 0.8)
+    clock[0] += 2
+    assert cache.get(_key(0)) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = PredictionCache(PredictionCacheConfig(enabled=True, max_entries=3, ttl_seconds=60))
+    for i in range(3):
+        cache.put(_key(i), 0, i / 10)
+    assert cache.get(_key(0)) == (0, 0.0)  # 0 is now the most recently used
+    cache.put(_key(3), 1, 0.3)
+
+    assert cache.get(_key(1)) is None
+    assert [cache.get(_key(i)) for i in (0, 2, 3)] == [(0, 0.0), (0, 0.2), (1, 0.3)]
+    assert cache.stats()['entries'] == 3
+
+
+def test_memory_cap_bounds_capacity():
+    cache = PredictionCache(PredictionCacheConfig(enabled=True, max_entries=10**6, max_memory_mb=0.01))
+    assert 1 <= cache.capacity < 100
+
+
+def test_artifact_reload_invalidates_cache(tmp_path):
+    registry = ArtifactRegistry(ArtifactRegistryConfig(check_interval=0.0))
+    cache = PredictionCache(PredictionCacheConfig(enabled=True))
+    registry.add_reload_listener(cache.invalidate)
+    path = str(tmp_path / "model.pkl")
+    save_object(path, {'version': 1})
+    registry.get(path)
+    cache.put(_key(0), 1, 0.9)
+
+    registry.get(path)  # unchanged file: the cache stays
+    assert cache.get(_key(0)) == (1, 0.9)
+
+    save_object(path, {'version': 2})
+    os.utime(path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert registry.get(path) == {'version': 2}
+    assert cache.get(_key(0)) is None
@@ -0,0 +1,15 @@
+import numpy as np
+
+from src.components.reason_codes import ReasonCodeExplainer
+
+
+def test_top_reasons_skip_fields_pushing_towards_approval():
+    # Linear explainer: contribution = coef * (x - E[x]); only 'income' pushes towards default
+    explainer = ReasonCodeExplainer(
+        'linear', ['income', 'age', 'grade'], np.arange(3), 'log_odds', expected_value=0.0,
+        coef=np.array([2.0, -1.0, 0.5]), background_mean=np.zeros(3),
+    )
+    X = np.array([[1.0, 1.0, 0.0], [-1.0, 1.0, -2.0]])
+    reasons = explainer.top_reasons(X, top_k=3)
+    assert reasons[0] == [{'feature': 'income', 'contribution': 2.0}]
+    assert reasons[1] == []
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from src.pipeline.stage_cache import StageCache, StageCacheConfig, file_digest, fingerprint
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(StageCacheConfig(cache_dir=str(tmp_path / "stage_cache"), enabled=True))
+
+
+def _transform_stage(cache, input_path, output_path, params, calls):
+    """A stage keyed on its input file and params that writes one artifact."""
+    def run():
+        calls.append(params)
+        with open(input_path) as f:
+            text = f.read()
+        with open(output_path, "w") as f:
+            f.write(text.upper() * params["repeat"])
+        return {"rows": len(text.splitlines())}
+
+    key = fingerprint("transform", file_digest(input_path), params)
+    return cache.run("data transformation", key, run, files={"output.txt": str(output_path)})
+
+
+def test_hit_restores_files_and_miss_on_changed_inputs(tmp_path, cache):
+    input_path, output_path = tmp_path / "input.csv", tmp_path / "output.txt"
+    input_path.write_text("a,b\n1,2\n")
+    calls = []
+
+    assert _transform_stage(cache, input_path, output_path, {"repeat": 1}, calls) == {"rows": 2}
+    # Same inputs: the stage is skipped and its artifact restored byte for byte
+    os.remove(output_path)
+    assert _transform_stage(cache, input_path, output_path, {"repeat": 1}, calls) == {"rows": 2}
+    assert output_path.read_text() == "A,B\n1,2\n" and len(calls) == 1
+
+    # Changed params, then changed input bytes: both re-run the stage
+    _transform_stage(cache, input_path, output_path, {"repeat": 2}, calls)
+    input_path.write_text("a,b\n1,2\n3,4\n")
+    assert _transform_stage(cache, input_path, output_path, {"repeat": 2}, calls) == {"rows": 3}
+    assert len(calls) == 3
+    assert [r["status"] for r in cache.records] == ["miss", "hit", "miss", "miss"]
+
+
+def test_fingerprint_tracks_content_not_thread_counts():
+    X = np.arange(12, dtype=np.float64).reshape(4, 3)
+    assert fingerprint(X) == fingerprint(X.copy())
+    X_changed = X.copy()
+    X_changed[3, 2] = 0.5
+    assert fingerprint(X) != fingerprint(X_changed)
+    assert fingerprint(X) != fingerprint(X.astype(np.float32))
+
+    # n_jobs is a parallelism knob, not a model parameter
+    assert fingerprint(DecisionTreeClassifier(max_depth=3)) == fingerprint(DecisionTreeClassifier(max_depth=3))
+    assert fingerprint(DecisionTreeClassifier(max_depth=3)) != fingerprint(DecisionTreeClassifier(max_depth=4))
+    assert fingerprint(RandomForestClassifier(n_jobs=1)) == fingerprint(RandomForestClassifier(n_jobs=8))
+
+
+def test_damaged_entry_is_a_miss(tmp_path, cache):
+    input_path, output_path = tmp_path / "input.csv", tmp_path / "output.txt"
+    input_path.write_text("x\n")
+    calls = []
+    _transform_stage(cache, input_path, output_path, {"repeat": 1}, calls)
+    for root, _, names in os.walk(cache.config.cache_dir):
+        if "result.joblib" in names:
+            with open(os.path.join(root, "result.joblib"), "wb") as f:
+                f.write(b"truncated")
+
+    assert _transform_stage(cache, input_path, output_path, {"repeat": 1}, calls) == {"rows": 1}
+    assert len(calls) == 2
+    # The re-run overwrote the damaged entry
+    _transform_stage(cache, input_path, output_path, {"repeat": 1}, calls)
+    assert len(calls) == 2